@@ -1,8 +1,13 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.auth.models import User
 from django.utils.html import format_html
 from django.db.models import Count, Sum
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
+from .caching import bump_gym_generation, bump_member_version
+from .deletion import record_deletions
 from .models import (
     GymOwner, Member, Trainer, Equipment, WorkoutPlan, Exercise, 
     WorkoutSession, SubscriptionPlan, MemberSubscription, 
@@ -10,6 +15,30 @@ from .models import (
 )
 
 
+class RecordDeletionsMixin:
+    """
+    Admin deletes - single or bulk - go through deletion.record_deletions(),
+    so delta-sync clients get tombstones for the rows and their cascades
+    """
+
+    def delete_model(self, request, obj):
+        with record_deletions(obj):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with record_deletions(queryset):
+            super().delete_queryset(request, queryset)
+
+
+# Users cascade to their gym and member rows
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(RecordDeletionsMixin, BaseUserAdmin):
+    pass
+
+
 # Custom Admin Site Configuration
 admin.site.site_header = "Gym Management System Admin"
 admin.site.site_title = "Gym Management Admin"
@@ -17,7 +46,7 @@ admin.site.index_title = "Welcome to Gym Management System Administration"
 
 
 @admin.register(GymOwner)
-class GymOwnerAdmin(admin.ModelAdmin):
+class GymOwnerAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['gym_name', 'user_full_name', 'phone_number', 'subscription_plan', 'is_active', 'created_at']
     list_filter = ['subscription_plan', 'is_active', 'gym_established_date', 'created_at']
     search_fields = ['gym_name', 'user__first_name', 'user__last_name', 'user__email', 'phone_number']
@@ -57,7 +86,7 @@ class GymOwnerAdmin(admin.ModelAdmin):
 
 
 @admin.register(Member)
-class MemberAdmin(admin.ModelAdmin):
+class MemberAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['member_id', 'full_name', 'gym_owner', 'membership_type', 'is_active', 'membership_expiry', 'days_until_expiry']
     list_filter = ['gym_owner', 'membership_type', 'is_active', 'gender', 'join_date']
     search_fields = ['member_id', 'user__first_name', 'user__last_name', 'user__email', 'phone']
@@ -98,7 +127,7 @@ class MemberAdmin(admin.ModelAdmin):
 
 
 @admin.register(Trainer)
-class TrainerAdmin(admin.ModelAdmin):
+class TrainerAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['trainer_id', 'full_name', 'gym_owner', 'specialization', 'experience_years', 'hourly_rate', 'is_available']
     list_filter = ['gym_owner', 'specialization', 'is_available', 'experience_years']
     search_fields = ['trainer_id', 'user__first_name', 'user__last_name', 'user__email', 'phone', 'certification']
@@ -126,13 +155,17 @@ class TrainerAdmin(admin.ModelAdmin):
         return f"{obj.user.first_name} {obj.user.last_name}" or obj.user.username
     full_name.short_description = 'Full Name'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_session_counts().select_related('user', 'gym_owner')
+    
     def total_sessions(self, obj):
-        return obj.workoutsession_set.filter(completed=True).count()
+        return obj.total_sessions
     total_sessions.short_description = 'Completed Sessions'
+    total_sessions.admin_order_field = 'total_sessions'
 
 
 @admin.register(Equipment)
-class EquipmentAdmin(admin.ModelAdmin):
+class EquipmentAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['equipment_id', 'name', 'gym_owner', 'equipment_type', 'brand', 'condition', 'is_working', 'warranty_status']
     list_filter = ['gym_owner', 'equipment_type', 'brand', 'condition', 'is_working']
     search_fields = ['equipment_id', 'name', 'brand', 'model', 'serial_number']
@@ -172,7 +205,7 @@ class EquipmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(SubscriptionPlan)
-class SubscriptionPlanAdmin(admin.ModelAdmin):
+class SubscriptionPlanAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['plan_id', 'name', 'gym_owner', 'price', 'duration_display', 'active_subscribers', 'is_active']
     list_filter = ['gym_owner', 'duration_type', 'is_active', 'includes_trainer', 'includes_nutrition']
     search_fields = ['plan_id', 'name', 'description']
@@ -200,13 +233,17 @@ class SubscriptionPlanAdmin(admin.ModelAdmin):
         return f"{obj.duration_value} {obj.get_duration_type_display()}"
     duration_display.short_description = 'Duration'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_subscriber_counts().select_related('gym_owner')
+    
     def active_subscribers(self, obj):
-        return obj.membersubscription_set.filter(status='active').count()
+        return obj.active_subscribers
     active_subscribers.short_description = 'Active Subscribers'
+    active_subscribers.admin_order_field = 'active_subscribers'
 
 
 @admin.register(MemberSubscription)
-class MemberSubscriptionAdmin(admin.ModelAdmin):
+class MemberSubscriptionAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['member', 'subscription_plan', 'gym_owner', 'status', 'start_date', 'end_date', 'days_remaining', 'amount_paid']
     list_filter = ['gym_owner', 'status', 'auto_renew', 'payment_method']
     search_fields = ['member__user__first_name', 'member__user__last_name', 'member__member_id']
@@ -244,7 +281,7 @@ class MemberSubscriptionAdmin(admin.ModelAdmin):
 
 
 @admin.register(MembershipPayment)
-class MembershipPaymentAdmin(admin.ModelAdmin):
+class MembershipPaymentAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['payment_id', 'member', 'gym_owner', 'amount', 'payment_method', 'status', 'payment_date']
     list_filter = ['gym_owner', 'payment_method', 'status', 'payment_date']
     search_fields = ['payment_id', 'member__user__first_name', 'member__user__last_name', 'transaction_id']
@@ -274,7 +311,7 @@ class MembershipPaymentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['attendance_id', 'member', 'gym_owner', 'date', 'check_in_time', 'check_out_time', 'duration_display', 'qr_code_used']
     list_filter = ['gym_owner', 'date', 'qr_code_used']
     search_fields = ['attendance_id', 'member__user__first_name', 'member__user__last_name', 'member__member_id']
@@ -307,7 +344,7 @@ class AttendanceAdmin(admin.ModelAdmin):
 
 
 @admin.register(WorkoutPlan)
-class WorkoutPlanAdmin(admin.ModelAdmin):
+class WorkoutPlanAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['name', 'gym_owner', 'created_by', 'difficulty_level', 'duration_weeks', 'is_active']
     list_filter = ['gym_owner', 'difficulty_level', 'is_active', 'created_by']
     search_fields = ['name', 'description', 'created_by__user__first_name', 'created_by__user__last_name']
@@ -327,7 +364,7 @@ class WorkoutPlanAdmin(admin.ModelAdmin):
 
 
 @admin.register(Exercise)
-class ExerciseAdmin(admin.ModelAdmin):
+class ExerciseAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['name', 'gym_owner', 'muscle_group', 'difficulty_level', 'sets', 'reps', 'rest_time_seconds']
     list_filter = ['gym_owner', 'muscle_group', 'difficulty_level']
     search_fields = ['name', 'instructions']
@@ -351,7 +388,7 @@ class ExerciseAdmin(admin.ModelAdmin):
 
 
 @admin.register(WorkoutSession)
-class WorkoutSessionAdmin(admin.ModelAdmin):
+class WorkoutSessionAdmin(RecordDeletionsMixin, admin.ModelAdmin):
     list_display = ['member', 'trainer', 'gym_owner', 'date', 'duration_minutes', 'completed']
     list_filter = ['gym_owner', 'completed', 'trainer']
     search_fields = ['member__user__first_name', 'member__user__last_name', 'trainer__user__first_name']
@@ -375,13 +412,29 @@ class WorkoutSessionAdmin(admin.ModelAdmin):
 
 
 # Custom admin actions
+def set_active(queryset, is_active):
+    """
+    Flip is_active in one UPDATE. updated_at is set by hand - auto_now only
+    applies on save() - so cached representations keyed on it are re-rendered,
+    and the gyms' generations are bumped since no post_save runs.
+    """
+    gym_field = 'pk' if queryset.model is GymOwner else 'gym_owner_id'
+    rows = list(queryset.values_list('pk', gym_field))
+    ids = [pk for pk, _ in rows]
+    updated = queryset.model.objects.filter(pk__in=ids).update(is_active=is_active, updated_at=timezone.now())
+    if queryset.model is Member:
+        bump_member_version(*ids)
+    for gym_owner_id in {gym_owner_id for _, gym_owner_id in rows}:
+        bump_gym_generation(gym_owner_id)
+    return updated
+
 def make_active(modeladmin, request, queryset):
-    updated = queryset.update(is_active=True)
+    updated = set_active(queryset, True)
     modeladmin.message_user(request, f'{updated} items marked as active.')
 make_active.short_description = "Mark selected items as active"
 
 def make_inactive(modeladmin, request, queryset):
-    updated = queryset.update(is_active=False)
+    updated = set_active(queryset, False)
     modeladmin.message_user(request, f'{updated} items marked as inactive.')
 make_inactive.short_description = "Mark selected items as inactive"
 
@@ -1,5 +1,5 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
@@ -7,8 +7,13 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.db import transaction
 from .models import GymOwner
+from .authentication import (
+    CachedTokenAuthentication, access_token_fields, get_tenant, invalidate_user_token_cache, revoke_access_tokens,
+    signed_tokens_enabled,
+)
+from .imaging import store_profile_picture
 from .serializers import GymOwnerSerializer
-from .google_auth import handle_google_auth
+from .google_auth import GoogleAuthService, google_http, google_timeout, google_url, handle_google_auth
 import uuid
 import os
 
@@ -130,7 +135,7 @@ def gym_owner_login(request):
         
         # Check if user is a gym owner
         try:
-            gym_owner = GymOwner.objects.get(user=user)
+            gym_owner = GymOwner.objects.with_details().get(user=user)
         except GymOwner.DoesNotExist:
             return Response({
                 'error': 'User is not a gym owner'
@@ -139,9 +144,9 @@ def gym_owner_login(request):
         # Get or create token
         token, created = Token.objects.get_or_create(user=user)
         
-        # Generate JWT tokens if available (for production)
+        # Generate JWT tokens if available (for production) - signed access tokens replace them
         jwt_tokens = {}
-        if JWT_AVAILABLE:
+        if JWT_AVAILABLE and not signed_tokens_enabled():
             refresh = RefreshToken.for_user(user)
             jwt_tokens = {
                 'refresh': str(refresh),
@@ -161,11 +166,12 @@ def gym_owner_login(request):
                 'email': user.email,
                 'first_name': user.first_name,
                 'last_name': user.last_name
-            }
+            },
+            **access_token_fields(user.id, gym_owner.id),
         }
         
         # Add JWT tokens if available
-        if JWT_AVAILABLE:
+        if jwt_tokens:
             response_data['jwt'] = jwt_tokens
         
         return Response(response_data, status=status.HTTP_200_OK)
@@ -176,6 +182,21 @@ def gym_owner_login(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def renew_access_token(request):
+    """
+    Issue a new signed access token for the database token in the
+    Authorization header (access tokens can't renew themselves)
+    """
+    if not signed_tokens_enabled():
+        return Response({
+            'error': 'Signed access tokens are not enabled'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(access_token_fields(request.user.id, get_tenant(request).gym_owner_id), status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 def gym_owner_logout(request):
     """
@@ -183,7 +204,9 @@ def gym_owner_logout(request):
     """
     try:
         # Delete the user's token
+        invalidate_user_token_cache(request.user)
         Token.objects.filter(user=request.user).delete()
+        revoke_access_tokens(request.user.pk)
         
         return Response({
             'success': True,
@@ -379,7 +402,7 @@ def verify_qr_token(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            gym_owner = GymOwner.objects.get(qr_code_token=qr_token)
+            gym_owner = GymOwner.objects.only('gym_name', 'gym_address').get(qr_code_token=qr_token)
             
             return Response({
                 'success': True,
@@ -443,24 +466,20 @@ def _handle_base64_upload(request):
                 'error': 'Invalid base64 image data'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Store the base64 data directly (Railway-compatible approach)
-        gym_owner.profile_picture_base64 = base64_data
-        gym_owner.profile_picture_content_type = content_type
+        # Store the image once in the content-addressed image store; the row keeps the key
+        gym_owner.profile_picture_key = store_profile_picture(file_content, content_type)
         gym_owner.save()
         
         print(f"✅ BASE64 UPLOAD: Profile picture saved successfully")
         
-        # Return updated profile data with data URL
+        # Return updated profile data with the image URL
         serializer = GymOwnerSerializer(gym_owner, context={'request': request})
         
-        # Create a data URL for immediate use
-        data_url = f"data:{content_type};base64,{base64_data}"
-        
         return Response({
             'success': True,
             'message': 'Profile picture uploaded successfully',
             'gym_owner': serializer.data,
-            'profile_picture_url': data_url,
+            'profile_picture_url': serializer.data['profile_picture_url'],
             'user': {
                 'id': request.user.id,
                 'email': request.user.email,
@@ -531,40 +550,16 @@ def gym_owner_upload_picture(request):
                 'error': f'Invalid file type. Only JPEG, PNG, GIF, and HEIC images are allowed. Received: {content_type}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Save the uploaded file and also store as base64 for Railway
-        print(f"💾 UPLOAD: Saving file to model...")
-        
-        # Store as base64 for reliable access on Railway
-        import base64
+        # Store the image once in the content-addressed image store; the row keeps the key
         uploaded_file.seek(0)  # Reset file pointer
-        file_content = uploaded_file.read()
-        base64_content = base64.b64encode(file_content).decode('utf-8')
-        
-        gym_owner.profile_picture = uploaded_file
-        gym_owner.profile_picture_base64 = base64_content
-        gym_owner.profile_picture_content_type = uploaded_file.content_type
+        gym_owner.profile_picture_key = store_profile_picture(uploaded_file.read(), content_type)
         gym_owner.save()
         
-        print(f"✅ UPLOAD: File saved successfully")
-        print(f"📁 UPLOAD: File path: {gym_owner.profile_picture.name}")
-        print(f"💾 UPLOAD: Base64 length: {len(base64_content)} characters")
-        print(f"🔗 UPLOAD: Relative URL: {gym_owner.profile_picture.url}")
+        print(f"✅ UPLOAD: File saved successfully as {gym_owner.profile_picture_key}")
         
-        # Return updated profile data with full image URL
+        # Return updated profile data with the image URL
         serializer = GymOwnerSerializer(gym_owner, context={'request': request})
-        
-        # Create a data URL for immediate use
-        data_url = f"data:{uploaded_file.content_type};base64,{base64_content}"
-        print(f'🖼️ Generated data URL (first 100 chars): {data_url[:100]}...')
-        
-        # Try to build traditional URL, but fallback to data URL
-        image_url = data_url  # Use data URL as primary
-        try:
-            traditional_url = request.build_absolute_uri(gym_owner.profile_picture.url)
-            print(f'🔗 Traditional URL: {traditional_url}')
-            # Could test accessibility here, but for now use data URL
-        except Exception as e:
-            print(f'❌ Error generating traditional URL: {e}')
+        image_url = serializer.data['profile_picture_url']
         
         return Response({
             'success': True,
@@ -615,6 +610,8 @@ def gym_owner_change_password(request):
         # Set new password
         request.user.set_password(new_password)
         request.user.save()
+        invalidate_user_token_cache(request.user)
+        revoke_access_tokens(request.user.pk)
         
         return Response({
             'success': True,
@@ -716,7 +713,6 @@ def google_oauth_exchange(request):
         
         # Import Google OAuth libraries
         try:
-            import requests
             from django.conf import settings
             
             # Get client credentials - use consistent env var names
@@ -730,7 +726,6 @@ def google_oauth_exchange(request):
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
             # Exchange authorization code for tokens
-            token_url = 'https://oauth2.googleapis.com/token'
             token_data = {
                 'client_id': client_id,
                 'client_secret': client_secret,
@@ -739,8 +734,7 @@ def google_oauth_exchange(request):
                 'redirect_uri': redirect_uri,
             }
             
-            print(f"🌐 OAUTH_EXCHANGE: Requesting tokens from Google...")
-            token_response = requests.post(token_url, data=token_data, timeout=10)
+            token_response = google_http().post(google_url('GOOGLE_TOKEN_URL'), data=token_data, timeout=google_timeout())
             
             if token_response.status_code != 200:
                 print(f"❌ OAUTH_EXCHANGE: Token exchange failed: {token_response.text}")
@@ -759,40 +753,34 @@ def google_oauth_exchange(request):
                     'error': 'No access token received from Google'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            print(f"✅ OAUTH_EXCHANGE: Received tokens from Google")
-            
-            # Get user info from Google
-            userinfo_url = 'https://www.googleapis.com/oauth2/v2/userinfo'
-            userinfo_response = requests.get(
-                userinfo_url,
-                headers={'Authorization': f'Bearer {access_token}'},
-                timeout=10
-            )
-            
-            if userinfo_response.status_code != 200:
-                return Response({
-                    'success': False,
-                    'error': 'Failed to get user info from Google'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            user_info = userinfo_response.json()
+            # The ID token already carries the profile - only ask the userinfo endpoint without one
+            user_info = GoogleAuthService.verify_google_token(id_token) if id_token else None
+            if user_info is None:
+                userinfo_response = google_http().get(
+                    google_url('GOOGLE_USERINFO_URL'),
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    timeout=google_timeout(),
+                )
+                
+                if userinfo_response.status_code != 200:
+                    return Response({
+                        'success': False,
+                        'error': 'Failed to get user info from Google'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                profile = userinfo_response.json()
+                user_info = {
+                    'email': profile['email'],
+                    'first_name': profile.get('given_name', ''),
+                    'last_name': profile.get('family_name', ''),
+                    'picture': profile.get('picture', ''),
+                    'email_verified': profile.get('verified_email', True),
+                    'google_id': profile['id'],
+                }
             print(f"✅ OAUTH_EXCHANGE: Received user info: {user_info.get('email')}")
             
             # Use existing Google auth logic to create/login user
-            if id_token:
-                # If we have an ID token, use the existing handler
-                auth_result = handle_google_auth(id_token)
-            else:
-                # Fallback: create a mock ID token payload for the handler
-                mock_payload = {
-                    'email': user_info['email'],
-                    'name': user_info.get('name', ''),
-                    'given_name': user_info.get('given_name', ''),
-                    'family_name': user_info.get('family_name', ''),
-                    'sub': user_info['id'],
-                    'email_verified': user_info.get('verified_email', True),
-                }
-                auth_result = handle_google_auth(None, user_data=mock_payload)
+            auth_result = handle_google_auth(None, user_data=user_info)
             
             if auth_result['success']:
                 return Response({
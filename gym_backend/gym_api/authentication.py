@@ -0,0 +1,297 @@
+"""
+Authentication backends and request-scoped tenant resolution.
+
+CachedTokenAuthentication resolves a token to its user and gym from a
+short-lived cache entry, so authenticated requests normally skip the
+Token + User join and the follow-up GymOwner lookup entirely. Logout
+deletes that entry, which only reaches every worker through a shared cache:
+with a process-local one (LocMemCache) tokens are looked up in the database
+on every request unless AUTH_TOKEN_CACHE says otherwise.
+
+With SIGNED_TOKEN_AUTH on, sign-in also hands out short-lived signed access
+tokens ('Authorization: Bearer <token>') that carry the user and gym ids.
+SignedTokenAuthentication verifies them from the signature alone; the only
+lookup is the user's revocation stamp, written on logout, password change,
+deactivation or deletion. Stamps are stored in AccessTokenRevocation so an
+evicted or restarted cache can't bring revoked tokens back. With the token
+cache enabled they are read through it; without a shared cache each process
+keeps a copy of the stamps young enough to matter (at most
+SIGNED_TOKEN_LIFETIME old), reloaded every SIGNED_TOKEN_REVOCATION_REFRESH
+seconds. Either way warm requests make no query; with the process copy a
+revocation made on another worker takes up to the refresh interval to apply.
+The database token remains the long-lived credential that renews them.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .caching import cache_is_shared
+from .models import AccessTokenRevocation, GymOwner
+
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60  # seconds - bounds staleness of is_active / profile fields
+
+ACCESS_TOKEN_SALT = 'gym_api.authentication.access_token'
+
+# User fields kept in the cache entry; everything else stays deferred and is
+# loaded on first access, so check_password() and save() behave normally.
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def auth_token_cache_key(key):
+    # Hash the token so raw credentials never end up in the cache backend
+    return f'auth_token_{hashlib.sha256(key.encode("utf-8")).hexdigest()}'
+
+
+def invalidate_token_cache(*keys):
+    """Drop cached credentials for the given token keys"""
+    cache.delete_many([auth_token_cache_key(key) for key in keys if key])
+
+
+def invalidate_user_token_cache(user):
+    """Drop cached credentials for every token belonging to a user"""
+    invalidate_token_cache(*Token.objects.filter(user=user).values_list('key', flat=True))
+
+
+def token_cache_enabled():
+    """
+    AUTH_TOKEN_CACHE, by default on only with a shared cache - a deleted
+    token must stop working on every worker, not just the one that saw
+    the logout
+    """
+    enabled = getattr(settings, 'AUTH_TOKEN_CACHE', None)
+    return cache_is_shared() if enabled is None else enabled
+
+
+def signed_tokens_enabled():
+    return getattr(settings, 'SIGNED_TOKEN_AUTH', False)
+
+
+def access_token_lifetime():
+    """Seconds a signed access token stays valid"""
+    return getattr(settings, 'SIGNED_TOKEN_LIFETIME', 900)
+
+
+def issue_access_token(user_id, gym_owner_id):
+    """Signed access token for SignedTokenAuthentication"""
+    return signing.dumps({'u': user_id, 'g': gym_owner_id, 'iat': time.time()}, salt=ACCESS_TOKEN_SALT)
+
+
+def access_token_fields(user_id, gym_owner_id):
+    """Sign-in response fields for a new access token - none when signed tokens are off"""
+    if not signed_tokens_enabled():
+        return {}
+    return {
+        'access_token': issue_access_token(user_id, gym_owner_id),
+        'access_token_expires_in': access_token_lifetime(),
+    }
+
+
+def revocation_cache_key(user_id):
+    return f'auth_revoked_{user_id}'
+
+
+def revocation_refresh_interval():
+    """Seconds a process serves its copy of the revocation stamps before reloading them"""
+    return getattr(settings, 'SIGNED_TOKEN_REVOCATION_REFRESH', 5)
+
+
+class _RevocationSnapshot:
+    """
+    This process's copy of the revocation stamps that can still reject a
+    token - those newer than the token lifetime - reloaded in one query
+    once the refresh interval has passed
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.stamps = {}
+
+    def get(self, user_id):
+        with self.lock:
+            if self.loaded_at is None or not 0 <= time.monotonic() - self.loaded_at < revocation_refresh_interval():
+                self.stamps = dict(AccessTokenRevocation.objects.filter(
+                    revoked_at__gt=time.time() - access_token_lifetime(),
+                ).values_list('user_id', 'revoked_at'))
+                self.loaded_at = time.monotonic()
+            return self.stamps.get(user_id, 0)
+
+    def add(self, user_id, revoked_at):
+        with self.lock:
+            self.stamps[user_id] = revoked_at
+
+
+_revocations = _RevocationSnapshot()
+
+
+def revoke_access_tokens(user_id):
+    """Reject every access token issued to a user so far"""
+    revoked_at = time.time()
+    AccessTokenRevocation.objects.update_or_create(user_id=user_id, defaults={'revoked_at': revoked_at})
+    if token_cache_enabled():
+        cache.set(revocation_cache_key(user_id), revoked_at, access_token_lifetime())
+    else:
+        _revocations.add(user_id, revoked_at)  # Other processes see it on their next reload
+
+
+def access_tokens_revoked_at(user_id):
+    """Unix time of the user's last revocation, 0 if never"""
+    if not token_cache_enabled():
+        return _revocations.get(user_id)
+    cache_key = revocation_cache_key(user_id)
+    revoked_at = cache.get(cache_key)
+    if revoked_at is None:
+        revoked_at = _load_revoked_at(user_id)
+        # add() so a revocation cached meanwhile isn't overwritten with the older value
+        cache.add(cache_key, revoked_at, access_token_lifetime())
+    return revoked_at
+
+
+def _load_revoked_at(user_id):
+    return AccessTokenRevocation.objects.filter(user_id=user_id).values_list('revoked_at', flat=True).first() or 0
+
+
+class Tenant:
+    """
+    The gym an authenticated request acts on behalf of.
+
+    gym_owner_id is available without a query; the full GymOwner row is only
+    loaded when a view actually needs its fields.
+    """
+
+    def __init__(self, user, gym_owner_id):
+        self.user = user
+        self.gym_owner_id = gym_owner_id
+
+    @property
+    def is_gym_owner(self):
+        return self.gym_owner_id is not None
+
+    @cached_property
+    def gym_owner(self):
+        if self.gym_owner_id is None:
+            return None
+        try:
+            return self.user.gymowner
+        except GymOwner.DoesNotExist:
+            return None
+
+
+def get_tenant(request):
+    """
+    Return the Tenant for a DRF request.
+
+    Set by CachedTokenAuthentication; for other authentication classes
+    (session, JWT) it is resolved here once and memoised on the request.
+    """
+    user = request.user
+    tenant = getattr(request, '_tenant', None)
+    if tenant is None:
+        gym_owner = getattr(user, 'gymowner', None) if user.is_authenticated else None
+        tenant = Tenant(user, gym_owner.pk if gym_owner is not None else None)
+        request._tenant = tenant
+    return tenant
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication backed by a short-TTL cache of
+    token -> (user fields, gym_owner_id, is_active).
+
+    Entries are invalidated on logout and password change; other user edits
+    (e.g. deactivation in the admin) take effect within AUTH_TOKEN_CACHE_TIMEOUT.
+    Without a shared cache (see token_cache_enabled()) every request loads
+    the credentials from the database.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            user, token = result
+            request._tenant = Tenant(user, user._gym_owner_id)
+        return result
+
+    def authenticate_credentials(self, key):
+        if token_cache_enabled():
+            cache_key = auth_token_cache_key(key)
+            entry = cache.get(cache_key)
+            if entry is None:
+                entry = self.load_credentials(key)
+                cache.set(cache_key, entry, AUTH_TOKEN_CACHE_TIMEOUT)
+        else:
+            entry = self.load_credentials(key)
+
+        if not entry['user']['is_active']:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        # from_db() expects values in concrete field order
+        field_names = [f.attname for f in User._meta.concrete_fields if f.attname in entry['user']]
+        user = User.from_db(DEFAULT_DB_ALIAS, field_names, [entry['user'][name] for name in field_names])
+        user._gym_owner_id = entry['gym_owner_id']
+        # Only the key is needed downstream; avoid materialising the Token row
+        return (user, Token(key=key, user_id=user.pk))
+
+    def load_credentials(self, key):
+        try:
+            token = Token.objects.select_related('user').get(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed('Invalid token.')
+
+        gym_owner_id = GymOwner.objects.filter(user_id=token.user_id).values_list('id', flat=True).first()
+        return {
+            'user': {field: getattr(token.user, field) for field in CACHED_USER_FIELDS},
+            'gym_owner_id': gym_owner_id,
+        }
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Stateless authentication with the signed access tokens from
+    issue_access_token(): no Token, User or GymOwner query, only the user's
+    revocation stamp (see access_tokens_revoked_at()), a cache read once warm. request.user carries just id and
+    is_active; other fields load on first access. Bearer credentials that
+    aren't signed access tokens (SimpleJWT) are left to the next class.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != self.keyword.lower().encode() or not signed_tokens_enabled():
+            return None
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed('Invalid token header.')
+        if token.count(':') != 2:
+            return None  # A JWT - never contains ':'
+
+        try:
+            payload = signing.loads(token, salt=ACCESS_TOKEN_SALT, max_age=access_token_lifetime())
+        except signing.SignatureExpired:
+            raise AuthenticationFailed('Access token expired.')
+        except signing.BadSignature:
+            raise AuthenticationFailed('Invalid token.')
+        if payload['iat'] <= access_tokens_revoked_at(payload['u']):
+            raise AuthenticationFailed('Access token revoked.')
+
+        user = User.from_db(DEFAULT_DB_ALIAS, ['id', 'is_active'], [payload['u'], True])
+        request._tenant = Tenant(user, payload['g'])
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
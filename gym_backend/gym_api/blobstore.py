@@ -0,0 +1,147 @@
+"""
+Content-addressed image store for profile pictures.
+
+Images are stored once under a key made from the SHA-256 of their bytes
+plus an extension for the content type (e.g. '3f5c…e1.jpg'), so rows only
+keep the short key and the URL serving a key never changes:
+/api/images/<key> is sent with a year-long immutable Cache-Control.
+Resized derivatives (see imaging.py) are stored next to their original
+as '<sha256>-<name>.webp'.
+
+The backend is chosen by the IMAGE_STORE setting, shaped like CACHES:
+
+    IMAGE_STORE = {
+        'BACKEND': 'gym_api.blobstore.StorageImageStore',
+        'OPTIONS': {'location': '/var/lib/gym/images'},
+    }
+
+- StorageImageStore (default) keeps files in a Django storage -
+  FileSystemStorage under MEDIA_ROOT/images unless OPTIONS names another
+  storage class (any django-storages backend works)
+- DatabaseImageStore keeps the bytes in the ImageBlob table, for hosts
+  whose filesystem does not survive a deploy
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+
+IMAGE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'image/heic': 'heic',
+    'image/heif': 'heif',
+}
+IMAGE_CONTENT_TYPES = {extension: content_type for content_type, extension in IMAGE_EXTENSIONS.items()}
+IMAGE_KEY_PATTERN = r'[0-9a-f]{64}(?:-[a-z]+)?\.(?:%s)' % '|'.join(IMAGE_CONTENT_TYPES)
+
+
+def image_key(data, content_type):
+    """Content address of an image: sha256 hex digest plus extension"""
+    extension = IMAGE_EXTENSIONS.get((content_type or '').lower(), 'jpg')
+    return f'{hashlib.sha256(data).hexdigest()}.{extension}'
+
+
+def image_content_type(key):
+    return IMAGE_CONTENT_TYPES[key.rsplit('.', 1)[1]]
+
+
+def derivative_key(key, name):
+    """Key of one of an original's WebP derivatives, e.g. '3f5c…e1-avatar.webp'"""
+    return f"{key.split('.')[0]}-{name}.webp"
+
+
+class StorageImageStore:
+    """Images as files in a Django storage, sharded by the first digest byte"""
+
+    def __init__(self, location=None, storage=None, **storage_options):
+        storage_class = import_string(storage) if storage else FileSystemStorage
+        if storage_class is FileSystemStorage:
+            storage_options.setdefault('location', location or os.path.join(settings.MEDIA_ROOT, 'images'))
+        self.storage = storage_class(**storage_options)
+
+    @staticmethod
+    def path(key):
+        return f'{key[:2]}/{key}'
+
+    def exists(self, key):
+        return self.storage.exists(self.path(key))
+
+    def save(self, key, data, replace=False):
+        # Same key, same bytes - an existing file is already the right one
+        if self.exists(key):
+            if not replace:
+                return
+            self.storage.delete(self.path(key))
+        self.storage.save(self.path(key), ContentFile(data))
+
+    def open(self, key):
+        """A binary file object for key, or None if it is not stored"""
+        try:
+            return self.storage.open(self.path(key), 'rb')
+        except FileNotFoundError:
+            return None
+
+
+class DatabaseImageStore:
+    """Images as rows of the ImageBlob table"""
+
+    def __init__(self, model=None):
+        if model is None:
+            from .models import ImageBlob as model
+        self.model = model
+
+    def exists(self, key):
+        return self.model.objects.filter(key=key).exists()
+
+    def save(self, key, data, replace=False):
+        try:
+            with transaction.atomic():
+                if replace:
+                    self.model.objects.update_or_create(key=key, defaults={'data': data})
+                else:
+                    self.model.objects.get_or_create(key=key, defaults={'data': data})
+        except IntegrityError:
+            pass  # Stored concurrently by another request
+
+    def open(self, key):
+        data = self.model.objects.filter(key=key).values_list('data', flat=True).first()
+        return None if data is None else BytesIO(bytes(data))
+
+
+@lru_cache(maxsize=None)
+def get_image_store():
+    config = getattr(settings, 'IMAGE_STORE', {})
+    backend = import_string(config.get('BACKEND', 'gym_api.blobstore.StorageImageStore'))
+    return backend(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def _reset_image_store(setting, **kwargs):
+    if setting in ('IMAGE_STORE', 'MEDIA_ROOT'):
+        get_image_store.cache_clear()
+
+
+def store_image(data, content_type, store=None):
+    """Store image bytes (once per distinct content) and return their key"""
+    key = image_key(data, content_type)
+    (store or get_image_store()).save(key, data)
+    return key
+
+
+def image_url(key):
+    """Root-relative, immutable URL of a stored image"""
+    return reverse('image-blob', args=[key])
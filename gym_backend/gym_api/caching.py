@@ -0,0 +1,98 @@
+"""
+Versioned cache helpers for tenant-scoped API responses.
+Cached entries embed a data version in their key, so writes invalidate
+them by bumping the version instead of hunting down individual keys.
+
+Two counters are kept:
+- member data version: bumped by writes touching one member's history
+- gym cache generation: bumped by any write to a gym's data
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+
+MEMBER_HISTORY_CACHE_TIMEOUT = 300  # 5 minutes
+
+# Backends whose entries live inside one process: other workers never see their writes or deletes
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """Whether every worker process reads and writes the same cache (Redis, Memcached, database...)"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def _new_version():
+    """Start versions from the clock so an evicted counter never reuses an old value"""
+    return int(time.time() * 1000)
+
+
+def member_version_key(member_id):
+    return f'member_data_version_{member_id}'
+
+
+def get_member_version(member_id):
+    """Get the current data version for a member, initialising it if missing"""
+    key = member_version_key(member_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key, _new_version())
+    return version
+
+
+def bump_member_version(*member_ids):
+    """Invalidate every versioned cache entry for the given members"""
+    for member_id in member_ids:
+        if member_id is None:
+            continue
+        key = member_version_key(member_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Version not cached yet (or evicted) - start a fresh one
+            cache.set(key, _new_version(), None)
+
+
+def member_history_cache_key(member, kind):
+    """
+    Cache key for a member's history response.
+    Scoped by gym, member and the member's data version; the gym's updated_at
+    is included because the nested gym representation is part of the payload.
+    """
+    gym_stamp = int(member.gym_owner.updated_at.timestamp()) if member.gym_owner.updated_at else 0
+    return (
+        f'member_history_{kind}_{member.gym_owner_id}_{member.id}_'
+        f'{get_member_version(member.id)}_{gym_stamp}'
+    )
+
+
+def gym_generation_key(gym_owner_id):
+    return f'gym_cache_generation_{gym_owner_id}'
+
+
+def get_gym_generation(gym_owner_id):
+    """Get the current cache generation for a gym, initialising it if missing"""
+    key = gym_generation_key(gym_owner_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_version(), None)
+        generation = cache.get(key, _new_version())
+    return generation
+
+
+def bump_gym_generation(gym_owner_id):
+    """Invalidate every generation-keyed cache entry for a gym"""
+    if gym_owner_id is None:
+        return
+    key = gym_generation_key(gym_owner_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
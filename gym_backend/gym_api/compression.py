@@ -0,0 +1,153 @@
+"""
+HTTP response compression codecs and Accept-Encoding negotiation, used by
+gym_api.middleware.CompressionMiddleware.
+
+gzip is always available. Brotli ('br') and Zstandard ('zstd') need the
+optional brotli / zstandard packages and are only offered when those are
+importable. When a client accepts several codings with the same q-value
+the server prefers zstd, then br, then gzip.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Zstandard is optional
+    zstandard = None
+
+
+class GzipCodec:
+    name = 'gzip'
+    default_level = 6
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compressobj(self):
+        return _GzipStream(self.level)
+
+    def compress(self, data):
+        stream = self.compressobj()
+        return stream.compress(data, flush=False) + stream.finish()
+
+
+class _GzipStream:
+
+    def __init__(self, level):
+        # wbits 16 + MAX_WBITS writes a gzip header (with mtime 0, so output is reproducible)
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk, flush=True):
+        data = self._compressor.compress(chunk)
+        return data + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else data
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCodec:
+    name = 'br'
+    default_level = 5  # Quality 0-11; 5 is about gzip -6 speed at a better ratio
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compressobj(self):
+        return _BrotliStream(self.level)
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+
+class _BrotliStream:
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, chunk, flush=True):
+        data = self._compressor.process(chunk)
+        return data + self._compressor.flush() if flush else data
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCodec:
+    name = 'zstd'
+    default_level = 3
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compressobj(self):
+        return _ZstdStream(self.level)
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+
+class _ZstdStream:
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk, flush=True):
+        data = self._compressor.compress(chunk)
+        return data + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else data
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+# Server preference, best first
+CODECS = (ZstdCodec, BrotliCodec, GzipCodec)
+
+
+def available_codecs():
+    """Codec classes whose packages are installed, in server preference order"""
+    installed = {'gzip': True, 'br': brotli is not None, 'zstd': zstandard is not None}
+    return [codec for codec in CODECS if installed[codec.name]]
+
+
+def parse_accept_encoding(header):
+    """{coding: q} for an Accept-Encoding header; malformed q-values count as 0"""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(header, codecs):
+    """
+    The codec class to encode with for an Accept-Encoding header, or None
+    for identity. codecs is in server preference order, which breaks ties.
+    """
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for codec in codecs:
+        quality = accepted.get(codec.name, wildcard)
+        if codec.name == 'gzip':
+            quality = max(quality, accepted.get('x-gzip', 0.0))
+        if quality > best_quality:
+            best, best_quality = codec, quality
+    return best
@@ -0,0 +1,97 @@
+"""
+Row counting strategies for paginated list endpoints.
+
+An exact COUNT(*) over a large tenant often costs more than fetching the
+page itself, so list totals can come from one of three sources:
+- exact: a plain COUNT query
+- cached: an exact count cached under the gym's cache generation, so any
+  write to the gym retires it
+- estimate: the database planner's row estimate (PostgreSQL only), used for
+  unfiltered scans large enough that an approximate total is acceptable
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from .caching import get_gym_generation
+
+
+COUNT_MODE_NONE = 'none'
+COUNT_MODE_EXACT = 'exact'
+COUNT_MODE_CACHED = 'cached'
+COUNT_MODE_ESTIMATE = 'estimate'
+COUNT_MODE_AUTO = 'auto'
+
+COUNT_CACHE_TIMEOUT = 600  # 10 minutes - bounds staleness from bulk updates that skip signals
+ESTIMATE_THRESHOLD = 10000  # Below this an exact count is cheap enough
+
+
+def _query_fingerprint(queryset):
+    sql, params = queryset.order_by().query.sql_with_params()
+    return hashlib.md5(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+
+
+def exact_count(queryset):
+    return queryset.count()
+
+
+def cached_count(queryset, gym_owner_id):
+    """Exact count cached per gym generation and query"""
+    try:
+        fingerprint = _query_fingerprint(queryset)
+    except EmptyResultSet:
+        return 0
+
+    key = f'row_count_{gym_owner_id}_{get_gym_generation(gym_owner_id)}_{fingerprint}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def planner_estimate(queryset):
+    """
+    Row estimate from EXPLAIN, or None when the backend can't provide one.
+    Only PostgreSQL exposes a usable estimate.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset, mode=COUNT_MODE_AUTO, gym_owner_id=None, filtered=True):
+    """
+    Count rows using the requested strategy.
+
+    Returns (count, mode_used). In auto mode, unfiltered scans use the planner
+    estimate once it reaches ESTIMATE_THRESHOLD; everything else gets a cached
+    exact count when the gym is known, or a plain exact count otherwise.
+    Strategies the backend can't serve fall back to the next most precise one.
+    """
+    if mode == COUNT_MODE_EXACT:
+        return exact_count(queryset), COUNT_MODE_EXACT
+
+    if mode == COUNT_MODE_ESTIMATE or (mode == COUNT_MODE_AUTO and not filtered):
+        estimate = planner_estimate(queryset)
+        if estimate is not None and (mode == COUNT_MODE_ESTIMATE or estimate >= ESTIMATE_THRESHOLD):
+            return estimate, COUNT_MODE_ESTIMATE
+
+    if gym_owner_id is not None:
+        return cached_count(queryset, gym_owner_id), COUNT_MODE_CACHED
+    return exact_count(queryset), COUNT_MODE_EXACT
@@ -0,0 +1,100 @@
+"""
+Bookkeeping for deletes of synced and searchable rows.
+
+Delta-sync clients learn about deletes from Tombstone rows, and the search
+documents of deleted members, trainers and equipment have to go. post_delete
+receivers would do both at one INSERT (and one cache write) per row, and
+merely being connected they turn off Django's fast bulk delete, so cascades
+and queryset deletes would load and delete row by row. Delete paths wrap the
+delete in record_deletions() instead:
+
+    with record_deletions(queryset):
+        queryset.delete()
+
+It runs one Collector pass over what the delete will remove, reading just
+(gym_owner_id, pk) - one query per model or fast-deleted queryset - then
+writes every tombstone with one bulk_create, drops the search documents
+with one DELETE per kind and bumps each affected gym's generation once.
+The API's destroy actions and delete_all, the admin (see
+admin.RecordDeletionsMixin) and optimize_database's purge go through it.
+Deletes made elsewhere (the shell, raw SQL) leave no tombstones, and their
+search documents are cleared by rebuild_search_index.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import models, router, transaction
+from django.db.models.deletion import Collector
+
+from .caching import bump_gym_generation
+from .models import (
+    Attendance, Equipment, Member, MembershipPayment, MemberSubscription, Notification, SearchDocument, Tombstone,
+    Trainer,
+)
+from .search import INDEXED_MODELS
+
+
+# Models exposed through ?since= delta sync
+SYNCED_MODELS = (
+    Member, Trainer, Equipment, MembershipPayment, MemberSubscription, Attendance, Notification,
+)
+TRACKED_MODELS = set(SYNCED_MODELS) | set(INDEXED_MODELS)
+PK_BATCH_SIZE = 500
+
+
+def _gym_rows(model, pks):
+    rows = []
+    for start in range(0, len(pks), PK_BATCH_SIZE):
+        rows.extend(
+            model._base_manager.filter(pk__in=pks[start:start + PK_BATCH_SIZE]).values_list('gym_owner_id', 'pk')
+        )
+    return rows
+
+
+def collect_deleted_rows(objs):
+    """
+    {model: [(gym_owner_id, pk), ...]} for the synced or indexed rows that
+    deleting objs - an instance or a queryset - would remove, cascades included
+    """
+    if isinstance(objs, models.Model):
+        model, objs = type(objs), [objs]
+    else:
+        model = objs.model
+    collector = Collector(using=router.db_for_write(model), origin=objs)
+    collector.collect(objs)
+
+    rows = defaultdict(list)
+    for collected_model, instances in collector.data.items():
+        if collected_model in TRACKED_MODELS:
+            # Cascaded instances are loaded with only their key columns
+            rows[collected_model].extend(_gym_rows(collected_model, [instance.pk for instance in instances]))
+    for queryset in collector.fast_deletes:
+        if queryset.model in TRACKED_MODELS:
+            rows[queryset.model].extend(queryset.values_list('gym_owner_id', 'pk'))
+    return rows
+
+
+def record_deleted_rows(rows):
+    """Tombstones, search document removal and generation bumps for collect_deleted_rows() output"""
+    Tombstone.objects.bulk_create([
+        Tombstone(gym_owner_id=gym_owner_id, model=model._meta.label_lower, object_id=pk)
+        for model in SYNCED_MODELS
+        for gym_owner_id, pk in rows.get(model, ())
+        if gym_owner_id is not None
+    ], batch_size=PK_BATCH_SIZE)
+    for model, kind in INDEXED_MODELS.items():
+        pks = [pk for _, pk in rows.get(model, ())]
+        for start in range(0, len(pks), PK_BATCH_SIZE):
+            SearchDocument.objects.filter(kind=kind, object_id__in=pks[start:start + PK_BATCH_SIZE]).delete()
+    for gym_owner_id in {gym_owner_id for model_rows in rows.values() for gym_owner_id, _ in model_rows}:
+        bump_gym_generation(gym_owner_id)
+
+
+@contextmanager
+def record_deletions(objs):
+    """Record what deleting objs removes - the delete itself runs in the with block"""
+    with transaction.atomic():
+        rows = collect_deleted_rows(objs)
+        yield
+        record_deleted_rows(rows)
@@ -0,0 +1,129 @@
+"""
+Sparse fieldsets: prune a serializer to the fields a client asked for and
+derive the matching queryset projection, so the database only reads the
+columns that will actually be rendered.
+
+?fields=a,b,c   keep only these top-level fields
+?expand=x,y     render these nested relations in full; other nested
+                relations are collapsed to their primary key
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def parse_field_list(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def _nested_serializer(field):
+    """The nested Serializer behind a field (single or many), or None"""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child if isinstance(field.child, serializers.BaseSerializer) else None
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def prune_serializer(serializer, fields=None, expand=None):
+    """
+    Drop unrequested fields from a serializer instance in place and collapse
+    unexpanded nested serializers to primary keys. Unknown names raise a
+    ValidationError so typos don't silently return empty objects.
+    """
+    available = serializer.fields
+    requested = set(fields) if fields else set(available)
+    expand = set(expand or ())
+
+    unknown = (requested | expand) - set(available)
+    if unknown:
+        raise serializers.ValidationError({'fields': f'Unknown field(s): {", ".join(sorted(unknown))}'})
+
+    for name in list(available):
+        field = available[name]
+        if name not in requested:
+            del available[name]
+        elif name not in expand and _nested_serializer(field) is not None:
+            many = isinstance(field, serializers.ListSerializer)
+            available[name] = serializers.PrimaryKeyRelatedField(
+                read_only=True, many=many, source=field.source if field.source != name else None,
+            )
+
+    serializer.sparse_fieldset = (tuple(sorted(requested)), tuple(sorted(expand)))
+    return serializer
+
+
+def _display_source(model, attr):
+    """Map get_<field>_display sources back to their field"""
+    if attr.startswith('get_') and attr.endswith('_display'):
+        try:
+            return model._meta.get_field(attr[len('get_'):-len('_display')])
+        except FieldDoesNotExist:
+            return None
+    return None
+
+
+def _project(serializer, model, prefix, projection):
+    only, select_related, prefetch_related = projection
+    dependencies = getattr(serializer, 'sparse_field_dependencies', {})
+    only.add(prefix + model._meta.pk.name)
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        if name in dependencies:
+            for path in dependencies[name]:
+                only.add(prefix + path)
+                if '__' in path:
+                    select_related.add(prefix + path.rsplit('__', 1)[0])
+            continue
+
+        if field.source == '*':
+            return False  # Computed from the whole object - dependencies unknown
+
+        attr = field.source_attrs[0]
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            model_field = _display_source(model, attr)
+            if model_field is None:
+                return False  # Property or method without declared dependencies
+            only.add(prefix + model_field.name)
+            continue
+
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch_related.add(prefix + attr)
+            continue
+
+        if model_field.is_relation:
+            if not model_field.concrete:
+                return False  # Reverse one-to-one - no local column to select
+            nested = _nested_serializer(field)
+            if nested is not None:
+                select_related.add(prefix + attr)
+                if not _project(nested, model_field.related_model, f'{prefix}{attr}__', projection):
+                    return False
+            elif len(field.source_attrs) > 1:
+                select_related.add(prefix + attr)
+                only.add(f'{prefix}{attr}__{field.source_attrs[1]}')
+            else:
+                only.add(prefix + attr)
+            continue
+
+        only.add(prefix + attr)
+    return True
+
+
+def get_projection(serializer, model):
+    """
+    Work out (only, select_related, prefetch_related) for rendering the
+    serializer's fields, or None when some field reads attributes that
+    can't be mapped to columns - the caller should then load full rows.
+    """
+    projection = (set(), set(), set())
+    if not _project(serializer, model, '', projection):
+        return None
+    # Relations followed with select_related can't themselves be deferred
+    projection[0].update(projection[1])
+    return projection
@@ -1,20 +1,169 @@
 """
 Google OAuth 2.0 authentication for gym management system
+
+ID tokens are verified locally, once, against every supported client ID.
+Google's signing certificates are cached in-process for as long as their
+Cache-Control allows and fetched early only when a token names a key id the
+cache doesn't have (Google publishes new keys before signing with them).
+Calls to Google share one pooled keep-alive session with connect/read
+timeouts, and a Google account's profile picture is downloaded in the
+background (see imaging.run_after_commit) - sign-in never waits on it.
 """
-import json
+import logging
 import os
+import re
+import threading
+import time
+from functools import lru_cache
+
 import requests
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
+from google.auth import exceptions as google_exceptions, jwt
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from .authentication import access_token_fields
+from .caching import bump_gym_generation
+from .imaging import run_after_commit, store_profile_picture
 from .models import GymOwner
 from .serializers import GymOwnerSerializer
 
 
+logger = logging.getLogger(__name__)
+
+# Google endpoints; a setting of the same name overrides each (tests point them at a local stand-in)
+GOOGLE_URLS = {
+    'GOOGLE_CERTS_URL': 'https://www.googleapis.com/oauth2/v1/certs',
+    'GOOGLE_TOKEN_URL': 'https://oauth2.googleapis.com/token',
+    'GOOGLE_USERINFO_URL': 'https://www.googleapis.com/oauth2/v2/userinfo',
+}
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+# Platform-specific client IDs accepted besides the configured one - web first, most requests come from web
+KNOWN_CLIENT_IDS = (
+    '818835282138-qjqc6v2bf8n89ghrphh9l388erj5vt5g.apps.googleusercontent.com',  # Web
+    '818835282138-8h3qf505eco222l28feg0o1t3tvu0v8g.apps.googleusercontent.com',  # Mobile
+)
+
+MAX_PROFILE_PICTURE_BYTES = 5 * 1024 * 1024
+
+_max_age = re.compile(r'max-age=(\d+)')
+
+
+def google_url(name):
+    return getattr(settings, name, None) or GOOGLE_URLS[name]
+
+
+def google_timeout():
+    """(connect, read) timeout in seconds for calls to Google"""
+    return getattr(settings, 'GOOGLE_HTTP_TIMEOUT', (3.05, 10))
+
+
+@lru_cache(maxsize=None)
+def google_http():
+    """Keep-alive session shared by every call to Google; idempotent GETs retry once on 5xx or a dropped connection"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_maxsize=getattr(settings, 'GOOGLE_HTTP_POOL_SIZE', 10),
+        max_retries=Retry(total=1, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods={'GET'}),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def supported_client_ids():
+    """Client IDs accepted as ID token audience: the configured one, then the known web and mobile apps"""
+    client_ids = []
+    for client_id in (os.getenv('GOOGLE_OAUTH2_CLIENT_ID'), getattr(settings, 'GOOGLE_OAUTH2_CLIENT_ID', None), *KNOWN_CLIENT_IDS):
+        if client_id and client_id not in client_ids:
+            client_ids.append(client_id)
+    return client_ids
+
+
+class GoogleCertificates:
+    """Google's ID token signing certificates by key id, cached per process"""
+    
+    default_max_age = 3600
+    # Least time between fetches forced by unknown key ids, so made-up ids can't hammer Google
+    min_refresh_interval = 60
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        self._certs = {}
+        self._expires = 0.0
+        self._fetched = None
+    
+    def get(self, key_id=None):
+        """{key id: PEM certificate}, fetched first if stale or if key_id is not in it"""
+        certs = self._certs
+        if time.monotonic() < self._expires and (key_id is None or key_id in certs):
+            return certs
+        with self._lock:
+            now = time.monotonic()
+            missing = key_id is not None and key_id not in self._certs
+            if now >= self._expires or (missing and now - self._fetched >= self.min_refresh_interval):
+                self._fetch(now)
+            return self._certs
+    
+    def _fetch(self, now):
+        self._fetched = now
+        try:
+            response = google_http().get(google_url('GOOGLE_CERTS_URL'), timeout=google_timeout())
+            response.raise_for_status()
+            certs = response.json()
+        except (requests.RequestException, ValueError) as e:
+            if not self._certs:
+                raise
+            # Keep verifying with the certificates we have and try again later
+            logger.warning('Could not refresh Google certificates: %s', e)
+            self._expires = now + self.min_refresh_interval
+            return
+        match = _max_age.search(response.headers.get('Cache-Control', ''))
+        self._certs = certs
+        self._expires = now + (int(match.group(1)) if match else self.default_max_age)
+
+
+google_certificates = GoogleCertificates()
+
+
+@receiver(setting_changed)
+def _reset_google_clients(setting, **kwargs):
+    if setting == 'GOOGLE_CERTS_URL':
+        google_certificates.clear()
+    elif setting == 'GOOGLE_HTTP_POOL_SIZE':
+        google_http.cache_clear()
+
+
+def download_profile_picture(gym_owner_id, url):
+    """Make a Google account picture the gym owner's profile picture, unless they set one meanwhile"""
+    try:
+        with google_http().get(url, timeout=google_timeout(), stream=True) as response:
+            response.raise_for_status()
+            data = response.raw.read(MAX_PROFILE_PICTURE_BYTES + 1, decode_content=True)
+            content_type = response.headers.get('Content-Type', 'image/jpeg').split(';')[0].strip()
+    except requests.RequestException as e:
+        logger.warning('Could not download Google profile picture for gym owner %s: %s', gym_owner_id, e)
+        return
+    if not data or len(data) > MAX_PROFILE_PICTURE_BYTES:
+        logger.warning('Ignoring Google profile picture of %d bytes for gym owner %s', len(data), gym_owner_id)
+        return
+    key = store_profile_picture(data, content_type)
+    if GymOwner.objects.filter(pk=gym_owner_id, profile_picture_key='').update(
+        profile_picture_key=key, updated_at=timezone.now(),
+    ):
+        bump_gym_generation(gym_owner_id)
+
+
 class GoogleAuthService:
     """Service for handling Google OAuth authentication"""
     
@@ -24,92 +173,25 @@ class GoogleAuthService:
         Verify Google ID token and return user info
         Supports both web and mobile client IDs for cross-platform compatibility
         """
+        client_ids = supported_client_ids()
         try:
-            print(f"🔐 GOOGLE_AUTH: Verifying token with length: {len(google_token)}")
-            
-            # Define all supported client IDs for cross-platform authentication
-            supported_client_ids = []
-            
-            # Get primary client ID from environment
-            primary_client_id = os.getenv('GOOGLE_OAUTH2_CLIENT_ID')
-            if primary_client_id:
-                supported_client_ids.append(primary_client_id)
-                print(f"🔧 GOOGLE_AUTH: Added primary client ID from env: {primary_client_id[:20]}...")
-            
-            # Get from Django settings as fallback
-            try:
-                settings_client_id = getattr(settings, 'GOOGLE_OAUTH2_CLIENT_ID', None)
-                if settings_client_id and settings_client_id not in supported_client_ids:
-                    supported_client_ids.append(settings_client_id)
-                    print(f"🔧 GOOGLE_AUTH: Added settings client ID: {settings_client_id[:20]}...")
-            except Exception as e:
-                print(f"🔧 GOOGLE_AUTH: Django settings error: {e}")
-            
-            # Add known platform-specific client IDs for cross-platform support
-            # Web client ID first since most requests are from web platform
-            known_client_ids = [
-                '818835282138-qjqc6v2bf8n89ghrphh9l388erj5vt5g.apps.googleusercontent.com',  # Web
-                '818835282138-8h3qf505eco222l28feg0o1t3tvu0v8g.apps.googleusercontent.com',  # Mobile
-            ]
-            
-            for client_id in known_client_ids:
-                if client_id not in supported_client_ids:
-                    supported_client_ids.append(client_id)
-                    print(f"🔧 GOOGLE_AUTH: Added known client ID: {client_id[:20]}...")
-            
-            if not supported_client_ids:
-                print("❌ GOOGLE_AUTH: No valid client IDs found")
-                return None
-            
-            print(f"🔑 GOOGLE_AUTH: Attempting verification with {len(supported_client_ids)} client IDs")
-            print(f"🔑 GOOGLE_AUTH: Token starts with: {google_token[:50]}...")
-            
-            # Try verification with each supported client ID
-            verification_errors = []
-            for i, client_id in enumerate(supported_client_ids):
-                try:
-                    print(f"🔍 GOOGLE_AUTH: Attempt {i+1}/{len(supported_client_ids)} with client ID: {client_id[:20]}...")
-                    
-                    # Verify the token with Google
-                    idinfo = id_token.verify_oauth2_token(
-                        google_token, 
-                        google_requests.Request(), 
-                        client_id
-                    )
-                    
-                    print(f"✅ GOOGLE_AUTH: Token verification successful with client ID: {client_id[:20]}...")
-                    print(f"✅ GOOGLE_AUTH: Verified user: {idinfo.get('email')}")
-                    
-                    # Token is valid, return user info
-                    return {
-                        'email': idinfo.get('email'),
-                        'first_name': idinfo.get('given_name', ''),
-                        'last_name': idinfo.get('family_name', ''),
-                        'picture': idinfo.get('picture', ''),
-                        'email_verified': idinfo.get('email_verified', False),
-                        'google_id': idinfo.get('sub'),
-                        'verified_with_client_id': client_id,
-                    }
-                except ValueError as e:
-                    error_msg = str(e)
-                    verification_errors.append(f"Client {client_id[:20]}...: {error_msg}")
-                    print(f"❌ GOOGLE_AUTH: Client ID {client_id[:20]}... failed: {error_msg}")
-                    continue
-                except Exception as e:
-                    error_msg = str(e)
-                    verification_errors.append(f"Client {client_id[:20]}...: {error_msg}")
-                    print(f"❌ GOOGLE_AUTH: Client ID {client_id[:20]}... error: {error_msg}")
-                    continue
-            
-            # All client IDs failed
-            print(f"❌ GOOGLE_AUTH: All {len(supported_client_ids)} client IDs failed verification")
-            for error in verification_errors:
-                print(f"   - {error}")
-            return None
-            
-        except Exception as e:
-            print(f"❌ GOOGLE_AUTH: Unexpected error during token verification: {e}")
+            key_id = jwt.decode_header(google_token).get('kid')
+            idinfo = jwt.decode(google_token, certs=google_certificates.get(key_id), audience=client_ids)
+            if idinfo.get('iss') not in GOOGLE_ISSUERS:
+                raise ValueError(f"Wrong issuer {idinfo.get('iss')}")
+        except (ValueError, TypeError, google_exceptions.GoogleAuthError, requests.RequestException) as e:
+            logger.warning('Google ID token verification failed: %s', e)
             return None
+        
+        return {
+            'email': idinfo.get('email'),
+            'first_name': idinfo.get('given_name', ''),
+            'last_name': idinfo.get('family_name', ''),
+            'picture': idinfo.get('picture', ''),
+            'email_verified': idinfo.get('email_verified', False),
+            'google_id': idinfo.get('sub'),
+            'verified_with_client_id': idinfo.get('aud'),
+        }
     
     @staticmethod
     def authenticate_or_create_user(google_user_info):
@@ -129,18 +211,8 @@ class GoogleAuthService:
                 gym_owner = user.gymowner
                 
                 # Only set Google profile picture if user doesn't have a custom one
-                if google_user_info.get('picture') and not gym_owner.profile_picture_base64:
-                    try:
-                        import requests
-                        import base64
-                        response = requests.get(google_user_info['picture'])
-                        if response.status_code == 200:
-                            img_data = base64.b64encode(response.content).decode('utf-8')
-                            gym_owner.profile_picture_base64 = img_data
-                            gym_owner.profile_picture_content_type = "image/jpeg"
-                            gym_owner.save()
-                    except Exception as e:
-                        pass
+                if google_user_info.get('picture') and not gym_owner.profile_picture_key:
+                    run_after_commit(download_profile_picture, gym_owner.pk, google_user_info['picture'])
                 
                 # Generate or get auth token
                 token, created = Token.objects.get_or_create(user=user)
@@ -174,19 +246,9 @@ class GoogleAuthService:
                     gym_established_date=None,  # Will be set automatically
                 )
                 
-                # Download and store Google profile picture as base64 for new users
+                # Store the Google profile picture in the image store for new users, in the background
                 if google_user_info.get('picture'):
-                    try:
-                        import requests
-                        import base64
-                        response = requests.get(google_user_info['picture'])
-                        if response.status_code == 200:
-                            img_data = base64.b64encode(response.content).decode('utf-8')
-                            gym_owner.profile_picture_base64 = img_data
-                            gym_owner.profile_picture_content_type = "image/jpeg"
-                            gym_owner.save()
-                    except Exception as e:
-                        pass
+                    run_after_commit(download_profile_picture, gym_owner.pk, google_user_info['picture'])
                 
                 # Generate auth token
                 token = Token.objects.create(user=user)
@@ -327,6 +389,7 @@ def handle_google_auth(token_or_request, user_data=None):
             'last_name': auth_result['user'].last_name,
         },
         'gym_owner': gym_owner_serializer.data,
+        **access_token_fields(auth_result['user'].id, auth_result['gym_owner'].id),
         'is_new_user': is_new_user,
         'needs_profile_completion': auth_result.get('needs_profile_completion', False),
         'message': message
@@ -3,7 +3,7 @@ Health check and monitoring utilities for enterprise deployment.
 """
 
 from django.http import JsonResponse
-from django.db import connections
+from django.db import connections, models
 from django.core.cache import cache
 from django.conf import settings
 import time
@@ -200,7 +200,19 @@ def metrics_endpoint(request):
         # Database connection metrics
         db_connections = len(connections.all())
         metrics.append(f'gym_db_connections {db_connections}')
-        
+
+        # Per-endpoint API metrics collected by RequestMetricsMiddleware - sums are
+        # counters (_total), high-water marks such as max_ms are gauges
+        from gym_api.instrumentation import GAUGE_STATS, endpoint_metrics
+        samples = {}
+        for endpoint, stats in sorted(endpoint_metrics().items()):
+            for name, value in stats.items():
+                samples.setdefault(name, []).append((endpoint, value))
+        for name, values in samples.items():
+            metric, kind = (f'gym_api_{name}', 'gauge') if name in GAUGE_STATS else (f'gym_api_{name}_total', 'counter')
+            metrics.append(f'# TYPE {metric} {kind}')
+            metrics.extend(f'{metric}{{endpoint="{endpoint}"}} {value}' for endpoint, value in values)
+
         # Response
         response_content = '\n'.join(metrics) + '\n'
         
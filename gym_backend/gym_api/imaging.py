@@ -0,0 +1,170 @@
+"""
+Derivative pipeline for uploaded profile pictures.
+
+Each stored original (see blobstore.py) gets fixed-size WebP derivatives,
+saved in the same image store under '<sha256>-<name>.webp':
+- avatar: 128px, what list endpoints reference
+- detail: 512px, profile and member detail screens
+- full: 1600px, the largest size ever shown
+
+The upload is decoded once (JPEGs straight at reduced scale) and every size
+is resized from the previous, larger one. Processing runs on a small
+in-process worker pool after the upload's transaction commits, so requests
+never wait for it; until a derivative exists its URL serves the original.
+Each original is queued at most once at a time, and one that can't be
+decoded (HEIC, a truncated upload) is marked in the cache and not queued
+again for FAILURE_CACHE_TIMEOUT - its derivative URLs keep serving it.
+The process_images management command runs the same pipeline in bulk.
+Other profile picture work that shouldn't hold up a request (fetching a
+Google account's picture at sign-in) uses the same pool via
+run_after_commit().
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .blobstore import IMAGE_CONTENT_TYPES, derivative_key, get_image_store, store_image
+
+
+logger = logging.getLogger(__name__)
+
+# Largest first - each derivative is resized from the one before it
+DERIVATIVES = (('full', 1600), ('detail', 512), ('avatar', 128))
+WEBP_QUALITY = 80
+FAILURE_CACHE_TIMEOUT = 60 * 60 * 24  # seconds before an image that failed is tried again
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()  # Originals queued or being processed
+_pending_lock = threading.Lock()
+
+
+def render_derivatives(data):
+    """{name: WebP bytes} for every derivative of one image"""
+    with Image.open(BytesIO(data)) as image:
+        largest = DERIVATIVES[0][1]
+        image.draft('RGB', (largest, largest))  # JPEG decodes at the smallest scale that still covers it
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    derivatives = {}
+    for name, size in DERIVATIVES:
+        image.thumbnail((size, size), Image.LANCZOS)  # In place, never upscales
+        buffer = BytesIO()
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+        derivatives[name] = buffer.getvalue()
+    return derivatives
+
+
+def process_image(key, store=None, force=False):
+    """Create the missing derivatives of a stored image; True if any were written"""
+    store = store or get_image_store()
+    if not force and all(store.exists(derivative_key(key, name)) for name, _ in DERIVATIVES):
+        return False
+    original = store.open(key)
+    if original is None:
+        return False
+    with original:
+        data = original.read()
+    for name, payload in render_derivatives(data).items():
+        store.save(derivative_key(key, name), payload, replace=force)
+    return True
+
+
+def find_original(key):
+    """The stored original a derivative key was made from, if any"""
+    digest = key.split('-')[0].split('.')[0]
+    store = get_image_store()
+    for extension in IMAGE_CONTENT_TYPES:
+        original = f'{digest}.{extension}'
+        if store.exists(original):
+            return original
+    return None
+
+
+def failure_cache_key(key):
+    return f'image_derivatives_failed_{key}'
+
+
+def derivatives_failed(key):
+    """Whether creating key's derivatives failed recently"""
+    return cache.get(failure_cache_key(key)) is not None
+
+
+def _claim(key):
+    """Mark key as in flight; False if it already is"""
+    with _pending_lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+        return True
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_WORKERS', 2), thread_name_prefix='gym-images',
+            )
+        return _executor
+
+
+def _process(key):
+    try:
+        process_image(key)
+    except Exception:
+        logger.exception('Could not create derivatives of image %s', key)
+        cache.set(failure_cache_key(key), True, FAILURE_CACHE_TIMEOUT)
+    finally:
+        with _pending_lock:
+            _pending.discard(key)
+
+
+def _in_worker(function, *args):
+    try:
+        function(*args)
+    finally:
+        connections.close_all()  # Worker threads own their database connections
+
+
+def run_after_commit(function, *args):
+    """Call function(*args) on the worker pool once the current transaction commits"""
+    if not getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+        function(*args)
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_in_worker, function, *args))
+
+
+def schedule_derivatives(key):
+    """
+    Create key's derivatives in the background once the current transaction
+    commits - unless they are already queued or recently failed
+    """
+    if key in _pending or derivatives_failed(key):
+        return
+    if not getattr(settings, 'IMAGE_DERIVATIVES_ASYNC', True):
+        if _claim(key):
+            _process(key)
+        return
+
+    def submit():
+        if _claim(key):
+            _get_executor().submit(_in_worker, _process, key)
+
+    transaction.on_commit(submit)
+
+
+def store_profile_picture(data, content_type):
+    """Store an uploaded picture and queue its derivatives; returns the original's key"""
+    key = store_image(data, content_type)
+    schedule_derivatives(key)
+    return key
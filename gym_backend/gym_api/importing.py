@@ -0,0 +1,270 @@
+"""
+Bulk member import from CSV / XLSX files.
+
+Creating members one at a time through MemberSerializer costs a User lookup,
+a User insert, a GymOwner lookup and Member.save()'s member_id probing per
+row. import_members() instead works in chunks:
+- rows are validated with a single MemberImportRowSerializer
+- emails are compared case-insensitively, within the file and against
+  existing users (one query per chunk)
+- users and members are written with bulk_create, with member_ids
+  preallocated from the gym's highest existing MEM-#### number
+- bulk_create skips model signals, so cache generations and the search
+  index are updated explicitly per chunk
+Row-level problems are reported back instead of aborting the import.
+"""
+
+import csv
+import io
+import re
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from rest_framework import serializers
+
+from .caching import bump_gym_generation
+from .models import GymOwner, Member
+from .search import index_objects
+from .serializers import MemberImportRowSerializer
+
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000  # Keeps the API response bounded for badly broken files
+
+_MEMBER_ID_RE = re.compile(r'^MEM-(\d+)$')
+
+
+class ImportResult:
+    """Outcome of an import: rows created and per-row errors"""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def _normalize_header(name):
+    return re.sub(r'\W+', '_', str(name or '').strip().lower()).strip('_')
+
+
+def _clean_cell(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)  # Spreadsheet phone numbers arrive as floats
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _rows(header, records):
+    """Yield (row_number, data) with blank cells dropped so field defaults apply"""
+    columns = [_normalize_header(name) for name in header]
+    for row_number, record in records:
+        data = {
+            column: _clean_cell(value)
+            for column, value in zip(columns, record)
+            if column and value not in (None, '')
+        }
+        if data:
+            yield row_number, data
+
+
+def read_csv(file):
+    # Decoded up front so an encoding problem fails before anything is written
+    try:
+        text = file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise serializers.ValidationError({'file': 'CSV files must be UTF-8 encoded.'})
+    reader = csv.reader(io.StringIO(text, newline=''))
+    header = next(reader, [])
+    # Row numbers as a spreadsheet shows them - the header is row 1
+    return _rows(header, enumerate(reader, start=2))
+
+
+def read_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise serializers.ValidationError({'file': 'XLSX import requires the openpyxl package.'})
+
+    sheet = load_workbook(file, read_only=True, data_only=True).active
+    records = sheet.iter_rows(values_only=True)
+    header = next(records, ())
+    return _rows(header, enumerate(records, start=2))
+
+
+def read_member_rows(file, filename):
+    """Parse an uploaded import file into (row_number, data) pairs"""
+    name = (filename or '').lower()
+    if name.endswith('.xlsx'):
+        return read_xlsx(file)
+    if name.endswith('.csv'):
+        return read_csv(file)
+    raise serializers.ValidationError({'file': 'Unsupported file type - upload a .csv or .xlsx file.'})
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _next_member_number(gym_owner):
+    """The number after the gym's highest MEM-#### id"""
+    highest = 0
+    for member_id in Member.objects.filter(gym_owner=gym_owner, member_id__startswith='MEM-').values_list('member_id', flat=True):
+        match = _MEMBER_ID_RE.match(member_id)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest + 1
+
+
+def _existing_users(emails):
+    """
+    email -> (user, has_member) for users matching by email or username,
+    ignoring case; emails must be lower-case
+    """
+    existing = {}
+    users = User.objects.annotate(email_lower=Lower('email'), username_lower=Lower('username')).filter(
+        Q(email_lower__in=emails) | Q(username_lower__in=emails)
+    ).values_list(
+        'id', 'username', 'email', 'first_name', 'last_name', 'member__id',
+    )
+    for user_id, username, email, first_name, last_name, member_id in users:
+        user = User(pk=user_id, username=username, email=email, first_name=first_name, last_name=last_name)
+        for key in {email.lower(), username.lower()} & emails:
+            existing[key] = (user, member_id is not None)
+    return existing
+
+
+def _validate_chunk(chunk, validator, seen_emails, result):
+    valid = []
+    for row_number, data in chunk:
+        try:
+            row = validator.run_validation(data)
+        except serializers.ValidationError as exc:
+            result.add_error(row_number, exc.detail)
+            continue
+        email = row['email'].lower()
+        if email in seen_emails:
+            result.add_error(row_number, {'email': ['Duplicate email in this file.']})
+            continue
+        seen_emails.add(email)
+        valid.append((row_number, row))
+    return valid
+
+
+def _already_member_error(email):
+    return {'email': [f'A member with email {email} already exists.']}
+
+
+def _write_chunk(gym_owner, rows, next_number):
+    """
+    Create users and members for validated rows.
+    Returns (members created, row errors, next free member number).
+    """
+    existing = _existing_users({row['email'] for _, row in rows})
+
+    errors = []
+    new_users = []
+    members = []
+    for row_number, row in rows:
+        row = dict(row)
+        email = row.pop('email')
+        first_name = row.pop('first_name')
+        last_name = row.pop('last_name')
+        if email in existing:
+            user, has_member = existing[email]
+            if has_member:
+                errors.append((row_number, _already_member_error(email)))
+                continue
+        else:
+            user = User(
+                username=email, email=email, first_name=first_name, last_name=last_name,
+                password=make_password(None),
+            )
+            new_users.append(user)
+
+        members.append(Member(gym_owner=gym_owner, user=user, member_id=f'MEM-{next_number:04d}', **row))
+        next_number += 1
+
+    User.objects.bulk_create(new_users)
+    if any(user.pk is None for user in new_users):
+        # Backends without RETURNING support (MySQL) - look the ids up in one query
+        ids = dict(User.objects.filter(username__in=[user.username for user in new_users]).values_list('username', 'id'))
+        for user in new_users:
+            user.pk = ids[user.username]
+
+    Member.objects.bulk_create(members)
+    index_objects(members)
+    return len(members), errors, next_number
+
+
+def import_members(gym_owner, rows, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+    """
+    Import (row_number, data) pairs as members of gym_owner.
+
+    Each chunk is committed on its own, so a database error only fails the
+    rows of that chunk. With dry_run=True rows are validated and checked for
+    duplicates, but nothing is written.
+    """
+    result = ImportResult()
+    validator = MemberImportRowSerializer()
+    seen_emails = set()
+    next_number = None
+
+    for chunk in _chunks(rows, chunk_size):
+        valid = _validate_chunk(chunk, validator, seen_emails, result)
+        if not valid:
+            continue
+
+        if dry_run:
+            existing = _existing_users({row['email'] for _, row in valid})
+            for row_number, row in valid:
+                if existing.get(row['email'], (None, False))[1]:
+                    result.add_error(row_number, _already_member_error(row['email']))
+                else:
+                    result.created += 1
+            continue
+
+        try:
+            with transaction.atomic():
+                # Serialises concurrent imports into the same gym while ids are allocated
+                GymOwner.objects.select_for_update().values_list('pk', flat=True).get(pk=gym_owner.pk)
+                if next_number is None:
+                    next_number = _next_member_number(gym_owner)
+                created, errors, next_number = _write_chunk(gym_owner, valid, next_number)
+        except IntegrityError as exc:
+            next_number = None  # Re-read after whatever collided
+            for row_number, _ in valid:
+                result.add_error(row_number, {'non_field_errors': [f'Could not be saved: {exc}']})
+        else:
+            result.created += created
+            for row_number, row_errors in errors:
+                result.add_error(row_number, row_errors)
+        bump_gym_generation(gym_owner.pk)
+
+    return result
@@ -0,0 +1,192 @@
+"""
+Per-request API instrumentation.
+
+Collects serialization time, render time, bytes on the wire (and before
+compression, with the time spent compressing), rows serialized, database
+query count and bytes read from the database for each API request (see
+gym_api.middleware.RequestMetricsMiddleware), without rendering anything
+twice. Each request is written as one JSON log line on the 'gym_api.metrics'
+logger and folded into in-process per-endpoint aggregates
+(see endpoint_metrics()).
+"""
+
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+
+logger = logging.getLogger('gym_api.metrics')
+
+_current_metrics = ContextVar('gym_api_request_metrics', default=None)
+
+# Endpoint stats that are high-water marks rather than monotonic sums
+GAUGE_STATS = ('max_ms',)
+
+_aggregates = {}
+_aggregates_lock = threading.Lock()
+
+
+class RequestMetrics:
+    """Counters for a single request"""
+
+    def __init__(self):
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.db_bytes = 0
+        self.rows = 0
+        self.bytes = 0
+        self.raw_bytes = 0
+        self.compress_ms = 0.0
+        self.encoding = ''
+        self.total_ms = 0.0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+            if not many:
+                self._count_fetched(context['cursor'])
+
+    def _count_fetched(self, cursor):
+        # Results are fetched after execute() returns, through the same cursor.
+        # A reused cursor is wrapped on its first execute() only, or every
+        # later query would count its rows once more per earlier one.
+        if getattr(cursor, '_gym_api_counted', False):
+            return
+        cursor._gym_api_counted = True
+
+        def counted(fetch, single=False):
+            def wrapper(*args):
+                result = fetch(*args)
+                if result:
+                    self.db_bytes += sum(map(row_bytes, (result,) if single else result))
+                return result
+            return wrapper
+
+        cursor.fetchone = counted(cursor.fetchone, single=True)
+        cursor.fetchmany = counted(cursor.fetchmany)
+        cursor.fetchall = counted(cursor.fetchall)
+
+
+def row_bytes(row):
+    """Approximate size of a fetched row: text and binary lengths, 8 bytes per other non-null value"""
+    size = 0
+    for value in row:
+        if isinstance(value, (str, bytes, bytearray, memoryview)):
+            size += len(value)
+        elif value is not None:
+            size += 8
+    return size
+
+
+def activate(metrics):
+    """Make metrics the current request's collector; returns a reset token"""
+    return _current_metrics.set(metrics)
+
+
+def deactivate(token):
+    _current_metrics.reset(token)
+
+
+def current_metrics():
+    return _current_metrics.get()
+
+
+def record_serialization(seconds, rows):
+    """Attribute serializer work to the current request, if it is instrumented"""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.serialize_ms += seconds * 1000
+        metrics.rows += rows
+
+
+class TimedDataMixin:
+    """Times the first evaluation of serializer.data"""
+
+    @property
+    def data(self):
+        started = time.perf_counter()
+        data = super().data
+        if not getattr(self, '_data_timed', False):
+            self._data_timed = True
+            record_serialization(time.perf_counter() - started, len(data) if isinstance(data, list) else 1)
+        return data
+
+
+@lru_cache(maxsize=None)
+def _timed_class(serializer_class):
+    # Keep the original name - representation cache keys are built from it
+    return type(serializer_class.__name__, (TimedDataMixin, serializer_class), {
+        '__module__': serializer_class.__module__,
+        '__qualname__': serializer_class.__qualname__,
+    })
+
+
+def instrument_serializer(serializer):
+    """Make serializer.data report its serialization time and row count"""
+    if not isinstance(serializer, TimedDataMixin):
+        serializer.__class__ = _timed_class(type(serializer))
+    return serializer
+
+
+def _aggregate(endpoint, metrics, status_code):
+    with _aggregates_lock:
+        stats = _aggregates.setdefault(endpoint, {
+            'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'serialize_ms': 0.0, 'render_ms': 0.0, 'db_ms': 0.0,
+            'queries': 0, 'db_bytes': 0, 'rows': 0, 'bytes': 0, 'raw_bytes': 0, 'compress_ms': 0.0,
+        })
+        stats['requests'] += 1
+        stats['errors'] += status_code >= 500
+        stats['total_ms'] += metrics.total_ms
+        stats['max_ms'] = max(stats['max_ms'], metrics.total_ms)
+        stats['serialize_ms'] += metrics.serialize_ms
+        stats['render_ms'] += metrics.render_ms
+        stats['db_ms'] += metrics.db_ms
+        stats['queries'] += metrics.queries
+        stats['db_bytes'] += metrics.db_bytes
+        stats['rows'] += metrics.rows
+        stats['bytes'] += metrics.bytes
+        stats['raw_bytes'] += metrics.raw_bytes
+        stats['compress_ms'] += metrics.compress_ms
+
+
+def record_request(endpoint, path, status_code, metrics):
+    """Log one finished request and fold it into the endpoint aggregates"""
+    _aggregate(endpoint, metrics, status_code)
+    logger.info(json.dumps({
+        'event': 'api_request',
+        'endpoint': endpoint,
+        'path': path,
+        'status': status_code,
+        'total_ms': round(metrics.total_ms, 2),
+        'serialize_ms': round(metrics.serialize_ms, 2),
+        'render_ms': round(metrics.render_ms, 2),
+        'db_ms': round(metrics.db_ms, 2),
+        'queries': metrics.queries,
+        'db_bytes': metrics.db_bytes,
+        'rows': metrics.rows,
+        'bytes': metrics.bytes,
+        'raw_bytes': metrics.raw_bytes,
+        'compress_ms': round(metrics.compress_ms, 2),
+        'encoding': metrics.encoding or 'identity',
+    }))
+
+
+def endpoint_metrics():
+    """Snapshot of the per-endpoint aggregates collected by this process"""
+    with _aggregates_lock:
+        return {endpoint: dict(stats) for endpoint, stats in _aggregates.items()}
+
+
+def reset_endpoint_metrics():
+    with _aggregates_lock:
+        _aggregates.clear()
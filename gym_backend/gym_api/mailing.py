@@ -0,0 +1,123 @@
+"""
+Batched email dispatch for notifications to gym owners.
+
+send_mail() opens a new connection to the mail server for every message
+and raises on the first failure. send_messages() instead splits the
+messages into batches of EMAIL_DISPATCH_BATCH_SIZE and sends each batch over
+one reused backend connection, with at most EMAIL_DISPATCH_WORKERS batches
+in flight. Messages that fail with a transient error (a dropped connection,
+a 4xx reply) are retried up to EMAIL_DISPATCH_RETRIES times with
+exponential backoff; permanent rejections (5xx) are not. Every message gets
+a Delivery recording whether it was sent, after how many attempts, and the
+last error, so one bad address never stops the rest.
+
+Any EMAIL_BACKEND works - SMTP in production, locmem in tests, console
+during development. EMAIL_TIMEOUT bounds how long a slow server can hold a
+worker.
+"""
+
+import logging
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+
+logger = logging.getLogger(__name__)
+
+# The connection is gone - retry the rest of the batch over a new one
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class Delivery:
+    """Outcome of sending one message"""
+
+    def __init__(self, message):
+        self.message = message
+        self.sent = False
+        self.attempts = 0
+        self.error = None
+
+    @property
+    def recipients(self):
+        return self.message.recipients()
+
+    def as_dict(self):
+        return {
+            'recipients': self.recipients,
+            'subject': self.message.subject,
+            'sent': self.sent,
+            'attempts': self.attempts,
+            'error': self.error,
+        }
+
+
+def is_permanent_failure(exc):
+    """5xx replies (unknown mailbox, rejected sender) fail the same way on every retry"""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+
+def _send_batch(deliveries, retries, retry_delay):
+    connection = get_connection(fail_silently=False)
+    pending = deliveries
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+        failed = []
+        try:
+            connection.open()
+        except Exception as exc:  # Server unreachable - the whole batch waits for the next attempt
+            for delivery in pending:
+                delivery.attempts += 1
+                delivery.error = str(exc)
+            connection.close()
+            continue
+
+        for index, delivery in enumerate(pending):
+            delivery.attempts += 1
+            try:
+                delivery.sent = bool(connection.send_messages([delivery.message]))
+                delivery.error = None
+            except Exception as exc:
+                delivery.error = str(exc)
+                if not is_permanent_failure(exc):
+                    failed.append(delivery)
+                if isinstance(exc, CONNECTION_ERRORS):
+                    failed.extend(pending[index + 1:])  # Not attempted - they go out over the next connection
+                    break
+        connection.close()
+        pending = failed
+        if not pending:
+            break
+    return deliveries
+
+
+def send_messages(messages, workers=None, batch_size=None, retries=None, retry_delay=None):
+    """Send EmailMessages in batches over reused connections; returns a Delivery per message"""
+    workers = workers or getattr(settings, 'EMAIL_DISPATCH_WORKERS', 2)
+    batch_size = batch_size or getattr(settings, 'EMAIL_DISPATCH_BATCH_SIZE', 50)
+    retries = getattr(settings, 'EMAIL_DISPATCH_RETRIES', 2) if retries is None else retries
+    retry_delay = getattr(settings, 'EMAIL_DISPATCH_RETRY_DELAY', 1.0) if retry_delay is None else retry_delay
+
+    deliveries = [Delivery(message) for message in messages]
+    batches = [deliveries[start:start + batch_size] for start in range(0, len(deliveries), batch_size)]
+    if workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gym-mail') as executor:
+            list(executor.map(lambda batch: _send_batch(batch, retries, retry_delay), batches))
+    else:
+        for batch in batches:
+            _send_batch(batch, retries, retry_delay)
+
+    for delivery in deliveries:
+        if delivery.sent:
+            logger.info('Email "%s" sent to %s', delivery.message.subject, ', '.join(delivery.recipients))
+        else:
+            logger.error(
+                'Email "%s" to %s failed after %d attempts: %s', delivery.message.subject,
+                ', '.join(delivery.recipients), delivery.attempts, delivery.error,
+            )
+    return deliveries
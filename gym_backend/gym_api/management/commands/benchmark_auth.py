@@ -0,0 +1,90 @@
+"""
+Management command to micro-benchmark the authentication classes: time and
+database queries per authenticated request for DRF's TokenAuthentication,
+CachedTokenAuthentication (warm cache), SimpleJWT when installed, and
+SignedTokenAuthentication. Signed tokens are measured both with the token
+cache and as production runs them on its process-local cache, where
+revocations come from each process's periodically reloaded copy. The test
+user and gym are created inside a transaction that is rolled back.
+"""
+
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from gym_api.authentication import CachedTokenAuthentication, SignedTokenAuthentication, get_tenant, issue_access_token
+from gym_api.models import GymOwner
+
+try:
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import RefreshToken
+except ImportError:
+    JWTAuthentication = None
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request time and queries of the authentication classes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Authentications per class')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), override_settings(SIGNED_TOKEN_AUTH=True):
+                user = User.objects.create(username='benchmark-owner@example.com')
+                gym_owner = GymOwner.objects.create(
+                    user=user, gym_name='Benchmark Gym', gym_address='-', phone_number='0000000000',
+                    gym_established_date=date(2020, 1, 1),
+                )
+                token = Token.objects.create(user=user).key
+                access_token = f'Bearer {issue_access_token(user.id, gym_owner.id)}'
+                benchmarks = [
+                    (TokenAuthentication(), f'Token {token}', {}),
+                    (CachedTokenAuthentication(), f'Token {token}', {}),
+                ]
+                if JWTAuthentication is not None:
+                    benchmarks.append(
+                        (JWTAuthentication(), f'Bearer {RefreshToken.for_user(user).access_token}', {}),
+                    )
+                benchmarks.append((SignedTokenAuthentication(), access_token, {}))
+                # No shared cache, as in production
+                benchmarks.append((SignedTokenAuthentication(), access_token, {'AUTH_TOKEN_CACHE': False}))
+
+                for authenticator, header, overrides in benchmarks:
+                    with override_settings(**overrides):
+                        self.report(authenticator, header, options['requests'], overrides)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def report(self, authenticator, header, requests, overrides):
+        factory = APIRequestFactory()
+
+        def authenticate():
+            request = Request(factory.get('/', HTTP_AUTHORIZATION=header))
+            request.user, request.auth = authenticator.authenticate(request)
+            get_tenant(request)  # Every gym-scoped view resolves the tenant
+
+        authenticate()  # Warm caches
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(requests):
+                authenticate()
+            elapsed = time.perf_counter() - started
+        name = type(authenticator).__name__ + (' (no shared cache)' if overrides else '')
+        self.stdout.write(
+            f'{name:<46} {elapsed / requests * 1e6:8.1f} us/request  '
+            f'{len(queries) / requests:4.1f} queries/request'
+        )
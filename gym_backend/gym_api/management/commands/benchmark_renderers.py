@@ -0,0 +1,64 @@
+"""
+Management command to benchmark response rendering on the largest list
+payloads (full payment, attendance and subscription serializers): DRF's
+stock JSONRenderer against FastJSONRenderer and, when msgpack is
+installed, MessagePackRenderer. Reports render time and body size.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from gym_api.models import Attendance, MembershipPayment, MemberSubscription
+from gym_api.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from gym_api.serializers import AttendanceSerializer, MembershipPaymentSerializer, MemberSubscriptionSerializer
+
+from .benchmark_serializers import Rollback, create_benchmark_rows
+
+
+PAYLOADS = (
+    ('payments', MembershipPaymentSerializer, MembershipPayment, ('member__user', 'subscription_plan', 'gym_owner')),
+    ('attendance', AttendanceSerializer, Attendance, ('member__user', 'gym_owner')),
+    ('subscriptions', MemberSubscriptionSerializer, MemberSubscription, ('member__user', 'subscription_plan', 'gym_owner')),
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare render time and size of the JSON and MessagePack renderers on large responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per payload')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per renderer; the best is reported')
+
+    def handle(self, *args, **options):
+        renderers = [('json', JSONRenderer()), ('orjson', FastJSONRenderer())]
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+
+        try:
+            with transaction.atomic():
+                gym_owner = create_benchmark_rows(options['rows'])
+                for name, serializer_class, model, related in PAYLOADS:
+                    queryset = model.objects.filter(gym_owner=gym_owner).select_related(*related)
+                    data = {'results': serializer_class(queryset, many=True).data}
+                    self.report(name, data, renderers, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def report(self, name, data, renderers, repeat):
+        baseline = None
+        for label, renderer in renderers:
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = renderer.render(data)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            baseline = baseline or (best, len(body))
+            self.stdout.write(
+                f'{name:<14} {label:<8} {best * 1000:8.1f} ms {baseline[0] / best:5.1f}x  '
+                f'{len(body) / 1024:8.1f} KB {100 * (1 - len(body) / baseline[1]):5.1f}% smaller'
+            )
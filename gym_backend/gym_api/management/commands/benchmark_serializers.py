@@ -0,0 +1,133 @@
+"""
+Management command to micro-benchmark the list serializers: the regular
+instance path (.only() rows, ModelSerializer dispatch) against the
+.values() projection path, reported per 1k rows. Test rows are written
+to a throwaway gym inside a transaction that is rolled back.
+"""
+
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from gym_api.fieldsets import get_projection
+from gym_api.models import (
+    Attendance, Equipment, GymOwner, Member, MembershipPayment, MemberSubscription, SubscriptionPlan,
+)
+from gym_api.projection import project_queryset
+from gym_api.serializers import (
+    AttendanceListSerializer, EquipmentListSerializer, MemberListSerializer, MemberSubscriptionListSerializer,
+    MembershipPaymentListSerializer,
+)
+
+
+BENCHMARKS = (
+    (MemberListSerializer, Member),
+    (EquipmentListSerializer, Equipment),
+    (MembershipPaymentListSerializer, MembershipPayment),
+    (AttendanceListSerializer, Attendance),
+    (MemberSubscriptionListSerializer, MemberSubscription),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_benchmark_rows(rows):
+    """A throwaway gym with `rows` members, equipment, payments, check-ins and subscriptions"""
+    owner = User.objects.create(username='benchmark-owner@example.com')
+    gym_owner = GymOwner.objects.create(
+        user=owner, gym_name='Benchmark Gym', gym_address='-', phone_number='0000000000',
+        gym_established_date=date(2020, 1, 1),
+    )
+    plan = SubscriptionPlan.objects.create(
+        gym_owner=gym_owner, name='Monthly', description='-', price='30.00', duration_value=1,
+    )
+    today = date.today()
+    now = timezone.now()
+
+    users = User.objects.bulk_create([
+        User(username=f'benchmark{i}@example.com', email=f'benchmark{i}@example.com',
+             first_name='Bench', last_name=f'Member {i}')
+        for i in range(rows)
+    ])
+    members = Member.objects.bulk_create([
+        Member(
+            gym_owner=gym_owner, user=user, member_id=f'MEM-{i:04d}', phone='8888888888',
+            date_of_birth=date(1990, 1, 1), address='-', membership_expiry=today + timedelta(days=i % 60),
+            emergency_contact_name='-', emergency_contact_phone='7777777777', height_cm=170, weight_kg=70,
+        )
+        for i, user in enumerate(users)
+    ])
+    Equipment.objects.bulk_create([
+        Equipment(
+            gym_owner=gym_owner, name=f'Machine {i}', equipment_type='cardio', brand='Brand',
+            purchase_date=date(2023, 1, 1), warranty_expiry=today + timedelta(days=i % 90 - 30),
+            equipment_id=f'EQ-{i:04d}',
+        )
+        for i in range(rows)
+    ])
+    MembershipPayment.objects.bulk_create([
+        MembershipPayment(
+            gym_owner=gym_owner, member=member, subscription_plan=plan, amount='30.00', payment_date=now,
+            payment_method='upi', membership_months=1, payment_id=f'PAY-{i:04d}',
+        )
+        for i, member in enumerate(members)
+    ])
+    Attendance.objects.bulk_create([
+        Attendance(
+            gym_owner=gym_owner, member=member, date=today, check_in_time=now - timedelta(hours=1),
+            check_out_time=now, attendance_id=f'BENCH-{gym_owner.pk}-{i}',
+        )
+        for i, member in enumerate(members)
+    ])
+    MemberSubscription.objects.bulk_create([
+        MemberSubscription(
+            gym_owner=gym_owner, member=member, subscription_plan=plan, subscription_id=f'SUB-{i:04d}',
+            start_date=today, end_date=today + timedelta(days=30), amount_paid='30.00',
+        )
+        for i, member in enumerate(members)
+    ])
+    return gym_owner
+
+
+class Command(BaseCommand):
+    help = 'Compare instance and .values() projection serialization of the list serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per model')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        try:
+            with transaction.atomic():
+                gym_owner = create_benchmark_rows(rows)
+                for serializer_class, model in BENCHMARKS:
+                    self.report(serializer_class, model.objects.filter(gym_owner=gym_owner), rows, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def time(self, serializer_class, queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serializer_class(queryset.all(), many=True).data
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def report(self, serializer_class, queryset, rows, repeat):
+        only, select_related, _ = get_projection(serializer_class(), queryset.model)
+        instances = self.time(serializer_class, queryset.select_related(*select_related).only(*only), repeat)
+        projected = self.time(serializer_class, project_queryset(queryset, serializer_class()), repeat)
+        per_1k = 1000 / rows * 1000
+        self.stdout.write(
+            f'{serializer_class.__name__:<34} instances {instances * per_1k:7.1f} ms/1k  '
+            f'values {projected * per_1k:7.1f} ms/1k  {instances / projected:4.1f}x'
+        )
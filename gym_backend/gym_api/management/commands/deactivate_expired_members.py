@@ -1,12 +1,84 @@
+"""
+Management command to deactivate members whose membership has expired and
+notify their gym owners.
+
+Members are deactivated per gym in chunks: each chunk locks up to
+--chunk-size expired member ids and flips them with one UPDATE, so the run
+costs a few queries per chunk instead of a full-row save() per member.
+Gyms can be processed in parallel with --workers (not on SQLite, which
+has a single writer). Set-based updates skip Member.save() and its
+signals, so member versions and gym generations are bumped here, and the
+in-app notifications are written with one bulk_create. Owner emails are
+sent through gym_api.mailing over reused connections.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage
 from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.db.models import Count
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.conf import settings
-from gym_api.models import Member, GymOwner, Notification, get_ist_date
-import logging
+
+from gym_api.caching import bump_gym_generation, bump_member_version
+from gym_api.mailing import send_messages
+from gym_api.models import GymOwner, Member, Notification, get_ist_date
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 500
+NAMED_MEMBERS = 3  # Members named in the in-app notification
+
+
+def expired_members(today, gym_owner_id=None):
+    queryset = Member.objects.filter(membership_expiry__lt=today, is_active=True)
+    if gym_owner_id is not None:
+        queryset = queryset.filter(gym_owner_id=gym_owner_id)
+    return queryset
+
+
+def deactivate_gym_members(gym_owner_id, today, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Deactivate one gym's expired members chunk by chunk; returns (deactivated ids, chunks)"""
+    expired = expired_members(today, gym_owner_id).order_by('pk')
+    deactivated = []
+    chunks = 0
+    while True:
+        with transaction.atomic():
+            # Locked, so the ids are exactly the rows the UPDATE changes
+            ids = list(expired.select_for_update().values_list('pk', flat=True)[:chunk_size])
+            if ids:
+                Member.objects.filter(pk__in=ids).update(is_active=False, updated_at=timezone.now())
+        if not ids:
+            break
+        bump_member_version(*ids)
+        deactivated.extend(ids)
+        chunks += 1
+    if deactivated:
+        bump_gym_generation(gym_owner_id)
+    return deactivated, chunks
+
+
+def _deactivate_in_worker(gym_owner_id, today, chunk_size):
+    try:
+        return deactivate_gym_members(gym_owner_id, today, chunk_size)
+    finally:
+        connections.close_all()  # Worker threads own their database connections
+
+
+def load_members(ids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Members with just their names and expiry, in id order"""
+    members = []
+    for start in range(0, len(ids), chunk_size):
+        members.extend(
+            Member.objects.filter(pk__in=ids[start:start + chunk_size]).select_related('user')
+            .only('membership_expiry', 'gym_owner_id', 'user__first_name', 'user__last_name').order_by('pk')
+        )
+    return members
+
+
 class Command(BaseCommand):
     help = 'Deactivate members with expired memberships and send notifications'
 
@@ -21,109 +93,141 @@ class Command(BaseCommand):
             action='store_true',
             help='Send email notifications to gym owners',
         )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Members deactivated per UPDATE',
+        )
+        parser.add_argument('--workers', type=int, default=1, help='Gyms processed in parallel')
 
     def handle(self, *args, **options):
         today = get_ist_date()
         dry_run = options['dry_run']
         send_notifications = options['send_notifications']
-        
+        chunk_size = options['chunk_size']
+        started = time.perf_counter()
+
         if dry_run:
             self.stdout.write(self.style.WARNING('🔍 DRY RUN MODE - No changes will be made'))
-        
-        # Find all expired members who are still active
-        expired_members = Member.objects.filter(
-            membership_expiry__lt=today,
-            is_active=True
-        ).select_related('user', 'gym_owner')
-        
-        total_expired = expired_members.count()
-        self.stdout.write(f'📊 Found {total_expired} expired members to process')
-        
-        # Group by gym owner for notifications
-        gym_owner_notifications = {}
-        deactivated_count = 0
-        
-        for member in expired_members:
-            gym_owner = member.gym_owner
-            days_expired = (today - member.membership_expiry).days
-            
-            self.stdout.write(
-                f'👤 Member: {member.user.get_full_name()} '
-                f'(Gym: {gym_owner.gym_name}) - '
-                f'Expired {days_expired} days ago'
-            )
-            
-            if not dry_run:
-                # Deactivate the member
-                member.is_active = False
-                member.save()
-                deactivated_count += 1
-                
-                # Log the deactivation
-                logger.info(f'Deactivated expired member: {member.user.get_full_name()} (ID: {member.id})')
-            
-            # Prepare notification data
-            if gym_owner.id not in gym_owner_notifications:
-                gym_owner_notifications[gym_owner.id] = {
-                    'gym_owner': gym_owner,
-                    'expired_members': []
-                }
-            
-            gym_owner_notifications[gym_owner.id]['expired_members'].append({
-                'member': member,
-                'days_expired': days_expired
-            })
-        
-        # Create in-app notifications and send email notifications to gym owners
-        if gym_owner_notifications:
-            self.stdout.write(f'📧 Processing notifications for {len(gym_owner_notifications)} gym owners')
-            
-            for gym_data in gym_owner_notifications.values():
-                # Create in-app notification
-                if not dry_run:
-                    expired_members_list = [data['member'] for data in gym_data['expired_members']]
-                    Notification.create_member_expiry_notification(
-                        gym_data['gym_owner'], expired_members_list
-                    )
-                    self.stdout.write(f'✅ Created in-app notification for {gym_data["gym_owner"].gym_name}')
-                
-                # Send email notification if requested
-                if send_notifications:
-                    self._send_expiration_notification(gym_data, dry_run)
-        
-        # Summary
+
+        expired_per_gym = dict(
+            expired_members(today).order_by().values_list('gym_owner_id').annotate(count=Count('pk'))
+        )
+        total_expired = sum(expired_per_gym.values())
+        self.stdout.write(f'📊 Found {total_expired} expired members in {len(expired_per_gym)} gyms')
+        if not expired_per_gym:
+            return
+
+        gym_owners = GymOwner.objects.select_related('user').only(
+            'gym_name', 'user__email', 'user__first_name', 'user__last_name',
+        ).in_bulk(list(expired_per_gym))
+
         if dry_run:
+            for gym_owner_id, count in expired_per_gym.items():
+                self.stdout.write(f'🏋️ {gym_owners[gym_owner_id].gym_name}: would deactivate {count} members')
+            if send_notifications:
+                self._send_expiration_notifications([
+                    self._gym_data(
+                        gym_owners[gym_owner_id],
+                        load_members(list(expired_members(today, gym_owner_id).values_list('pk', flat=True)), chunk_size),
+                        today,
+                    )
+                    for gym_owner_id in expired_per_gym
+                ], dry_run)
             self.stdout.write(
                 self.style.SUCCESS(
                     f'✅ DRY RUN COMPLETE: Would deactivate {total_expired} expired members'
                 )
             )
-        else:
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'✅ COMPLETE: Deactivated {deactivated_count} expired members'
-                )
+            return
+
+        deactivated, chunks = self._deactivate(
+            list(expired_per_gym), today, chunk_size, options['workers'], options['verbosity'],
+        )
+        deactivated = {gym_owner_id: ids for gym_owner_id, ids in deactivated.items() if ids}
+        deactivated_count = sum(len(ids) for ids in deactivated.values())
+        elapsed = time.perf_counter() - started
+        for gym_owner_id, ids in deactivated.items():
+            logger.info(f'Deactivated {len(ids)} expired members of gym {gym_owner_id}')
+
+        # Create in-app notifications and send email notifications to gym owners
+        if deactivated:
+            self.stdout.write(f'📧 Processing notifications for {len(deactivated)} gym owners')
+            named = {}
+            named_ids = [member_id for ids in deactivated.values() for member_id in ids[:NAMED_MEMBERS]]
+            for member in load_members(named_ids, chunk_size):
+                named.setdefault(member.gym_owner_id, []).append(member)
+            Notification.objects.bulk_create([
+                Notification.member_expiry_notification(gym_owners[gym_owner_id], named[gym_owner_id], len(ids))
+                for gym_owner_id, ids in deactivated.items()
+            ])
+            for gym_owner_id in deactivated:
+                bump_gym_generation(gym_owner_id)  # bulk_create skips the post_save bump
+            self.stdout.write(f'✅ Created in-app notifications for {len(deactivated)} gyms')
+
+            if send_notifications:
+                self._send_expiration_notifications([
+                    self._gym_data(gym_owners[gym_owner_id], load_members(ids, chunk_size), today)
+                    for gym_owner_id, ids in deactivated.items()
+                ], dry_run)
+
+        # Summary
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ COMPLETE: Deactivated {deactivated_count} expired members in {chunks} chunks, '
+                f'{elapsed:.2f}s ({deactivated_count / elapsed if elapsed else 0:.0f} members/s)'
             )
-    
-    def _send_expiration_notification(self, gym_data, dry_run):
-        """Send email notification to gym owner about expired members"""
+        )
+
+    def _deactivate(self, gym_owner_ids, today, chunk_size, workers, verbosity):
+        """{gym_owner_id: deactivated ids} and the total number of chunks"""
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite has a single writer - parallel chunk transactions fail with 'database is locked'
+            self.stdout.write(self.style.WARNING('⚠️  SQLite can\'t write in parallel, ignoring --workers'))
+            workers = 1
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    lambda gym_owner_id: _deactivate_in_worker(gym_owner_id, today, chunk_size), gym_owner_ids,
+                ))
+        else:
+            results = [deactivate_gym_members(gym_owner_id, today, chunk_size) for gym_owner_id in gym_owner_ids]
+
+        deactivated = {}
+        total_chunks = 0
+        for gym_owner_id, (ids, chunks) in zip(gym_owner_ids, results):
+            deactivated[gym_owner_id] = ids
+            total_chunks += chunks
+            if verbosity > 1:
+                self.stdout.write(f'🏋️ Gym {gym_owner_id}: deactivated {len(ids)} members in {chunks} chunks')
+        return deactivated, total_chunks
+
+    @staticmethod
+    def _gym_data(gym_owner, members, today):
+        return {
+            'gym_owner': gym_owner,
+            'expired_members': [
+                {'member': member, 'days_expired': (today - member.membership_expiry).days} for member in members
+            ],
+        }
+
+    def _expiration_email(self, gym_data):
+        """Email to a gym owner about their expired members, None without an address"""
         gym_owner = gym_data['gym_owner']
         expired_members = gym_data['expired_members']
-        
+
         if not gym_owner.user.email:
             self.stdout.write(
                 self.style.WARNING(f'⚠️  No email for gym owner: {gym_owner.gym_name}')
             )
-            return
-        
+            return None
+
         # Prepare email content
         subject = f'🚨 Expired Memberships Alert - {gym_owner.gym_name}'
-        
+
         member_list = '\n'.join([
             f'• {data["member"].user.get_full_name()} - Expired {data["days_expired"]} days ago'
             for data in expired_members
         ])
-        
+
         message = f"""
 Dear {gym_owner.user.get_full_name()},
 
@@ -144,25 +248,27 @@ You can reactivate members by:
 Best regards,
 Gym Management System
         """.strip()
-        
+
+        return EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [gym_owner.user.email])
+
+    def _send_expiration_notifications(self, gym_data_list, dry_run):
+        """Email every gym owner about their expired members over shared connections"""
+        emails = [email for email in map(self._expiration_email, gym_data_list) if email is not None]
+
         if dry_run:
-            self.stdout.write(f'📧 Would send email to: {gym_owner.user.email}')
-            self.stdout.write(f'📧 Subject: {subject}')
-        else:
-            try:
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[gym_owner.user.email],
-                    fail_silently=False,
-                )
-                self.stdout.write(
-                    self.style.SUCCESS(f'📧 Email sent to: {gym_owner.user.email}')
-                )
-                logger.info(f'Expiration notification sent to {gym_owner.user.email}')
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'❌ Failed to send email to {gym_owner.user.email}: {e}')
-                )
-                logger.error(f'Failed to send expiration notification: {e}')
\ No newline at end of file
+            for email in emails:
+                self.stdout.write(f'📧 Would send email to: {email.to[0]}')
+                self.stdout.write(f'📧 Subject: {email.subject}')
+            return
+
+        deliveries = send_messages(emails)
+        for delivery in deliveries:
+            if delivery.sent:
+                self.stdout.write(self.style.SUCCESS(f'📧 Email sent to: {delivery.message.to[0]}'))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'❌ Failed to send email to {delivery.message.to[0]} '
+                    f'after {delivery.attempts} attempts: {delivery.error}'
+                ))
+        sent = sum(delivery.sent for delivery in deliveries)
+        self.stdout.write(f'📧 Sent {sent} of {len(deliveries)} emails')
@@ -0,0 +1,54 @@
+"""
+Management command to bulk import members from a CSV or XLSX export,
+e.g. when onboarding a gym from another system.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from gym_api.importing import IMPORT_CHUNK_SIZE, import_members, read_member_rows
+from gym_api.models import GymOwner
+
+
+class Command(BaseCommand):
+    help = 'Bulk import members for a gym from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with one member per row')
+        parser.add_argument(
+            '--gym-owner',
+            type=int,
+            required=True,
+            help='Id of the gym owner to import members into',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Rows validated and written per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file without creating anything',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            gym_owner = GymOwner.objects.get(pk=options['gym_owner'])
+        except GymOwner.DoesNotExist:
+            raise CommandError(f"Gym owner {options['gym_owner']} does not exist")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_members(
+                    gym_owner, read_member_rows(file, options['path']),
+                    chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                )
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {result.created} members, {result.failed} rows failed'))
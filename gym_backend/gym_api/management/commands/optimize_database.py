@@ -134,7 +134,8 @@ class Command(BaseCommand):
         self.stdout.write('Cleaning up old data...')
         
         try:
-            from gym_api.models import Attendance, MembershipPayment
+            from gym_api.deletion import record_deletions
+            from gym_api.models import Attendance, MembershipPayment, Tombstone
             
             # Clean up old attendance records (older than 2 years)
             old_date = timezone.now().date() - timedelta(days=730)
@@ -143,7 +144,19 @@ class Command(BaseCommand):
             
             if count > 0:
                 self.stdout.write(f'  Removing {count} old attendance records...')
-                old_attendance.delete()
+                # Tombstones, so delta-sync clients drop the rows too
+                with record_deletions(old_attendance):
+                    old_attendance.delete()
+            
+            # Drop tombstones past the delta sync retention window
+            old_tombstones = Tombstone.objects.filter(
+                deleted_at__lt=timezone.now() - timedelta(days=Tombstone.RETENTION_DAYS)
+            )
+            count = old_tombstones.count()
+            
+            if count > 0:
+                self.stdout.write(f'  Removing {count} expired sync tombstones...')
+                old_tombstones.delete()
             
             # Clean up old payment records (keep for accounting, just mark as archived)
             old_payments = MembershipPayment.objects.filter(
@@ -0,0 +1,47 @@
+"""
+Management command to create the WebP derivatives (see gym_api.imaging) of
+every stored profile picture. Run after deploying the derivative pipeline,
+and with --force after changing derivative sizes or quality.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from gym_api.imaging import process_image
+from gym_api.models import GymOwner, Member
+
+
+def _process(key, force):
+    try:
+        return key, process_image(key, force=force), None
+    except Exception as exc:
+        return key, False, exc
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Create missing profile picture derivatives (avatar, detail, full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-create derivatives that already exist')
+        parser.add_argument('--workers', type=int, default=4, help='Images processed in parallel')
+
+    def handle(self, *args, **options):
+        keys = set()
+        for model in (GymOwner, Member):
+            keys.update(model.objects.exclude(profile_picture_key='').values_list('profile_picture_key', flat=True))
+
+        processed = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for key, written, error in executor.map(lambda key: _process(key, options['force']), sorted(keys)):
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f'{key}: {error}')
+                processed += written
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} of {len(keys)} images ({len(keys) - processed - failed} up to date, {failed} failed)'
+        ))
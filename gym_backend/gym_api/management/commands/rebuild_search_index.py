@@ -0,0 +1,26 @@
+"""
+Management command to (re)build the member/trainer/equipment search index.
+Run after deploying the search index migration, and after bulk updates that
+bypass model signals (queryset.update(), raw SQL imports).
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gym_api.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index for members, trainers and equipment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gym-owner',
+            type=int,
+            help='Only rebuild documents for this gym owner id',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_index(gym_owner_id=options['gym_owner'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} search documents'))
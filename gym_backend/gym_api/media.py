@@ -0,0 +1,151 @@
+"""
+Streaming file responses for media files served by Django
+(see gym_api.middleware.ServeMediaMiddleware).
+
+serve_file() stats the file once, answers conditional requests
+(If-None-Match / If-Modified-Since, If-Match / If-Unmodified-Since) from
+that stat, and streams the body without reading it into memory - whole
+files through FileResponse, so WSGI servers with wsgi.file_wrapper
+(gunicorn) can sendfile() them, single byte ranges through a bounded
+reader. When a front proxy is configured with MEDIA_SENDFILE_HEADER
+('X-Accel-Redirect' for nginx, 'X-Sendfile' for Apache/lighttpd), only
+headers are sent and the proxy streams the file and handles ranges.
+
+Files whose names carry a content hash (image store keys, manifest-style
+'name.<hash>.ext') never change, so they get a year-long immutable
+Cache-Control.
+"""
+
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+IMAGE_CACHE_CONTROL = 'public, max-age=3600'
+CHUNK_SIZE = 64 * 1024
+
+_content_hash = re.compile(r'(?:^|[.\-_])[0-9a-f]{12,}(?:[.\-_]|$)')
+_byte_range = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def is_content_hashed(path):
+    return _content_hash.search(os.path.basename(path)) is not None
+
+
+def file_etag(stat_result):
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range 'bytes=' header, None to send
+    the whole file (no, multiple or malformed ranges), or False when the
+    range can't be satisfied
+    """
+    match = _byte_range.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _if_range_passes(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag  # Strong comparison only
+    modified = parse_http_date_safe(if_range)
+    return modified is not None and int(mtime) <= modified
+
+
+def _read_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, relative_path=None, cache_control=None):
+    """
+    Response for the file at path (already resolved and checked to be
+    inside its root). relative_path is what the sendfile proxy is given
+    after MEDIA_ACCEL_REDIRECT_PREFIX.
+    """
+    try:
+        stat_result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Media file not found')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('Media file not found')
+
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding or not content_type:
+        content_type = 'application/octet-stream'  # e.g. .csv.gz - served as stored, not as Content-Encoding
+    if cache_control is None:
+        if is_content_hashed(path):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        elif content_type.startswith('image/'):
+            cache_control = IMAGE_CACHE_CONTROL
+    etag = file_etag(stat_result)
+    headers = {'ETag': etag, 'Last-Modified': http_date(stat_result.st_mtime), 'Accept-Ranges': 'bytes'}
+    if cache_control:
+        headers['Cache-Control'] = cache_control
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat_result.st_mtime))
+    if conditional is not None:
+        for name, value in headers.items():
+            conditional.headers.setdefault(name, value)
+        return conditional
+
+    sendfile_header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if sendfile_header:
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header.lower() == 'x-accel-redirect':
+            prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            response[sendfile_header] = prefix + (relative_path or os.path.basename(path)).lstrip('/')
+        else:
+            response[sendfile_header] = path
+    else:
+        size = stat_result.st_size
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size) if _if_range_passes(
+            request, etag, stat_result.st_mtime) else None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response['Content-Length'] = str(size)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(open(path, 'rb'), start, end - start + 1), status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -1,67 +1,205 @@
 """
-Custom middleware for serving media files in production
+Custom middleware for serving media files in production, for
+instrumenting API requests and for compressing responses
 """
-import os
-from django.http import HttpResponse, Http404
+from contextlib import ExitStack
+from django.http import Http404
 from django.conf import settings
-from django.utils.http import http_date
-from django.views.static import serve
-import mimetypes
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+import re
 import time
 
+from . import compression, instrumentation
+from .media import serve_file
+
 class ServeMediaMiddleware:
     """
-    Custom middleware to serve media files in production
-    Railway doesn't persist files between deployments, but this ensures
-    files uploaded during the current session are accessible
+    Serve media files in production. Railway has no separate media server;
+    files are streamed by gym_api.media.serve_file (conditional requests,
+    byte ranges, optional X-Accel-Redirect/X-Sendfile offload).
     """
-    
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         # Check if this is a media file request
-        if request.path.startswith(settings.MEDIA_URL):
+        if request.path.startswith(settings.MEDIA_URL) and request.method in ('GET', 'HEAD'):
             return self.serve_media(request)
-        
-        response = self.get_response(request)
-        return response
+        return self.get_response(request)
 
     def serve_media(self, request):
-        """
-        Serve media files directly
-        """
+        relative_path = request.path[len(settings.MEDIA_URL):]
+        try:
+            file_path = safe_join(settings.MEDIA_ROOT, relative_path)
+        except SuspiciousFileOperation:
+            raise Http404("Media file not found")
+        return serve_file(request, file_path, relative_path=relative_path)
+
+class RequestMetricsMiddleware:
+    """
+    Record timing, size, row and query metrics for API requests.
+    Keep it near the top of MIDDLEWARE so the body it measures is the one
+    that goes on the wire.
+    """
+
+    path_prefix = '/api/'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(self.path_prefix):
+            return self.get_response(request)
+
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.activate(metrics)
+        started = time.perf_counter()
         try:
-            # Get the file path relative to MEDIA_URL
-            relative_path = request.path[len(settings.MEDIA_URL):]
-            file_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-            
-            print(f"📁 Serving media file: {file_path}")
-            
-            # Check if file exists
-            if not os.path.exists(file_path):
-                print(f"❌ Media file not found: {file_path}")
-                raise Http404("Media file not found")
-            
-            # Get file info
-            file_size = os.path.getsize(file_path)
-            content_type, _ = mimetypes.guess_type(file_path)
-            if not content_type:
-                content_type = 'application/octet-stream'
-            
-            # Create response
-            with open(file_path, 'rb') as f:
-                response = HttpResponse(f.read(), content_type=content_type)
-                response['Content-Length'] = str(file_size)
-                response['Last-Modified'] = http_date(os.path.getmtime(file_path))
-                
-                # Add cache headers for images
-                if content_type.startswith('image/'):
-                    response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
-                
-                print(f"✅ Served media file: {relative_path} ({file_size} bytes, {content_type})")
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            instrumentation.deactivate(token)
+        metrics.total_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = f'{request.method} {match.view_name if match is not None else request.path}'
+
+        def record():
+            if not metrics.encoding:
+                metrics.raw_bytes = metrics.bytes
+            instrumentation.record_request(endpoint, request.path, response.status_code, metrics)
+
+        if not response.streaming:
+            metrics.bytes = len(response.content)
+            record()
+        elif getattr(response, 'is_async', False):
+            metrics.bytes = int(response.get('Content-Length') or 0)
+            record()
+        else:
+            # Bytes (and compression time) are only known once the body has been sent
+            response.streaming_content = self.measure_stream(response.streaming_content, metrics, record)
+        return response
+
+    @staticmethod
+    def measure_stream(content, metrics, record):
+        try:
+            for chunk in content:
+                metrics.bytes += len(chunk)
+                yield chunk
+        finally:
+            record()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        metrics = instrumentation.current_metrics()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.render_ms += (time.perf_counter() - started) * 1000
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with the best content-coding the client
+    accepts (zstd, br or gzip - see gym_api.compression), including
+    streaming responses. Bodies smaller than COMPRESSION_MIN_SIZE,
+    already-encoded responses and already-compressed media types are sent
+    as is. Per-codec levels come from COMPRESSION_LEVELS.
+
+    Place it right after RequestMetricsMiddleware: API metrics then report
+    the compressed bytes, the uncompressed size and the compression time.
+    """
+
+    default_min_size = 1024
+    # Formats that are compressed already; recompressing them only burns CPU
+    incompressible_types = re.compile(
+        r'^(image/(?!svg\+xml)|video/|audio/|font/woff|application/(zip|gzip|x-gzip|x-bzip2|x-7z-compressed'
+        r'|x-rar-compressed|zstd|pdf|octet-stream|vnd\.openxmlformats-))'
+    )
+    # Partial content and bodiless responses must keep their identity coding
+    skipped_statuses = {204, 206, 304}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), compression.available_codecs())
+        if codec is None:
+            return response
+        codec = codec(getattr(settings, 'COMPRESSION_LEVELS', {}).get(codec.name))
+        metrics = instrumentation.current_metrics()
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response.streaming_content, codec, metrics)
+            del response.headers['Content-Length']
+        else:
+            started = time.perf_counter()
+            compressed = codec.compress(response.content)
+            if metrics is not None:
+                metrics.compress_ms += (time.perf_counter() - started) * 1000
+            if len(compressed) >= len(response.content):
                 return response
-                
-        except Exception as e:
-            print(f"❌ Error serving media file: {e}")
-            raise Http404("Media file not found")
\ No newline at end of file
+            if metrics is not None:
+                metrics.raw_bytes += len(response.content)
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        if metrics is not None:
+            metrics.encoding = codec.name
+        # The encoded body is a different representation; strong ETags no longer hold (same as GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codec.name
+        return response
+
+    def is_compressible(self, response):
+        if response.status_code in self.skipped_statuses or response.has_header('Content-Encoding'):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if self.incompressible_types.match(response.get('Content-Type', '').lower()):
+            return False
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', self.default_min_size)
+        if response.streaming:
+            if getattr(response, 'is_async', False):
+                return False
+            length = response.get('Content-Length')
+            return length is None or int(length) >= min_size
+        return len(response.content) >= min_size
+
+    @staticmethod
+    def compress_stream(content, codec, metrics):
+        stream = codec.compressobj()
+        compress_ms = 0.0
+        try:
+            for chunk in content:
+                started = time.perf_counter()
+                data = stream.compress(chunk)
+                compress_ms += (time.perf_counter() - started) * 1000
+                if metrics is not None:
+                    metrics.raw_bytes += len(chunk)
+                if data:
+                    yield data
+            started = time.perf_counter()
+            data = stream.finish()
+            compress_ms += (time.perf_counter() - started) * 1000
+            yield data
+        finally:
+            if metrics is not None:
+                metrics.compress_ms += compress_ms
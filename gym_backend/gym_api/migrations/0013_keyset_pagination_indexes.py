@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0012_add_member_physical_attributes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['gym_owner', '-created_at', '-id'], name='gym_api_equ_gym_own_9f5d3e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['gym_owner', '-created_at', '-id'], name='gym_api_mem_gym_own_e1c40b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membersubscription',
+            index=models.Index(fields=['gym_owner', '-created_date', '-id'], name='gym_api_mem_gym_own_82751c_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0014_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membersubscription',
+            name='subscription_id',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE EXTENSION IF NOT EXISTS btree_gin',
+    'CREATE INDEX gym_api_searchdocument_trgm ON gym_api_searchdocument '
+    'USING gin (gym_owner_id, content gin_trgm_ops)',
+]
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS gym_api_searchdocument_trgm',
+]
+
+# External-content FTS5 table kept in step with the base table by triggers
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE gym_api_searchdocument_fts USING fts5("
+    "content, content='gym_api_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    "CREATE TRIGGER gym_api_searchdocument_ai AFTER INSERT ON gym_api_searchdocument BEGIN "
+    "INSERT INTO gym_api_searchdocument_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER gym_api_searchdocument_ad AFTER DELETE ON gym_api_searchdocument BEGIN "
+    "INSERT INTO gym_api_searchdocument_fts(gym_api_searchdocument_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER gym_api_searchdocument_au AFTER UPDATE ON gym_api_searchdocument BEGIN "
+    "INSERT INTO gym_api_searchdocument_fts(gym_api_searchdocument_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); "
+    "INSERT INTO gym_api_searchdocument_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS gym_api_searchdocument_au',
+    'DROP TRIGGER IF EXISTS gym_api_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS gym_api_searchdocument_ai',
+    'DROP TABLE IF EXISTS gym_api_searchdocument_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return  # Search falls back to LIKE over the (gym_owner_id, kind) index
+        _run(schema_editor, SQLITE_FORWARD)
+
+
+def drop_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_REVERSE)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0015_membersubscription_subscription_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gym_owner_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('member', 'Member'), ('trainer', 'Trainer'), ('equipment', 'Equipment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('content', models.TextField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchdocument',
+            index=models.Index(fields=['gym_owner_id', 'kind'], name='gym_api_sea_gym_own_14ac9e_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchdocument',
+            unique_together={('kind', 'object_id')},
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
@@ -0,0 +1,68 @@
+"""
+Move base64 profile pictures out of the gym owner and member rows into the
+configured image store (see gym_api.blobstore). Reversible: going back
+reads the images from the store into the base64 columns again.
+"""
+
+import base64
+import binascii
+
+from django.db import migrations
+
+
+MODELS = ('GymOwner', 'Member')
+
+
+def _image_store(apps):
+    from gym_api.blobstore import DatabaseImageStore, get_image_store
+
+    store = get_image_store()
+    if isinstance(store, DatabaseImageStore):
+        # The historical model, not the current one
+        store = DatabaseImageStore(model=apps.get_model('gym_api', 'ImageBlob'))
+    return store
+
+
+def move_to_image_store(apps, schema_editor):
+    from gym_api.blobstore import store_image
+
+    store = _image_store(apps)
+    for model_name in MODELS:
+        model = apps.get_model('gym_api', model_name)
+        rows = model.objects.exclude(profile_picture_base64__isnull=True).exclude(profile_picture_base64='')
+        for pk, data, content_type in rows.values_list(
+                'pk', 'profile_picture_base64', 'profile_picture_content_type').iterator(chunk_size=100):
+            try:
+                image = base64.b64decode(data)
+            except (binascii.Error, ValueError):
+                continue  # Unreadable data - it never rendered as an image either
+            key = store_image(image, content_type, store=store)
+            model.objects.filter(pk=pk).update(profile_picture_key=key)
+
+
+def restore_base64(apps, schema_editor):
+    from gym_api.blobstore import image_content_type
+
+    store = _image_store(apps)
+    for model_name in MODELS:
+        model = apps.get_model('gym_api', model_name)
+        for pk, key in model.objects.exclude(profile_picture_key='').values_list('pk', 'profile_picture_key').iterator():
+            image = store.open(key)
+            if image is None:
+                continue
+            with image:
+                data = base64.b64encode(image.read()).decode('ascii')
+            model.objects.filter(pk=pk).update(
+                profile_picture_base64=data, profile_picture_content_type=image_content_type(key),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0017_image_store'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_image_store, restore_base64),
+    ]
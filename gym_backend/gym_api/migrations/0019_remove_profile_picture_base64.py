@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0018_move_profile_pictures_to_image_store'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='gymowner',
+            name='profile_picture_base64',
+        ),
+        migrations.RemoveField(
+            model_name='gymowner',
+            name='profile_picture_content_type',
+        ),
+        migrations.RemoveField(
+            model_name='member',
+            name='profile_picture_base64',
+        ),
+        migrations.RemoveField(
+            model_name='member',
+            name='profile_picture_content_type',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0019_remove_profile_picture_base64'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessTokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(unique=True)),
+                ('revoked_at', models.FloatField()),
+            ],
+        ),
+    ]
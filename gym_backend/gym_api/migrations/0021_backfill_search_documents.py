@@ -0,0 +1,89 @@
+"""
+Index the members, trainers and equipment that existed before 0016 created
+the search table - signals only index rows as they are saved. Documents
+are built like gym_api.search.build_document(), from historical models.
+Rows indexed since are left alone. Reversing is a no-op: 0016's reverse
+drops the table.
+"""
+
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+
+
+def _user_name(row):
+    name = f"{row['user__first_name']} {row['user__last_name']}".strip()
+    return name or row['user__username']
+
+
+def _choice_labels(model, field_name):
+    return {str(value): str(label) for value, label in model._meta.get_field(field_name).flatchoices}
+
+
+def _member_documents(apps, normalize_text, normalize_phone):
+    Member = apps.get_model('gym_api', 'Member')
+    for row in Member.objects.values(
+            'pk', 'gym_owner_id', 'member_id', 'phone',
+            'user__first_name', 'user__last_name', 'user__username', 'user__email').iterator(chunk_size=BATCH_SIZE):
+        title = _user_name(row)
+        yield row, title, row['member_id'], normalize_text(
+            title, row['member_id'], row['user__email'], normalize_phone(row['phone']),
+        )
+
+
+def _trainer_documents(apps, normalize_text, normalize_phone):
+    Trainer = apps.get_model('gym_api', 'Trainer')
+    specializations = _choice_labels(Trainer, 'specialization')
+    for row in Trainer.objects.values(
+            'pk', 'gym_owner_id', 'trainer_id', 'phone', 'specialization',
+            'user__first_name', 'user__last_name', 'user__username', 'user__email').iterator(chunk_size=BATCH_SIZE):
+        title = _user_name(row)
+        detail = specializations.get(str(row['specialization']), row['specialization'])
+        yield row, title, detail, normalize_text(
+            title, row['trainer_id'], row['user__email'], normalize_phone(row['phone']),
+        )
+
+
+def _equipment_documents(apps, normalize_text, normalize_phone):
+    Equipment = apps.get_model('gym_api', 'Equipment')
+    equipment_types = _choice_labels(Equipment, 'equipment_type')
+    for row in Equipment.objects.values(
+            'pk', 'gym_owner_id', 'name', 'equipment_type', 'brand', 'model', 'equipment_id',
+            'serial_number').iterator(chunk_size=BATCH_SIZE):
+        detail = equipment_types.get(str(row['equipment_type']), row['equipment_type'])
+        yield row, row['name'], detail, normalize_text(
+            row['name'], row['brand'], row['model'], row['equipment_id'], row['serial_number'],
+        )
+
+
+def backfill_search_documents(apps, schema_editor):
+    from gym_api.search import normalize_phone, normalize_text
+
+    SearchDocument = apps.get_model('gym_api', 'SearchDocument')
+    for kind, documents in (
+            ('member', _member_documents), ('trainer', _trainer_documents), ('equipment', _equipment_documents)):
+        indexed = set(SearchDocument.objects.filter(kind=kind).values_list('object_id', flat=True))
+        batch = []
+        for row, title, detail, content in documents(apps, normalize_text, normalize_phone):
+            if row['pk'] in indexed:
+                continue
+            batch.append(SearchDocument(
+                gym_owner_id=row['gym_owner_id'], kind=kind, object_id=row['pk'],
+                title=(title or '')[:255], detail=(detail or '')[:255], content=content,
+            ))
+            if len(batch) >= BATCH_SIZE:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0020_accesstokenrevocation'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_api', '0021_backfill_search_documents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accesstokenrevocation',
+            name='revoked_at',
+            field=models.FloatField(db_index=True),
+        ),
+    ]
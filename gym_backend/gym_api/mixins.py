@@ -0,0 +1,332 @@
+"""
+Reusable viewset mixins for the gym management API.
+"""
+
+import hashlib
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .authentication import get_tenant
+from .caching import bump_gym_generation, get_gym_generation
+from .deletion import record_deletions
+from .fieldsets import get_projection, parse_field_list, prune_serializer
+from .instrumentation import instrument_serializer
+from .models import Tombstone
+from .projection import project_queryset
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = 'Not modified.'
+    default_code = 'not_modified'
+
+
+class TenantMixin:
+    """Expose the request's Tenant so views can scope by gym_owner_id without a query"""
+
+    @property
+    def tenant(self):
+        return get_tenant(self.request)
+
+
+class InstrumentedSerializerMixin:
+    """Report serializer.data timing and row counts to the request metrics"""
+
+    def get_serializer(self, *args, **kwargs):
+        return instrument_serializer(super().get_serializer(*args, **kwargs))
+
+
+class ConditionalGetMixin:
+    """
+    ETag / If-None-Match support for gym-scoped ModelViewSets.
+
+    The validator is computed before the view runs, from a single aggregate
+    query (max of `etag_timestamp_fields` and row count over the filtered
+    queryset) combined with the gym's cache generation. When it matches the
+    client's If-None-Match header a bodiless 304 is returned and nothing is
+    serialized.
+    """
+    conditional_actions = ('list', 'retrieve')
+    etag_timestamp_fields = ('updated_at',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = None
+        if request.method in ('GET', 'HEAD') and self.action in self.conditional_actions:
+            self._etag = self.get_etag(request)
+            if self._etag and self._etag_matches(request.META.get('HTTP_IF_NONE_MATCH', '')):
+                raise NotModified()
+
+    def get_etag_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_etag(self, request):
+        gym_owner_id = get_tenant(request).gym_owner_id
+        if gym_owner_id is None:
+            return None
+
+        aggregates = {f'max_{field}': Max(field) for field in self.etag_timestamp_fields}
+        stats = self.get_etag_queryset().order_by().aggregate(row_count=Count('pk'), **aggregates)
+
+        # Computed fields such as days_until_expiry change with the date, and
+        # the rendered format depends on the Accept header
+        parts = [
+            self.__class__.__name__, self.action, request.user.pk, gym_owner_id,
+            get_gym_generation(gym_owner_id), date.today().isoformat(),
+            request.META.get('QUERY_STRING', ''), request.META.get('HTTP_ACCEPT', ''),
+            stats['row_count'],
+        ]
+        parts.extend(stats[f'max_{field}'] for field in self.etag_timestamp_fields)
+        digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+        return f'W/"{digest}"'
+
+    def _etag_matches(self, if_none_match):
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        # Weak comparison - ignore W/ prefixes on both sides
+        current = self._etag[2:] if self._etag.startswith('W/') else self._etag
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == current:
+                return True
+        return False
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Tenant data - clients may store it but must revalidate
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def perform_destroy(self, instance):
+        gym_owner_id = getattr(instance, 'gym_owner_id', None)
+        super().perform_destroy(instance)
+        bump_gym_generation(gym_owner_id)
+
+
+class DeltaSyncMixin:
+    """
+    ?since=<watermark> mode for list endpoints.
+
+    Returns only rows whose change timestamps (`etag_timestamp_fields`) are
+    newer than the watermark, the ids deleted since then (from tombstones),
+    and a new watermark for the next call, so steady-state sync traffic is
+    proportional to the changes rather than the collection size.
+
+    Full lists carry the watermark too (in the body when paginated, always
+    in the X-Sync-Watermark header), taken before the rows are read, so a
+    client can bootstrap from a full fetch. Changed rows are returned in
+    pages of `sync_page_size` ordered by id; `next` carries the ?after= id
+    and the first page's watermark, which the client stores once `next` is
+    null. `deleted` is sent on the first page only.
+    """
+    sync_query_param = 'since'
+    sync_after_query_param = 'after'
+    sync_watermark_query_param = 'watermark'
+    sync_page_size = 200
+    sync_page_size_query_param = 'page_size'
+    sync_max_page_size = 1000
+    sync_watermark_header = 'X-Sync-Watermark'
+    # The watermark trails the server clock so rows committed by transactions
+    # that were still open at query time are picked up by the next sync.
+    # Clients upsert by id, so the small overlap is harmless.
+    sync_watermark_overlap = timedelta(seconds=5)
+
+    def perform_destroy(self, instance):
+        # Tombstones for the row and its cascades, written in bulk
+        with record_deletions(instance):
+            super().perform_destroy(instance)
+
+    def list(self, request, *args, **kwargs):
+        if self.is_delta_request(request):
+            return self.delta_list(request)
+        watermark = self.format_watermark(timezone.now() - self.sync_watermark_overlap)
+        response = super().list(request, *args, **kwargs)
+        if isinstance(response.data, dict):
+            response.data['watermark'] = watermark
+        response[self.sync_watermark_header] = watermark
+        return response
+
+    def is_delta_request(self, request):
+        return self.sync_query_param in request.query_params
+
+    def format_watermark(self, value):
+        # 'Z' rather than '+00:00' so the value survives unencoded in a query string
+        return value.astimezone(dt_timezone.utc).isoformat(timespec='microseconds').replace('+00:00', 'Z')
+
+    def parse_watermark(self, param):
+        value = parse_datetime(self.request.query_params.get(param, ''))
+        if value is not None and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def get_sync_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.sync_page_size_query_param])
+        except (KeyError, ValueError):
+            return self.sync_page_size
+        return min(max(page_size, 1), self.sync_max_page_size)
+
+    def delta_list(self, request):
+        since = self.parse_watermark(self.sync_query_param)
+        if since is None:
+            return Response(
+                {'error': f'{self.sync_query_param} must be an ISO 8601 watermark from a previous sync'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        now = timezone.now()
+        if since < now - timedelta(days=Tombstone.RETENTION_DAYS):
+            return Response({
+                'error': 'Watermark is older than the deletion history - refetch the full collection',
+                'full_sync_required': True,
+            }, status=status.HTTP_410_GONE)
+
+        try:
+            after = int(request.query_params.get(self.sync_after_query_param, 0))
+        except ValueError:
+            return Response(
+                {'error': f'{self.sync_after_query_param} must be an id from a previous page'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Later pages keep the first page's watermark, so nothing changed
+        # while the client was paging is skipped by the next sync
+        watermark = after and self.parse_watermark(self.sync_watermark_query_param)
+        watermark = self.format_watermark(watermark or now - self.sync_watermark_overlap)
+
+        changed = Q()
+        for field in self.etag_timestamp_fields:
+            changed |= Q(**{f'{field}__gt': since})
+        queryset = self.filter_queryset(self.get_queryset()).filter(changed, pk__gt=after).order_by('pk')
+        page_size = self.get_sync_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        next_link = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            # Rows are model instances, or dicts when a view serves .values()
+            last_pk = rows[-1]['id'] if isinstance(rows[-1], dict) else rows[-1].pk
+            next_link = request.build_absolute_uri()
+            next_link = replace_query_param(next_link, self.sync_after_query_param, last_pk)
+            next_link = replace_query_param(next_link, self.sync_watermark_query_param, watermark)
+        serializer = self.get_serializer(rows, many=True)
+
+        deleted = []
+        if not after:
+            deleted = Tombstone.objects.filter(
+                gym_owner_id=self.tenant.gym_owner_id,
+                model=queryset.model._meta.label_lower,
+                deleted_at__gt=since,
+            ).values_list('object_id', flat=True)
+
+        response = Response({
+            'since': self.format_watermark(since),
+            'watermark': watermark,
+            'next': next_link,
+            'results': serializer.data,
+            'deleted': sorted(set(deleted)),
+        })
+        response[self.sync_watermark_header] = watermark
+        return response
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields=a,b,c / ?expand=x,y support for read actions.
+
+    The serializer is pruned to the requested fields and the queryset is
+    narrowed to match: .only() over the rendered columns plus just the
+    select_related/prefetch_related those fields need. Computed fields
+    declare their columns in the serializer's `sparse_field_dependencies`;
+    if any rendered field can't be mapped, full rows are loaded instead.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fieldset(self):
+        """(fields, expand) requested by the client, or None"""
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+        params = self.request.query_params
+        fields = parse_field_list(params.get(self.fields_query_param))
+        expand = parse_field_list(params.get(self.expand_query_param))
+        if not fields and not expand:
+            return None
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            prune_serializer(getattr(serializer, 'child', serializer), *fieldset)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None or self.action not in self.sparse_actions:
+            return queryset
+
+        serializer = prune_serializer(self.get_serializer_class()(context=self.get_serializer_context()), *fieldset)
+        projection = get_projection(serializer, queryset.model)
+        if projection is None:
+            return queryset
+
+        only, select_related, prefetch_related = projection
+        # Pagination cursors read the ordering columns of the last row
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        for field in ((ordering,) if isinstance(ordering, str) else ordering):
+            only.add(field.lstrip('-'))
+        queryset = queryset.select_related(None)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset.only(*only)
+
+
+class ProjectionMixin:
+    """
+    Serve `projection_actions` from .values() rows when the action's
+    serializer opts into ProjectionListSerializer (see projection.py).
+    Requests with a sparse fieldset keep the .only() instance path.
+    Custom actions that paginate their own querysets call project_queryset().
+    """
+    projection_actions = ('list',)
+
+    def project_queryset(self, queryset, serializer_class=None):
+        serializer = (serializer_class or self.get_serializer_class())(context=self.get_serializer_context())
+        # Pagination cursors read the ordering columns of the last row
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        return project_queryset(queryset, serializer, (ordering,) if isinstance(ordering, str) else ordering)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.projection_actions:
+            return queryset
+        get_sparse_fieldset = getattr(self, 'get_sparse_fieldset', None)
+        if get_sparse_fieldset is not None and get_sparse_fieldset() is not None:
+            return queryset
+        return self.project_queryset(queryset)
@@ -1,10 +1,15 @@
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 import uuid
 import pytz
 
+from .blobstore import derivative_key, image_url
+from .caching import bump_member_version
+
 
 def get_ist_now():
     """Get current time in Indian Standard Time"""
@@ -17,6 +22,111 @@ def get_ist_date():
     return get_ist_now().date()
 
 
+def _count_per_gym(model, **filters):
+    """Correlated COUNT(*) of a gym's rows - avoids the row fan-out of joining several relations"""
+    counts = model.objects.filter(gym_owner=models.OuterRef('pk'), **filters).order_by().values('gym_owner')
+    return Coalesce(models.Subquery(counts.annotate(count=models.Count('pk')).values('count')), 0)
+
+
+def _profile_picture_url(instance, derivative):
+    """Root-relative URL of a profile picture derivative (see imaging.py), or of a legacy uploaded file"""
+    if instance.profile_picture_key:
+        return image_url(derivative_key(instance.profile_picture_key, derivative))
+    if instance.profile_picture and instance.profile_picture.name:
+        # Note: This might not work on Railway due to ephemeral storage
+        return instance.profile_picture.url
+    return None
+
+
+def _heavy_field_paths(model, select_related, details, path=''):
+    """Lookups of the heavy_fields of model and of every model select_related joins in, except those in details"""
+    paths = set()
+    if path not in details:
+        paths.update(f'{path}__{name}' if path else name for name in getattr(model, 'heavy_fields', ()))
+    if isinstance(select_related, dict):
+        for name, nested in select_related.items():
+            try:
+                related_model = model._meta.get_field(name).related_model
+            except FieldDoesNotExist:
+                continue  # Left for the query to report
+            if related_model is not None:
+                paths |= _heavy_field_paths(related_model, nested, details, f'{path}__{name}' if path else name)
+    return paths
+
+
+class LeanManager(models.Manager):
+
+    def get_queryset(self):
+        return super().get_queryset()._defer_heavy_fields()
+
+
+class LeanQuerySet(models.QuerySet):
+    """
+    Leaves large text columns unread unless they are asked for. Models list
+    them in `heavy_fields`; they are deferred on the model's own rows and on
+    every row select_related() joins in from another model using this
+    queryset. with_details() loads them for the model itself and for the
+    given select_related paths - use it where a serializer renders them.
+    An explicit only() list always wins.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._detail_paths = frozenset()
+        self._auto_deferred = frozenset()
+
+    @classmethod
+    def as_manager(cls):
+        manager = LeanManager.from_queryset(cls)()
+        manager._built_with_as_manager = True
+        return manager
+    as_manager.queryset_only = True
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._detail_paths = self._detail_paths
+        clone._auto_deferred = self._auto_deferred
+        return clone
+
+    def _defer_heavy_fields(self):
+        names, defer = self.query.deferred_loading
+        if not defer:
+            return self  # only() decides
+        deferred = _heavy_field_paths(self.model, self.query.select_related, self._detail_paths)
+        self.query.deferred_loading = (frozenset(names - self._auto_deferred) | deferred, True)
+        self._auto_deferred = frozenset(deferred)
+        return self
+
+    def select_related(self, *fields):
+        return super().select_related(*fields)._defer_heavy_fields()
+
+    def with_details(self, *paths):
+        """Load the heavy fields of this model and of the given select_related paths"""
+        clone = self._chain()
+        clone._detail_paths = clone._detail_paths | {''} | set(paths)
+        return clone._defer_heavy_fields()
+
+    def only(self, *fields):
+        # Django drops names that are already deferred from an only() list
+        clone = self._chain()
+        names, defer = clone.query.deferred_loading
+        if defer:
+            clone.query.deferred_loading = (frozenset(names - clone._auto_deferred), True)
+        clone._auto_deferred = frozenset()
+        return super(LeanQuerySet, clone).only(*fields)
+
+
+class GymOwnerQuerySet(LeanQuerySet):
+    
+    def with_counts(self):
+        """Annotate the totals shown by GymOwnerSerializer in the same query"""
+        return self.annotate(
+            total_members=_count_per_gym(Member, is_active=True),
+            total_trainers=_count_per_gym(Trainer, is_available=True),
+            total_equipment=_count_per_gym(Equipment, is_working=True),
+        )
+
+
 class GymOwner(models.Model):
     """
     Model representing gym owners with multi-tenant isolation
@@ -32,15 +142,26 @@ class GymOwner(models.Model):
     is_active = models.BooleanField(default=True)
     qr_code_token = models.UUIDField(default=uuid.uuid4, unique=True)  # Unique QR token for gym
     profile_picture = models.ImageField(upload_to='gym_owner_profiles/', blank=True, null=True)
-    # Add base64 profile picture for Railway deployment (ephemeral storage)
-    profile_picture_base64 = models.TextField(blank=True, null=True, help_text="Base64 encoded profile picture for Railway deployment")
-    profile_picture_content_type = models.CharField(max_length=50, blank=True, null=True, help_text="Content type of the base64 image")
+    # Profile picture in the content-addressed image store (see blobstore.py)
+    profile_picture_key = models.CharField(max_length=80, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    heavy_fields = ('gym_address', 'gym_description')
+    
+    objects = GymOwnerQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.gym_name} - {self.user.get_full_name()}"
     
+    @property
+    def profile_picture_url(self):
+        return _profile_picture_url(self, 'detail')
+    
+    @property
+    def profile_picture_full_url(self):
+        return _profile_picture_url(self, 'full')
+    
     def save(self, *args, **kwargs):
         if not self.gym_established_date:
             self.gym_established_date = timezone.now().date()
@@ -79,21 +200,25 @@ class Member(models.Model):
     height_cm = models.FloatField(null=True, blank=True, help_text="Height in centimeters")
     weight_kg = models.FloatField(null=True, blank=True, help_text="Weight in kilograms")
     
-    # Profile picture with Railway-compatible base64 storage
+    # Profile picture in the content-addressed image store (see blobstore.py)
     profile_picture = models.ImageField(upload_to='member_profiles/', blank=True, null=True)
-    profile_picture_base64 = models.TextField(blank=True, null=True, help_text="Base64 encoded profile picture for Railway deployment")
-    profile_picture_content_type = models.CharField(max_length=50, blank=True, null=True, help_text="Content type of the base64 image")
+    profile_picture_key = models.CharField(max_length=80, blank=True, default='')
     
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    heavy_fields = ('address', 'notes')
+    
+    objects = LeanQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'member_id']
         indexes = [
             models.Index(fields=['gym_owner', 'is_active']),
             models.Index(fields=['gym_owner', 'membership_expiry']),
             models.Index(fields=['gym_owner', 'join_date']),
+            models.Index(fields=['gym_owner', '-created_at', '-id']),  # Keyset pagination
             models.Index(fields=['member_id']),
             models.Index(fields=['user']),
         ]
@@ -122,6 +247,9 @@ class Member(models.Model):
                 self.member_id = f"MEM-{int(base_member_id.split('-')[-1]) + counter:04d}"
                 counter += 1
         super().save(*args, **kwargs)
+        
+        # Member details are embedded in cached attendance/payment history
+        bump_member_version(self.id)
     
     @property
     def bmi(self):
@@ -148,17 +276,16 @@ class Member(models.Model):
     
     @property
     def profile_picture_url(self):
-        """Get the full URL for the profile picture - prefer base64 data URL for Railway"""
-        # First try base64 data URL (works reliably on Railway)
-        if self.profile_picture_base64 and self.profile_picture_content_type:
-            data_url = f"data:{self.profile_picture_content_type};base64,{self.profile_picture_base64}"
-            return data_url
-        
-        # Fallback to traditional file URL
-        if self.profile_picture and self.profile_picture.name:
-            # Note: This might not work on Railway due to ephemeral storage
-            return self.profile_picture.url
-        return None
+        return _profile_picture_url(self, 'detail')
+    
+    @property
+    def profile_picture_full_url(self):
+        return _profile_picture_url(self, 'full')
+    
+    @property
+    def profile_picture_avatar_url(self):
+        """Smallest derivative, for lists"""
+        return _profile_picture_url(self, 'avatar')
     
     @property
     def age(self):
@@ -170,6 +297,15 @@ class Member(models.Model):
         return None
 
 
+class TrainerQuerySet(LeanQuerySet):
+    
+    def with_session_counts(self):
+        """Annotate completed workout sessions per trainer in the same grouped query"""
+        return self.annotate(
+            total_sessions=models.Count('workoutsession', filter=models.Q(workoutsession__completed=True)),
+        )
+
+
 class Trainer(models.Model):
     SPECIALIZATIONS = [
         ('fitness', 'General Fitness'),
@@ -200,6 +336,8 @@ class Trainer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TrainerQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'trainer_id']
         indexes = [
@@ -274,12 +412,15 @@ class Equipment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'equipment_id']
         indexes = [
             models.Index(fields=['gym_owner', 'is_working']),
             models.Index(fields=['gym_owner', 'equipment_type']),
             models.Index(fields=['gym_owner', 'next_maintenance_date']),
+            models.Index(fields=['gym_owner', '-created_at', '-id']),  # Keyset pagination
             models.Index(fields=['equipment_id']),
         ]
     
@@ -326,6 +467,8 @@ class WorkoutPlan(models.Model):
     updated_date = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} - {self.difficulty_level} - {self.gym_owner.gym_name}"
 
@@ -353,6 +496,8 @@ class Exercise(models.Model):
     difficulty_level = models.CharField(max_length=15, choices=WorkoutPlan.DIFFICULTY_LEVELS, default='beginner')
     created_date = models.DateTimeField(auto_now_add=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} - {self.muscle_group} - {self.gym_owner.gym_name}"
 
@@ -368,10 +513,21 @@ class WorkoutSession(models.Model):
     completed = models.BooleanField(default=False)
     created_date = models.DateTimeField(auto_now_add=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.member} - {self.date.strftime('%Y-%m-%d')} - {self.gym_owner.gym_name}"
 
 
+class SubscriptionPlanQuerySet(LeanQuerySet):
+    
+    def with_subscriber_counts(self):
+        """Annotate active subscriptions per plan in the same grouped query"""
+        return self.annotate(
+            active_subscribers=models.Count('membersubscription', filter=models.Q(membersubscription__status='active')),
+        )
+
+
 class SubscriptionPlan(models.Model):
     DURATION_TYPES = [
         ('days', 'Days'),
@@ -396,6 +552,8 @@ class SubscriptionPlan(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
     
+    objects = SubscriptionPlanQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'plan_id']
         indexes = [
@@ -466,12 +624,15 @@ class MemberSubscription(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'subscription_id']
         indexes = [
             models.Index(fields=['gym_owner', 'status']),
             models.Index(fields=['gym_owner', 'member']),
             models.Index(fields=['gym_owner', 'start_date']),
+            models.Index(fields=['gym_owner', '-created_date', '-id']),  # Keyset pagination
             models.Index(fields=['subscription_id']),
         ]
     
@@ -547,6 +708,8 @@ class MembershipPayment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'payment_id']
         indexes = [
@@ -674,11 +837,16 @@ class MembershipPayment(models.Model):
         cache_key = f'revenue_analytics_{self.gym_owner.id}'
         cache.delete(cache_key)
         print(f'💰 CACHE: Invalidated revenue analytics cache for gym owner {self.gym_owner.id}')
+        
+        # Invalidate the member's cached payment history
+        bump_member_version(self.member_id)
     
     def delete(self, *args, **kwargs):
-        # Store gym_owner before deletion
+        # Store gym_owner and member before deletion
         gym_owner_id = self.gym_owner.id
+        member_id = self.member_id
         super().delete(*args, **kwargs)
+        bump_member_version(member_id)
         
         # Invalidate revenue analytics cache when payment is deleted
         from django.core.cache import cache
@@ -700,6 +868,8 @@ class Attendance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'member', 'date']
         indexes = [
@@ -753,6 +923,14 @@ class Attendance(models.Model):
             self.session_duration_minutes = int(delta.total_seconds() / 60)
         
         super().save(*args, **kwargs)
+        
+        # Invalidate the member's cached attendance history
+        bump_member_version(self.member_id)
+    
+    def delete(self, *args, **kwargs):
+        member_id = self.member_id
+        super().delete(*args, **kwargs)
+        bump_member_version(member_id)
 
 
 class TrainerMemberAssociation(models.Model):
@@ -770,6 +948,8 @@ class TrainerMemberAssociation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['gym_owner', 'trainer', 'member']
         indexes = [
@@ -828,6 +1008,8 @@ class Notification(models.Model):
     related_member = models.ForeignKey(Member, on_delete=models.CASCADE, null=True, blank=True)
     related_payment = models.ForeignKey('MembershipPayment', on_delete=models.CASCADE, null=True, blank=True)
     
+    objects = LeanQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -849,7 +1031,19 @@ class Notification(models.Model):
     @classmethod
     def create_member_expiry_notification(cls, gym_owner, expired_members):
         """Create notification for expired members"""
-        member_count = len(expired_members)
+        notification = cls.member_expiry_notification(gym_owner, expired_members)
+        notification.save(force_insert=True)
+        return notification
+    
+    @classmethod
+    def member_expiry_notification(cls, gym_owner, expired_members, member_count=None):
+        """
+        Unsaved expired members notification, for bulk_create. Only the first
+        three members are named, so expired_members may be just those three
+        out of member_count.
+        """
+        if member_count is None:
+            member_count = len(expired_members)
         if member_count == 1:
             member = expired_members[0]
             title = f"Member Expired: {member.user.get_full_name()}"
@@ -861,7 +1055,7 @@ class Notification(models.Model):
                 member_names += f" and {member_count - 3} others"
             message = f"The following members have expired memberships and have been automatically deactivated: {member_names}"
         
-        return cls.objects.create(
+        return cls(
             gym_owner=gym_owner,
             type='member_expiry',
             priority='high',
@@ -894,3 +1088,87 @@ class Notification(models.Model):
             message=message,
             related_member=expiring_members[0] if member_count == 1 else None
         )
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted row, so delta-sync clients can drop it locally.
+    gym_owner_id is a plain column rather than a foreign key: tombstones are
+    written while a gym's rows are being cascade-deleted and must not block
+    deleting the gym itself.
+    """
+    RETENTION_DAYS = 30  # Clients whose watermark is older must do a full refetch
+    
+    gym_owner_id = models.BigIntegerField()
+    model = models.CharField(max_length=50)  # Model label, e.g. 'gym_api.member'
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['gym_owner_id', 'model', 'deleted_at']),
+            models.Index(fields=['deleted_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted at {self.deleted_at}"
+
+
+class AccessTokenRevocation(models.Model):
+    """
+    When a user's signed access tokens were last revoked (logout, password
+    change, deactivation or deletion); tokens issued up to then are rejected.
+    user_id is a plain column so the row outlives a deleted user. One row per
+    user, overwritten on every revocation.
+    """
+    user_id = models.BigIntegerField(unique=True)
+    revoked_at = models.FloatField(db_index=True)  # Unix time, compared with the token's 'iat'
+    
+    def __str__(self):
+        return f"Access tokens of user #{self.user_id} revoked at {self.revoked_at}"
+
+
+class ImageBlob(models.Model):
+    """
+    Image bytes for blobstore.DatabaseImageStore, keyed by content address.
+    Kept out of the member and gym owner tables so their rows stay small.
+    """
+    key = models.CharField(max_length=80, primary_key=True)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.key
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalised search text for one member, trainer or equipment row.
+
+    Names, emails and phone numbers live across several tables, so they are
+    flattened into a single lower-cased `content` column that can carry a
+    real text index: a pg_trgm GIN index on PostgreSQL, an FTS5 table on
+    SQLite (both created by the migration). Kept in sync by signals and,
+    for deletes, deletion.record_deletions().
+    """
+    KINDS = (
+        ('member', 'Member'),
+        ('trainer', 'Trainer'),
+        ('equipment', 'Equipment'),
+    )
+    
+    gym_owner_id = models.BigIntegerField()
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    detail = models.CharField(max_length=255, blank=True)
+    content = models.TextField()
+    
+    class Meta:
+        unique_together = ['kind', 'object_id']
+        indexes = [
+            models.Index(fields=['gym_owner_id', 'kind']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title}"
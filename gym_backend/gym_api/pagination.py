@@ -3,10 +3,21 @@ Enterprise-level pagination classes for gym management system.
 Optimized for 100k+ users with efficient cursor-based pagination.
 """
 
-from rest_framework.pagination import PageNumberPagination, CursorPagination
-from rest_framework.response import Response
+import base64
+import json
+import math
 from collections import OrderedDict
 
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .counting import (
+    COUNT_MODE_AUTO, COUNT_MODE_CACHED, COUNT_MODE_ESTIMATE, COUNT_MODE_EXACT, COUNT_MODE_NONE, count_rows,
+)
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     """
@@ -104,4 +115,210 @@ class MemberPagination(PageNumberPagination):
                 'total_inactive_on_page': len(data) - total_active,
             }),
             ('results', data)
-        ]))
\ No newline at end of file
+        ]))
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination on a stable, unique ordering such as (-created_at, -id).
+
+    The cursor carries the ordering values of the last row on the page and the
+    next page is fetched with a row-value comparison against them, so every
+    page is an index range scan - page 500 costs the same as page 1.
+
+    Totals are opt-in and come from gym_api.counting: ?include_total=true
+    picks the cheapest acceptable strategy, exact|cached|estimate forces one.
+    Requests with ?page=N count as if they asked for true, since the older
+    clients that send it read count and total_pages. The response's
+    count_mode says which strategy was used, 'none' when nothing was counted.
+
+    Clients that still page with ?page=N get offset pagination instead, with
+    page-number next/previous links. Every request without a cursor - the
+    first page, or a numbered one - keeps the previous, page, current_page,
+    total_pages and count keys of the old page-number responses (total_pages
+    and count are null when nothing was counted).
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    # Older clients size pages with ?limit= - honoured when page_size is absent
+    limit_query_param = None
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    include_total_query_param = 'include_total'
+    invalid_cursor_message = 'Invalid cursor'
+    invalid_page_message = 'Invalid page.'
+    # Query params that don't narrow the result set
+    unfiltered_query_params = ('cursor', 'page', 'page_size', 'include_total', 'minimal')
+    # Must end in a unique field so ties on the leading field are resolved
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.total, self.count_mode = self.get_count(queryset, request, view)
+        self.cursor_mode = bool(request.query_params.get(self.cursor_query_param))
+
+        queryset = queryset.order_by(*self.ordering)
+        self.page_number = self.get_page_number(request)
+        if self.page_number is not None:
+            offset = (self.page_number - 1) * self.page_size
+        else:
+            offset = 0
+            position = self.decode_cursor(request, queryset.model)
+            if position is not None:
+                queryset = queryset.filter(self.keyset_filter(position))
+
+        # Fetch one extra row to learn whether a next page exists
+        rows = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None and self.limit_query_param:
+            value = request.query_params.get(self.limit_query_param)
+        try:
+            page_size = int(value if value is not None else self.page_size)
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_page_number(self, request):
+        """?page=N from older clients, None in cursor mode"""
+        value = request.query_params.get(self.page_query_param)
+        if value is None or request.query_params.get(self.cursor_query_param):
+            return None
+        try:
+            page_number = int(value)
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message)
+        return page_number
+
+    def get_count_mode(self, request):
+        value = request.query_params.get(self.include_total_query_param)
+        if value is None:
+            # Opt-in, except for the page-number requests of older clients
+            return COUNT_MODE_AUTO if self.page_query_param in request.query_params else COUNT_MODE_NONE
+        value = value.lower()
+        if value in ('false', '0', 'no', COUNT_MODE_NONE):
+            return COUNT_MODE_NONE
+        if value in (COUNT_MODE_EXACT, COUNT_MODE_CACHED, COUNT_MODE_ESTIMATE):
+            return value
+        return COUNT_MODE_AUTO
+
+    def get_count(self, queryset, request, view=None):
+        mode = self.get_count_mode(request)
+        if mode == COUNT_MODE_NONE:
+            return None, COUNT_MODE_NONE
+
+        tenant = getattr(view, 'tenant', None)
+        gym_owner_id = tenant.gym_owner_id if tenant is not None else None
+        # Only the plain list endpoint without query filters is an "unfiltered scan"
+        filtered = (
+            getattr(view, 'action', None) != 'list'
+            or any(param not in self.unfiltered_query_params for param in request.query_params)
+        )
+        return count_rows(queryset, mode=mode, gym_owner_id=gym_owner_id, filtered=filtered)
+
+    def get_ordering_fields(self):
+        return [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+    def keyset_filter(self, position):
+        """
+        Expand (a, b, c) < (x, y, z) into
+        a < x OR (a = x AND b < y) OR (a = x AND b = y AND c < z),
+        flipping the comparison for ascending fields.
+        """
+        condition = Q()
+        equal_so_far = {}
+        for (name, descending), value in zip(self.get_ordering_fields(), position):
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= Q(**equal_so_far, **{lookup: value})
+            equal_so_far[name] = value
+        return condition
+
+    def encode_cursor(self, row):
+        values = []
+        for name, _ in self.get_ordering_fields():
+            # Rows are model instances, or dicts when a view serves .values()
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            fields = self.get_ordering_fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [model._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        if self.page_number is not None:
+            return replace_query_param(self.base_url, self.page_query_param, self.page_number + 1)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.page_number or self.page_number == 1:
+            return None
+        return replace_query_param(self.base_url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        fields = [('next', self.get_next_link())]
+        if not self.cursor_mode:
+            # The keys of the old page-number responses
+            page_number = self.page_number or 1
+            total_pages = max(math.ceil(self.total / self.page_size), 1) if self.total is not None else None
+            fields += [
+                ('previous', self.get_previous_link()),
+                ('page', page_number),
+                ('current_page', page_number),
+                ('total_pages', total_pages),
+            ]
+        fields.append(('page_size', self.page_size))
+        if self.total is not None or not self.cursor_mode:
+            fields.append(('count', self.total))
+        fields.append(('count_mode', self.count_mode))
+        fields.append(('results', data))
+        return Response(OrderedDict(fields))
+
+
+class MemberKeysetPagination(KeysetPagination):
+    """Keyset pagination for member listings"""
+    page_size = 25
+    max_page_size = 100
+
+
+class EquipmentKeysetPagination(KeysetPagination):
+    """Keyset pagination for equipment listings - rows are heavy, so pages are small"""
+    page_size = 10
+    max_page_size = 50
+
+
+class MemberSubscriptionKeysetPagination(KeysetPagination):
+    """Keyset pagination for member subscriptions"""
+    page_size = 25
+    max_page_size = 50
+    ordering = ('-created_date', '-id')
+
+
+class AttendanceKeysetPagination(KeysetPagination):
+    """Keyset pagination for attendance listings, newest check-in first"""
+    page_size = 50
+    max_page_size = 100
+    limit_query_param = 'limit'
+    unfiltered_query_params = KeysetPagination.unfiltered_query_params + ('limit',)
+    ordering = ('-date', '-check_in_time', '-id')
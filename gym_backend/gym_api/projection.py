@@ -0,0 +1,206 @@
+"""
+Read-only projection mode for list serializers.
+
+A ModelSerializer rendering a page builds a model instance per row (and per
+joined relation), then dispatches get_attribute/to_representation through
+every field. ProjectionListSerializer skips most of that: the queryset is
+narrowed to .values() over exactly the columns the serializer reads (the
+same projection sparse fieldsets use, see fieldsets.py) and each row dict is
+rendered by getters compiled once per response:
+- plain columns go straight from the row through the field's to_representation
+- nested serializers recurse with the relation's key prefix
+- get_FOO_display sources are looked up in the field's choices
+- other computed fields (methods, properties) read from a model instance
+  assembled from the row without running Model.__init__
+
+Output is identical to the serializer's normal representation. Serializers
+opt in with `list_serializer_class = ProjectionListSerializer` in their Meta;
+anything that can't be projected falls back to the regular path.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.base import ModelState
+from django.utils.encoding import force_str
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject, RelatedField
+
+from .fieldsets import _display_source, _nested_serializer, get_projection
+
+
+_SKIP = object()
+
+
+class _RowInstance:
+    """Builds a model instance for one relation level of a .values() row"""
+
+    def __init__(self, model, prefix, columns):
+        self.model = model
+        self.attributes = []  # (attname, row key)
+        self.relations = []  # (field name, row key of the related pk, _RowInstance)
+        nested = {}
+        for key in columns:
+            if not key.startswith(prefix):
+                continue
+            head, _, tail = key[len(prefix):].partition('__')
+            field = model._meta.get_field(head)
+            if not tail:
+                self.attributes.append((field.attname, key))
+            elif head not in nested and prefix + head in columns:
+                nested[head] = _RowInstance(field.related_model, f'{prefix}{head}__', columns)
+                self.relations.append((field.name, prefix + head, nested[head]))
+
+    def build(self, row):
+        instance = self.model.__new__(self.model)
+        instance._state = ModelState()
+        instance._state.adding = False
+        values = instance.__dict__
+        for attname, key in self.attributes:
+            values[attname] = row[key]
+        for name, key, related in self.relations:
+            instance._state.fields_cache[name] = None if row[key] is None else related.build(row)
+        return instance
+
+
+class _CompiledSerializer:
+    """Precompiled field getters for one serializer at one relation prefix"""
+
+    def __init__(self, serializer, model, prefix, columns):
+        self.getters = []
+        self.instance = None
+        dependencies = getattr(serializer, 'sparse_field_dependencies', {})
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            model_field = self._model_field(model, field)
+            nested = _nested_serializer(field)
+            display_field = _display_source(model, field.source) if len(field.source_attrs) == 1 else None
+
+            if display_field is not None and name not in dependencies:
+                self.getters.append((name, self._display_getter(prefix + display_field.name, display_field, field)))
+            elif nested is not None:
+                if model_field is None or not model_field.is_relation:
+                    raise ValueError(f'{name}: nested serializer is not a direct relation')
+                compiled = _CompiledSerializer(nested, model_field.related_model, f'{prefix}{field.source}__', columns)
+                self.getters.append((name, self._nested_getter(prefix + field.source, compiled)))
+            elif name in dependencies or model_field is None or isinstance(model_field, models.FileField):
+                if self.instance is None:
+                    self.instance = _RowInstance(model, prefix, columns)
+                self.getters.append((name, self._instance_getter(field)))
+            elif model_field.is_relation:
+                if not (isinstance(field, RelatedField) and field.use_pk_only_optimization()):
+                    raise ValueError(f'{name}: related field needs the whole object')
+                self.getters.append((name, self._pk_getter(prefix + field.source, field.to_representation)))
+            else:
+                self.getters.append((name, self._column_getter(prefix + field.source, field.to_representation)))
+
+    @staticmethod
+    def _model_field(model, field):
+        """The concrete model field a serializer field reads directly, if any"""
+        if field.source == '*' or len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        return model_field if model_field.concrete else None
+
+    @staticmethod
+    def _column_getter(key, to_representation):
+        def get(row, instance):
+            value = row[key]
+            return None if value is None else to_representation(value)
+        return get
+
+    @staticmethod
+    def _display_getter(key, model_field, field):
+        # What Model._get_FIELD_display returns, without DRF's callable introspection
+        choices = dict(model_field.flatchoices)
+        to_representation = field.to_representation
+
+        def get(row, instance):
+            value = row[key]
+            display = force_str(choices.get(value, value), strings_only=True)
+            return None if display is None else to_representation(display)
+        return get
+
+    @staticmethod
+    def _pk_getter(key, to_representation):
+        def get(row, instance):
+            value = row[key]
+            return None if value is None else to_representation(PKOnlyObject(pk=value))
+        return get
+
+    @staticmethod
+    def _nested_getter(key, compiled):
+        def get(row, instance):
+            return None if row[key] is None else compiled.render(row)
+        return get
+
+    @staticmethod
+    def _instance_getter(field):
+        # Same steps as Serializer.to_representation for one field
+        def get(row, instance):
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                return _SKIP
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            return None if check_for_none is None else field.to_representation(attribute)
+        return get
+
+    def render(self, row):
+        instance = self.instance.build(row) if self.instance is not None else None
+        result = {}
+        for name, get in self.getters:
+            value = get(row, instance)
+            if value is not _SKIP:
+                result[name] = value
+        return result
+
+
+def supports_projection(serializer_class):
+    meta = getattr(serializer_class, 'Meta', None)
+    list_serializer_class = getattr(meta, 'list_serializer_class', None)
+    return isinstance(list_serializer_class, type) and issubclass(list_serializer_class, ProjectionListSerializer)
+
+
+def project_queryset(queryset, serializer, extra_columns=()):
+    """
+    Narrow queryset to .values() rows for rendering with serializer, or
+    return it unchanged when the serializer can't be rendered that way.
+    extra_columns are read by the caller, e.g. pagination cursor fields.
+    """
+    if not supports_projection(type(serializer)) or getattr(serializer, 'sparse_fieldset', None):
+        return queryset
+    projection = get_projection(serializer, queryset.model)
+    if projection is None:
+        return queryset
+    only, select_related, prefetch_related = projection
+    if prefetch_related:
+        return queryset  # To-many relations need instances to prefetch onto
+    columns = only | {column.lstrip('-') for column in extra_columns}
+    # Every relation on a path, so its pk says whether the related row exists
+    for column in list(columns):
+        parts = column.split('__')
+        columns.update('__'.join(parts[:depth]) for depth in range(1, len(parts)))
+    columns = sorted(columns)
+    try:
+        _CompiledSerializer(serializer, queryset.model, '', columns)
+    except ValueError:
+        return queryset
+    return queryset.values(*columns)
+
+
+class ProjectionListSerializer(serializers.ListSerializer):
+    """Renders .values() rows with compiled getters; instances take the normal path"""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        rows = list(iterable)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+        compiled = _CompiledSerializer(self.child, self.child.Meta.model, '', rows[0].keys())
+        return [compiled.render(row) for row in rows]
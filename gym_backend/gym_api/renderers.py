@@ -0,0 +1,98 @@
+"""
+Faster JSON rendering/parsing and MessagePack content negotiation.
+
+FastJSONRenderer/FastJSONParser use orjson when it is installed and produce
+the same bytes as DRF's JSONRenderer: compact separators, UTF-8 output,
+'Z' for UTC datetimes, Decimal as a number, U+2028/U+2029 escaped. Types
+orjson doesn't know are encoded by DRF's own JSONEncoder.default.
+
+MessagePackRenderer (Accept: application/msgpack) carries the same values
+as the JSON body - datetimes, dates, Decimals, UUIDs etc. are encoded
+exactly as in JSON - for clients that want the smaller binary framing.
+It needs the optional msgpack package; settings only offer it when the
+package is importable.
+"""
+
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stock json module
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional
+    msgpack = None
+
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+# DRF's JSON encoding for anything the fast encoders don't handle natively
+_encode_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson; indented output still goes through json.dumps"""
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        # orjson always writes compact UTF-8 - other COMPACT_JSON/UNICODE_JSON settings keep the stock path
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_encode_default, option=self.options)
+        # Same strict-JavaScript-subset escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson, which also rejects NaN/Infinity like strict mode"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            if codecs.lookup(encoding).name != 'utf-8':
+                body = body.decode(encoding).encode('utf-8')
+            return orjson.loads(body)
+        except (ValueError, UnicodeError) as exc:  # orjson.JSONDecodeError is a ValueError
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
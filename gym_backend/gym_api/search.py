@@ -0,0 +1,202 @@
+"""
+Ranked, index-backed search over a gym's members, trainers and equipment.
+
+Searchable text is denormalised into SearchDocument rows (see signals.py) and
+queried with the best index the database offers:
+- PostgreSQL: pg_trgm word similarity over a GIN (gym_owner_id, content) index,
+  so typos and infix matches ("ohn smi") still rank
+- SQLite: an FTS5 prefix index ranked by bm25
+- anything else: a LIKE scan of the gym's documents
+"""
+
+import re
+
+from django.db import connections
+
+from .models import Member, SearchDocument, Trainer, Equipment
+
+
+SEARCH_KINDS = tuple(kind for kind, label in SearchDocument.KINDS)
+INDEXED_MODELS = {Member: 'member', Trainer: 'trainer', Equipment: 'equipment'}
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# A title that starts with the query outranks a fuzzy match elsewhere
+PREFIX_BONUS = 0.5
+
+_PHONE_RE = re.compile(r'^\+?[\d\s().-]+$')
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize_text(*values):
+    return ' '.join(' '.join(str(value).split()).lower() for value in values if value)
+
+
+def normalize_phone(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def normalize_query(query):
+    """Lower-case the query; phone numbers typed with separators collapse to digits"""
+    query = (query or '').strip()
+    if _PHONE_RE.match(query) and any(char.isdigit() for char in query):
+        return normalize_phone(query)
+    return normalize_text(query)
+
+
+def _user_name(user):
+    return user.get_full_name() or user.username
+
+
+def build_document(instance):
+    """(kind, title, detail, content) for an indexable instance, or None"""
+    if isinstance(instance, Member):
+        title = _user_name(instance.user)
+        return 'member', title, instance.member_id, normalize_text(
+            title, instance.member_id, instance.user.email, normalize_phone(instance.phone),
+        )
+    if isinstance(instance, Trainer):
+        title = _user_name(instance.user)
+        return 'trainer', title, instance.get_specialization_display(), normalize_text(
+            title, instance.trainer_id, instance.user.email, normalize_phone(instance.phone),
+        )
+    if isinstance(instance, Equipment):
+        return 'equipment', instance.name, instance.get_equipment_type_display(), normalize_text(
+            instance.name, instance.brand, instance.model, instance.equipment_id, instance.serial_number,
+        )
+    return None
+
+
+def index_object(instance):
+    document = build_document(instance)
+    if document is None:
+        return
+    kind, title, detail, content = document
+    SearchDocument.objects.update_or_create(kind=kind, object_id=instance.pk, defaults={
+        'gym_owner_id': instance.gym_owner_id,
+        'title': title[:255],
+        'detail': (detail or '')[:255],
+        'content': content,
+    })
+
+
+def unindex_object(instance):
+    kind = INDEXED_MODELS.get(type(instance))
+    if kind is not None:
+        SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def _new_document(instance):
+    kind, title, detail, content = build_document(instance)
+    return SearchDocument(
+        gym_owner_id=instance.gym_owner_id, kind=kind, object_id=instance.pk,
+        title=title[:255], detail=(detail or '')[:255], content=content,
+    )
+
+
+def index_objects(instances, batch_size=500):
+    """Index newly created rows in bulk - for bulk_create, which sends no signals"""
+    SearchDocument.objects.bulk_create([_new_document(instance) for instance in instances], batch_size=batch_size)
+
+
+def rebuild_index(gym_owner_id=None, batch_size=500):
+    """Re-create every search document, optionally for one gym. Returns the count"""
+    documents = SearchDocument.objects.all()
+    sources = [
+        Member.objects.select_related('user'),
+        Trainer.objects.select_related('user'),
+        Equipment.objects.all(),
+    ]
+    if gym_owner_id is not None:
+        documents = documents.filter(gym_owner_id=gym_owner_id)
+        sources = [queryset.filter(gym_owner_id=gym_owner_id) for queryset in sources]
+
+    documents.delete()
+    created = 0
+    for queryset in sources:
+        batch = [_new_document(instance) for instance in queryset.iterator(chunk_size=batch_size)]
+        SearchDocument.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    return created
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _table_exists(connection, table):
+    cache = connection.__dict__.setdefault('_gym_api_tables', {})
+    if table not in cache:
+        with connection.cursor() as cursor:
+            cache[table] = table in connection.introspection.table_names(cursor)
+    return cache[table]
+
+
+def _search_postgres(gym_owner_id, query, kinds, limit):
+    contains = f'%{_escape_like(query)}%'
+    prefix = f'{_escape_like(query)}%'
+    return list(SearchDocument.objects.raw(
+        """
+        SELECT id, kind, object_id, title, detail,
+               word_similarity(%s, content)
+               + CASE WHEN content LIKE %s THEN %s ELSE 0 END AS score
+        FROM gym_api_searchdocument
+        WHERE gym_owner_id = %s AND kind = ANY(%s)
+          AND (%s <%% content OR content LIKE %s)
+        ORDER BY score DESC, title
+        LIMIT %s
+        """,
+        [query, prefix, PREFIX_BONUS, gym_owner_id, list(kinds), query, contains, limit],
+    ))
+
+
+def _search_sqlite_fts(gym_owner_id, query, kinds, limit):
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return []
+    match = ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+    placeholders = ', '.join(['%s'] * len(kinds))
+    return list(SearchDocument.objects.raw(
+        f"""
+        SELECT d.id, d.kind, d.object_id, d.title, d.detail,
+               -bm25(gym_api_searchdocument_fts)
+               + CASE WHEN d.content LIKE %s ESCAPE '\\' THEN %s ELSE 0 END AS score
+        FROM gym_api_searchdocument_fts
+        JOIN gym_api_searchdocument d ON d.id = gym_api_searchdocument_fts.rowid
+        WHERE gym_api_searchdocument_fts MATCH %s
+          AND d.gym_owner_id = %s AND d.kind IN ({placeholders})
+        ORDER BY score DESC, d.title
+        LIMIT %s
+        """,
+        [f'{_escape_like(query)}%', PREFIX_BONUS, match, gym_owner_id, *kinds, limit],
+    ))
+
+
+def _search_like(gym_owner_id, query, kinds, limit):
+    documents = SearchDocument.objects.filter(gym_owner_id=gym_owner_id, kind__in=kinds)
+    for token in query.split():
+        documents = documents.filter(content__contains=token)
+    results = list(documents.order_by('title')[:limit])
+    for document in results:
+        document.score = PREFIX_BONUS if document.content.startswith(query) else 0
+    results.sort(key=lambda document: -document.score)
+    return results
+
+
+def search(gym_owner_id, query, kinds=SEARCH_KINDS, limit=DEFAULT_LIMIT, using='default'):
+    """
+    Best matches for `query` within one gym, highest score first. Each result
+    is a SearchDocument with an extra `score` attribute.
+    """
+    query = normalize_query(query)
+    kinds = [kind for kind in kinds if kind in SEARCH_KINDS]
+    if not query or not kinds:
+        return []
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return _search_postgres(gym_owner_id, query, kinds, limit)
+    if connection.vendor == 'sqlite' and _table_exists(connection, 'gym_api_searchdocument_fts'):
+        return _search_sqlite_fts(gym_owner_id, query, kinds, limit)
+    return _search_like(gym_owner_id, query, kinds, limit)
@@ -1,54 +1,183 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import models
+from datetime import date
+import base64
+import binascii
+import hashlib
+from .imaging import store_profile_picture
+from .projection import ProjectionListSerializer
 from .models import GymOwner, Member, Trainer, Equipment, WorkoutPlan, Exercise, WorkoutSession, MembershipPayment, Attendance, SubscriptionPlan, MemberSubscription, TrainerMemberAssociation, Notification
 
 
+REPRESENTATION_CACHE_TIMEOUT = 3600  # 1 hour - keys change whenever the row does
+
+# Columns read by computed fields, for sparse fieldset projection (see fieldsets.py)
+PROFILE_PICTURE_COLUMNS = ('profile_picture_key', 'profile_picture')
+MEMBER_FIELD_DEPENDENCIES = {
+    'days_until_expiry': ('membership_expiry',),
+    'bmi': ('height_cm', 'weight_kg'),
+    'bmi_category': ('height_cm', 'weight_kg'),
+    'profile_picture_url': PROFILE_PICTURE_COLUMNS,
+    'profile_picture_full_url': PROFILE_PICTURE_COLUMNS,
+    'age': ('date_of_birth',),
+}
+MEMBER_NAME_COLUMNS = ('member__user__first_name', 'member__user__last_name')
+
+
+class CachedRepresentationListSerializer(serializers.ListSerializer):
+    """
+    List serializer that fetches cached row representations for the whole
+    page in one multi-get and only serializes the rows that missed
+    """
+    
+    def to_representation(self, data):
+        if getattr(self.child, 'sparse_fieldset', None):
+            return super().to_representation(data)
+        
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(iterable)
+        keys = [self.child.get_representation_cache_key(item) for item in items]
+        cached = cache.get_many(keys)
+        
+        result = []
+        missed = {}
+        for key, item in zip(keys, items):
+            representation = cached.get(key)
+            if representation is None:
+                representation = self.child.to_representation(item)
+                missed[key] = representation
+            result.append(representation)
+        
+        if missed:
+            cache.set_many(missed, REPRESENTATION_CACHE_TIMEOUT)
+        return result
+
+
+class CachedRepresentationMixin:
+    """
+    Opt-in per-object representation cache for read-heavy serializers.
+    
+    Entries are keyed on serializer, model, pk and updated_at, plus the
+    values listed in `representation_cache_dependencies` for nested objects
+    ({'relation__path': ('field', ...)}), today's date for computed fields
+    like days_until_expiry, and the request's scheme and host, which
+    AbsoluteURLFields build their URLs from. Set Meta.list_serializer_class to
+    CachedRepresentationListSerializer to batch lookups for list responses.
+    Serializers pruned to a sparse fieldset bypass the cache.
+    """
+    representation_cache_timestamp_field = 'updated_at'
+    representation_cache_dependencies = {}
+    
+    def get_representation_cache_key(self, instance):
+        parts = [date.today().isoformat(), getattr(instance, self.representation_cache_timestamp_field, None)]
+        request = self.context.get('request')
+        if request is not None:
+            parts.append(request.build_absolute_uri('/'))
+        for path, fields in self.representation_cache_dependencies.items():
+            related = instance
+            for attr in path.split('__'):
+                related = getattr(related, attr, None) if related is not None else None
+            parts.extend(getattr(related, field, None) for field in fields)
+        version = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+        return f'repr_{self.__class__.__name__}_{instance._meta.label_lower}_{instance.pk}_{version}'
+    
+    def to_representation(self, instance):
+        # Nested/list use is cached by the parent list serializer in one multi-get
+        if self.parent is not None or instance.pk is None or getattr(self, 'sparse_fieldset', None):
+            return super().to_representation(instance)
+        
+        cache_key = self.get_representation_cache_key(instance)
+        representation = cache.get(cache_key)
+        if representation is None:
+            representation = super().to_representation(instance)
+            cache.set(cache_key, representation, REPRESENTATION_CACHE_TIMEOUT)
+        return representation
+
+
+class AbsoluteURLField(serializers.CharField):
+    """Read-only root-relative URL, made absolute against the current request when there is one"""
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return request.build_absolute_uri(value) if request is not None else value
+
+
+class ProfilePictureUploadMixin(serializers.Serializer):
+    """
+    Accepts profile pictures as base64 (profile_picture_base64 plus an
+    optional profile_picture_content_type) and stores them in the image
+    store, saving only the resulting key on the row; derivatives are
+    created in the background (see imaging.py)
+    """
+    profile_picture_base64 = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    profile_picture_content_type = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        data = attrs.pop('profile_picture_base64', None)
+        content_type = attrs.pop('profile_picture_content_type', None) or 'image/jpeg'
+        if data:
+            try:
+                image = base64.b64decode(data, validate=True)
+            except (binascii.Error, ValueError):
+                raise serializers.ValidationError({'profile_picture_base64': 'Invalid base64 image data'})
+            attrs['profile_picture_key'] = store_profile_picture(image, content_type)
+        return attrs
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 
-class GymOwnerSerializer(serializers.ModelSerializer):
+class GymOwnerSerializer(ProfilePictureUploadMixin, serializers.ModelSerializer):
+    sparse_field_dependencies = {
+        'total_members': (),
+        'total_trainers': (),
+        'total_equipment': (),
+        'profile_picture_url': PROFILE_PICTURE_COLUMNS,
+        'profile_picture_full_url': PROFILE_PICTURE_COLUMNS,
+    }
     user = UserSerializer(read_only=True)
     total_members = serializers.SerializerMethodField()
     total_trainers = serializers.SerializerMethodField()
     total_equipment = serializers.SerializerMethodField()
-    profile_picture_url = serializers.SerializerMethodField()
+    profile_picture_url = AbsoluteURLField()
+    profile_picture_full_url = AbsoluteURLField()
     
     class Meta:
         model = GymOwner
-        fields = '__all__'
+        exclude = ['profile_picture_key']
+    
+    def get_counts(self, obj):
+        """
+        Totals from GymOwner.objects.with_counts() annotations; instances
+        loaded without them get all three from one memoised query
+        """
+        if not hasattr(obj, 'total_members'):
+            counts = GymOwner.objects.with_counts().filter(pk=obj.pk).values(
+                'total_members', 'total_trainers', 'total_equipment'
+            ).first() or {}
+            obj.total_members = counts.get('total_members', 0)
+            obj.total_trainers = counts.get('total_trainers', 0)
+            obj.total_equipment = counts.get('total_equipment', 0)
+        return obj
     
     def get_total_members(self, obj):
-        return obj.members.filter(is_active=True).count()
+        return self.get_counts(obj).total_members
     
     def get_total_trainers(self, obj):
-        return obj.trainers.filter(is_available=True).count()
+        return self.get_counts(obj).total_trainers
     
     def get_total_equipment(self, obj):
-        return obj.equipment.filter(is_working=True).count()
-    
-    def get_profile_picture_url(self, obj):
-        """Get the full URL for the profile picture - prefer base64 data URL for Railway"""
-        # First try base64 data URL (works reliably on Railway)
-        if obj.profile_picture_base64 and obj.profile_picture_content_type:
-            data_url = f"data:{obj.profile_picture_content_type};base64,{obj.profile_picture_base64}"
-            print(f'🖼️ Using base64 data URL for profile picture')
-            return data_url
-        
-        # Fallback to traditional file URL
-        if obj.profile_picture and obj.profile_picture.name:
-            request = self.context.get('request')
-            if request:
-                try:
-                    return request.build_absolute_uri(obj.profile_picture.url)
-                except Exception as e:
-                    print(f'❌ Error building profile picture URL: {e}')
-                    return obj.profile_picture.url
-            else:
-                return obj.profile_picture.url
-        return None
+        return self.get_counts(obj).total_equipment
     
     def create(self, validated_data):
         # Extract user data from request
@@ -102,24 +231,29 @@ class GymOwnerMinimalSerializer(serializers.ModelSerializer):
         fields = ['id', 'gym_name']  # Only essential fields
 
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(CachedRepresentationMixin, ProfilePictureUploadMixin, serializers.ModelSerializer):
+    representation_cache_dependencies = {
+        'user': ('first_name', 'last_name', 'email'),
+        'gym_owner': ('updated_at',),
+    }
+    sparse_field_dependencies = MEMBER_FIELD_DEPENDENCIES
     user = UserMinimalSerializer(read_only=True)
     gym_owner = GymOwnerMinimalSerializer(read_only=True)
     days_until_expiry = serializers.SerializerMethodField()
     bmi = serializers.FloatField(read_only=True)
     bmi_category = serializers.CharField(read_only=True)
-    profile_picture_url = serializers.CharField(read_only=True)
+    profile_picture_url = AbsoluteURLField()
+    profile_picture_full_url = AbsoluteURLField()
     age = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Member
-        fields = '__all__'
+        exclude = ['profile_picture_key']
         extra_kwargs = {
             'member_id': {'required': False, 'read_only': True},
             'gym_owner': {'read_only': True},
-            'profile_picture_base64': {'write_only': True},
-            'profile_picture_content_type': {'write_only': True},
         }
+        list_serializer_class = CachedRepresentationListSerializer
     
     def get_days_until_expiry(self, obj):
         if obj.membership_expiry:
@@ -197,13 +331,51 @@ class MemberSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"Error creating member: {str(e)}")
 
 
+class MemberImportRowSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk member import (see importing.py).
+    Column names match the Member / User fields they populate.
+    """
+    email = serializers.EmailField(max_length=150)
+    first_name = serializers.CharField(max_length=150)
+    last_name = serializers.CharField(max_length=150, required=False, default='')
+    phone = serializers.CharField(max_length=15)
+    date_of_birth = serializers.DateField()
+    gender = serializers.ChoiceField(choices=Member.GENDER_CHOICES, required=False, default='male')
+    address = serializers.CharField()
+    membership_type = serializers.ChoiceField(choices=Member.MEMBERSHIP_TYPES, required=False, default='basic')
+    membership_expiry = serializers.DateField()
+    emergency_contact_name = serializers.CharField(max_length=100)
+    emergency_contact_phone = serializers.CharField(max_length=15)
+    emergency_contact_relation = serializers.CharField(max_length=50, required=False, default='Family')
+    height_cm = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    weight_kg = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    notes = serializers.CharField(required=False, default='')
+
+    def to_internal_value(self, data):
+        data = dict(data)
+        for field in ('gender', 'membership_type'):
+            if isinstance(data.get(field), str):
+                data[field] = data[field].strip().lower()
+        if isinstance(data.get('email'), str):
+            data['email'] = data['email'].strip().lower()
+        return super().to_internal_value(data)
+
+
+class MemberPageSerializer(MemberSerializer):
+    """Full member rows for list responses and nesting - the picture only as its smallest derivative"""
+    profile_picture_url = AbsoluteURLField(source='profile_picture_avatar_url')
+    profile_picture_full_url = None
+
+
 # Super minimal Member serializer for list views (excludes heavy fields)
 class MemberListSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = MEMBER_FIELD_DEPENDENCIES
     user = UserMinimalSerializer(read_only=True)
     days_until_expiry = serializers.SerializerMethodField()
     bmi = serializers.FloatField(read_only=True)
     bmi_category = serializers.CharField(read_only=True)
-    profile_picture_url = serializers.CharField(read_only=True)
+    profile_picture_url = AbsoluteURLField(source='profile_picture_avatar_url')  # Smallest derivative only
     age = serializers.IntegerField(read_only=True)
     
     class Meta:
@@ -214,6 +386,7 @@ class MemberListSerializer(serializers.ModelSerializer):
             'height_cm', 'weight_kg', 'bmi', 'bmi_category', 'profile_picture_url', 'age'
         ]
         # Exclude heavy fields: emergency_contact_*, address, notes, base64 data, etc.
+        list_serializer_class = ProjectionListSerializer
     
     def get_days_until_expiry(self, obj):
         if obj.membership_expiry:
@@ -270,6 +443,7 @@ class MemberListSerializer(serializers.ModelSerializer):
 
 
 class TrainerSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {'total_sessions': ()}
     user = UserMinimalSerializer(read_only=True)
     gym_owner = GymOwnerMinimalSerializer(read_only=True)
     total_sessions = serializers.SerializerMethodField()
@@ -283,6 +457,9 @@ class TrainerSerializer(serializers.ModelSerializer):
         }
     
     def get_total_sessions(self, obj):
+        # Annotated by Trainer.objects.with_session_counts() on list endpoints
+        if hasattr(obj, 'total_sessions'):
+            return obj.total_sessions
         return obj.workoutsession_set.filter(completed=True).count()
     
     def create(self, validated_data):
@@ -356,6 +533,7 @@ class TrainerSerializer(serializers.ModelSerializer):
 
 # Super minimal Trainer serializer for list views (excludes heavy fields)
 class TrainerListSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {'total_sessions': ()}
     user = UserMinimalSerializer(read_only=True)
     total_sessions = serializers.SerializerMethodField()
     
@@ -368,6 +546,9 @@ class TrainerListSerializer(serializers.ModelSerializer):
         # Exclude heavy fields: bio, certifications, experience_details, etc.
     
     def get_total_sessions(self, obj):
+        # Annotated by Trainer.objects.with_session_counts() on list endpoints
+        if hasattr(obj, 'total_sessions'):
+            return obj.total_sessions
         return obj.workoutsession_set.filter(completed=True).count()
     
     def create(self, validated_data):
@@ -417,7 +598,11 @@ class TrainerListSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"Error creating trainer: {str(e)}")
 
 
-class EquipmentSerializer(serializers.ModelSerializer):
+class EquipmentSerializer(CachedRepresentationMixin, serializers.ModelSerializer):
+    representation_cache_dependencies = {
+        'gym_owner': ('updated_at',),
+    }
+    sparse_field_dependencies = {'warranty_status': ('warranty_expiry',)}
     gym_owner = GymOwnerMinimalSerializer(read_only=True)
     condition_display = serializers.CharField(source='get_condition_display', read_only=True)
     warranty_status = serializers.SerializerMethodField()
@@ -429,6 +614,7 @@ class EquipmentSerializer(serializers.ModelSerializer):
             'equipment_id': {'required': False, 'read_only': True},
             'gym_owner': {'read_only': True},
         }
+        list_serializer_class = CachedRepresentationListSerializer
     
     def get_warranty_status(self, obj):
         from datetime import date
@@ -445,6 +631,7 @@ class EquipmentSerializer(serializers.ModelSerializer):
 
 # Super minimal Equipment serializer for list views (excludes heavy fields)
 class EquipmentListSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {'warranty_status': ('warranty_expiry',)}
     warranty_status = serializers.SerializerMethodField()
     
     class Meta:
@@ -455,6 +642,7 @@ class EquipmentListSerializer(serializers.ModelSerializer):
             'warranty_expiry', 'location_in_gym', 'quantity'
         ]
         # Exclude heavy fields: maintenance_notes, description, images, etc.
+        list_serializer_class = ProjectionListSerializer
     
     def get_warranty_status(self, obj):
         from datetime import date
@@ -486,7 +674,7 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
 
 
 class WorkoutSessionSerializer(serializers.ModelSerializer):
-    member = MemberSerializer(read_only=True)
+    member = MemberPageSerializer(read_only=True)
     trainer = TrainerSerializer(read_only=True)
     workout_plan = WorkoutPlanSerializer(read_only=True)
     
@@ -496,6 +684,10 @@ class WorkoutSessionSerializer(serializers.ModelSerializer):
 
 
 class SubscriptionPlanSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {
+        'duration_display': ('duration_value', 'duration_type'),
+        'active_subscribers': (),
+    }
     gym_owner = GymOwnerMinimalSerializer(read_only=True)
     duration_display = serializers.SerializerMethodField()
     active_subscribers = serializers.SerializerMethodField()
@@ -512,11 +704,15 @@ class SubscriptionPlanSerializer(serializers.ModelSerializer):
         return f"{obj.duration_value} {obj.get_duration_type_display()}"
     
     def get_active_subscribers(self, obj):
+        # Annotated by SubscriptionPlan.objects.with_subscriber_counts()
+        if hasattr(obj, 'active_subscribers'):
+            return obj.active_subscribers
         return obj.membersubscription_set.filter(status='active').count()
 
 
 # Super minimal SubscriptionPlan serializer for list views
 class SubscriptionPlanListSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {'duration_display': ('duration_value', 'duration_type')}
     duration_display = serializers.SerializerMethodField()
     
     class Meta:
@@ -531,7 +727,13 @@ class SubscriptionPlanListSerializer(serializers.ModelSerializer):
         return f"{obj.duration_value} {obj.get_duration_type_display()}"
 
 
-class MembershipPaymentSerializer(serializers.ModelSerializer):
+class MembershipPaymentSerializer(CachedRepresentationMixin, serializers.ModelSerializer):
+    representation_cache_dependencies = {
+        'member': ('updated_at',),
+        'member__user': ('first_name', 'last_name', 'email'),
+        'subscription_plan': ('updated_date',),
+        'gym_owner': ('updated_at',),
+    }
     member = MemberListSerializer(read_only=True)
     subscription_plan = SubscriptionPlanListSerializer(read_only=True)
     gym_owner = GymOwnerMinimalSerializer(read_only=True)
@@ -545,6 +747,7 @@ class MembershipPaymentSerializer(serializers.ModelSerializer):
             'payment_id': {'required': False, 'read_only': True},
             'gym_owner': {'read_only': True},
         }
+        list_serializer_class = CachedRepresentationListSerializer
     
     def create(self, validated_data):
         # Extract member and subscription_plan IDs from request data
@@ -639,6 +842,10 @@ class MembershipPaymentSerializer(serializers.ModelSerializer):
 
 # Super minimal Payment serializer for list views (excludes heavy nested data)
 class MembershipPaymentListSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {
+        'member_name': MEMBER_NAME_COLUMNS,
+        'plan_name': ('subscription_plan__name',),
+    }
     member_name = serializers.SerializerMethodField()
     plan_name = serializers.SerializerMethodField()
     payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
@@ -651,6 +858,7 @@ class MembershipPaymentListSerializer(serializers.ModelSerializer):
             'status_display', 'member_name', 'plan_name', 'membership_months'
         ]
         # Exclude heavy fields: member object, subscription_plan object, notes, etc.
+        list_serializer_class = ProjectionListSerializer
     
     def get_member_name(self, obj):
         if obj.member and obj.member.user:
@@ -662,6 +870,7 @@ class MembershipPaymentListSerializer(serializers.ModelSerializer):
 
 
 class AttendanceSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {'duration_display': ('check_in_time', 'check_out_time')}
     member = MemberListSerializer(read_only=True)
     gym_owner = GymOwnerMinimalSerializer(read_only=True)
     duration_display = serializers.SerializerMethodField()
@@ -682,18 +891,34 @@ class AttendanceSerializer(serializers.ModelSerializer):
         return "In progress"
 
 
+# Member as shown on an attendance row - same shape as MemberListSerializer's
+# id/member_id/user, without the profile picture and body metrics
+class AttendanceMemberSerializer(serializers.ModelSerializer):
+    user = UserMinimalSerializer(read_only=True)
+    
+    class Meta:
+        model = Member
+        fields = ['id', 'member_id', 'user']
+
+
 # Super minimal Attendance serializer for list views (excludes heavy nested data)
 class AttendanceListSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {
+        'member_name': MEMBER_NAME_COLUMNS,
+        'duration_display': ('check_in_time', 'check_out_time'),
+    }
+    member = AttendanceMemberSerializer(read_only=True)
     member_name = serializers.SerializerMethodField()
     duration_display = serializers.SerializerMethodField()
     
     class Meta:
         model = Attendance
         fields = [
-            'id', 'attendance_id', 'date', 'check_in_time', 'check_out_time',
-            'member_name', 'duration_display', 'qr_code_used'
+            'id', 'attendance_id', 'member', 'date', 'check_in_time', 'check_out_time',
+            'member_name', 'duration_display', 'qr_code_used', 'notes'
         ]
-        # Exclude heavy fields: member object, gym_owner object, notes, etc.
+        # Exclude heavy fields: full member object, gym_owner object, etc.
+        list_serializer_class = ProjectionListSerializer
     
     def get_member_name(self, obj):
         if obj.member and obj.member.user:
@@ -709,6 +934,12 @@ class AttendanceListSerializer(serializers.ModelSerializer):
 
 
 class MemberSubscriptionSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {
+        'is_active': ('status', 'end_date'),
+        'is_expired': ('end_date',),
+        'is_expiring_soon': ('end_date',),
+        'days_remaining': ('end_date',),
+    }
     member = MemberListSerializer(read_only=True)  # Use minimal member serializer
     subscription_plan = SubscriptionPlanListSerializer(read_only=True)  # Use minimal plan serializer
     gym_owner = GymOwnerMinimalSerializer(read_only=True)  # Use minimal gym owner serializer
@@ -800,6 +1031,11 @@ class MemberSubscriptionSerializer(serializers.ModelSerializer):
 
 # Super minimal MemberSubscription serializer for list views (excludes heavy nested data)
 class MemberSubscriptionListSerializer(serializers.ModelSerializer):
+    sparse_field_dependencies = {
+        'member_name': MEMBER_NAME_COLUMNS,
+        'plan_name': ('subscription_plan__name',),
+        'days_remaining': ('end_date',),
+    }
     member_name = serializers.SerializerMethodField()
     plan_name = serializers.SerializerMethodField()
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -812,6 +1048,7 @@ class MemberSubscriptionListSerializer(serializers.ModelSerializer):
             'member_name', 'plan_name', 'amount_paid', 'payment_method', 'days_remaining'
         ]
         # Exclude heavy fields: full member object, full subscription_plan object, gym_owner object, etc.
+        list_serializer_class = ProjectionListSerializer
     
     def get_member_name(self, obj):
         if obj.member and obj.member.user:
@@ -827,7 +1064,7 @@ class MemberSubscriptionListSerializer(serializers.ModelSerializer):
 
 class WorkoutPlanSerializer(serializers.ModelSerializer):
     created_by = TrainerSerializer(read_only=True)
-    gym_owner = GymOwnerSerializer(read_only=True)
+    gym_owner = GymOwnerMinimalSerializer(read_only=True)
     difficulty_display = serializers.CharField(source='get_difficulty_level_display', read_only=True)
     
     class Meta:
@@ -837,7 +1074,7 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
 
 class ExerciseSerializer(serializers.ModelSerializer):
     equipment_needed = EquipmentSerializer(many=True, read_only=True)
-    gym_owner = GymOwnerSerializer(read_only=True)
+    gym_owner = GymOwnerMinimalSerializer(read_only=True)
     muscle_group_display = serializers.CharField(source='get_muscle_group_display', read_only=True)
     
     class Meta:
@@ -846,10 +1083,10 @@ class ExerciseSerializer(serializers.ModelSerializer):
 
 
 class WorkoutSessionSerializer(serializers.ModelSerializer):
-    member = MemberSerializer(read_only=True)
+    member = MemberPageSerializer(read_only=True)
     trainer = TrainerSerializer(read_only=True)
     workout_plan = WorkoutPlanSerializer(read_only=True)
-    gym_owner = GymOwnerSerializer(read_only=True)
+    gym_owner = GymOwnerMinimalSerializer(read_only=True)
     
     class Meta:
         model = WorkoutSession
@@ -857,10 +1094,10 @@ class WorkoutSessionSerializer(serializers.ModelSerializer):
 
 
 class TrainerMemberAssociationSerializer(serializers.ModelSerializer):
-    member = MemberSerializer(read_only=True)
+    member = MemberPageSerializer(read_only=True)
     trainer = TrainerSerializer(read_only=True)
     assigned_by = UserSerializer(read_only=True)
-    gym_owner = GymOwnerSerializer(read_only=True)
+    gym_owner = GymOwnerMinimalSerializer(read_only=True)
     
     # Write-only fields for creating associations
     member_id = serializers.IntegerField(write_only=True)
@@ -898,6 +1135,10 @@ class TrainerMemberAssociationSerializer(serializers.ModelSerializer):
 
 class NotificationSerializer(serializers.ModelSerializer):
     """Serializer for notifications"""
+    sparse_field_dependencies = {
+        'related_member_name': ('related_member__user__first_name', 'related_member__user__last_name'),
+        'time_ago': ('created_at',),
+    }
     related_member_name = serializers.SerializerMethodField()
     time_ago = serializers.SerializerMethodField()
     
@@ -0,0 +1,68 @@
+"""
+Signal handlers that keep versioned caches and the search index in step
+with database writes, and revoke the signed access tokens of users who are
+deactivated or deleted.
+
+No post_delete receivers are connected for gym models: any receiver turns
+off Django's fast bulk delete for its model and costs a query per deleted
+row. Delete paths record tombstones and drop search documents in bulk
+through deletion.record_deletions(); other deletes are picked up by the row
+count in conditional GET validators.
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import revoke_access_tokens
+from .caching import bump_gym_generation
+from .search import INDEXED_MODELS, index_object
+from .models import GymOwner, Member, Trainer
+
+
+@receiver(post_save)
+def bump_gym_generation_on_save(sender, instance, **kwargs):
+    """Any save of a gym-scoped model invalidates that gym's generation-keyed caches"""
+    if sender._meta.app_label != 'gym_api':
+        return
+    if isinstance(instance, GymOwner):
+        bump_gym_generation(instance.pk)
+    else:
+        bump_gym_generation(getattr(instance, 'gym_owner_id', None))
+
+
+# Search index: names and emails live on User, so user edits reindex too
+SEARCH_USER_FIELDS = {'first_name', 'last_name', 'email', 'username'}
+
+
+def update_search_document(sender, instance, **kwargs):
+    index_object(instance)
+
+
+for indexed_model in INDEXED_MODELS:
+    post_save.connect(
+        update_search_document, sender=indexed_model,
+        dispatch_uid=f'update_search_document_{indexed_model._meta.label_lower}',
+    )
+
+
+@receiver(post_save, sender=User, dispatch_uid='reindex_user_search_documents')
+def reindex_user_search_documents(sender, instance, created, update_fields=None, **kwargs):
+    """Refresh member/trainer documents when the linked user's name or email changes"""
+    if created or (update_fields is not None and not SEARCH_USER_FIELDS & set(update_fields)):
+        return  # e.g. last_login updates on every sign-in
+    for model in (Member, Trainer):
+        for profile in model.objects.select_related('user').filter(user=instance):
+            index_object(profile)
+
+
+@receiver(post_save, sender=User, dispatch_uid='revoke_access_tokens_of_inactive_users')
+def revoke_access_tokens_of_inactive_users(sender, instance, **kwargs):
+    """Signed access tokens are never checked against the user row - deactivation has to revoke them"""
+    if 'is_active' not in instance.get_deferred_fields() and not instance.is_active:
+        revoke_access_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User, dispatch_uid='revoke_access_tokens_of_deleted_users')
+def revoke_access_tokens_of_deleted_users(sender, instance, **kwargs):
+    revoke_access_tokens(instance.pk)
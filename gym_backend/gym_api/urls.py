@@ -1,12 +1,13 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 from .views import (
     GymOwnerViewSet, MemberViewSet, TrainerViewSet, EquipmentViewSet,
     WorkoutPlanViewSet, ExerciseViewSet, WorkoutSessionViewSet,
     MembershipPaymentViewSet, AttendanceViewSet, SubscriptionPlanViewSet, MemberSubscriptionViewSet,
-    TrainerMemberAssociationViewSet, NotificationViewSet
+    TrainerMemberAssociationViewSet, NotificationViewSet, SearchViewSet, image_blob
 )
 from . import auth_views
+from .blobstore import IMAGE_KEY_PATTERN
 
 router = DefaultRouter()
 router.register(r'gym-owners', GymOwnerViewSet, basename='gymowner')
@@ -22,6 +23,7 @@ router.register(r'subscription-plans', SubscriptionPlanViewSet, basename='subscr
 router.register(r'member-subscriptions', MemberSubscriptionViewSet, basename='membersubscription')
 router.register(r'trainer-member-associations', TrainerMemberAssociationViewSet, basename='trainermemberassociation')
 router.register(r'notifications', NotificationViewSet, basename='notification')
+router.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -32,6 +34,7 @@ urlpatterns = [
     path('auth/google/', auth_views.google_auth, name='google-auth'),
     path('auth/google-oauth/', auth_views.google_oauth_exchange, name='google-oauth-exchange'),
     path('auth/google/config/', auth_views.google_config_check, name='google-config-check'),
+    path('auth/access-token/', auth_views.renew_access_token, name='renew-access-token'),
     path('auth/logout/', auth_views.gym_owner_logout, name='gym-owner-logout'),
     path('auth/profile/', auth_views.gym_owner_profile, name='gym-owner-profile'),
     path('auth/profile/update/', auth_views.gym_owner_update_profile, name='gym-owner-update-profile'),
@@ -44,4 +47,7 @@ urlpatterns = [
     path('attendance/qr-checkin/<uuid:qr_token>/', 
          AttendanceViewSet.as_view({'post': 'qr_checkin'}), 
          name='qr-checkin'),
+    
+    # Content-addressed profile pictures
+    re_path(rf'^images/(?P<key>{IMAGE_KEY_PATTERN})$', image_blob, name='image-blob'),
 ]
\ No newline at end of file
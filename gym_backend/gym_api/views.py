@@ -1,15 +1,13 @@
 from rest_framework import viewsets, status, permissions, serializers
 from rest_framework.decorators import action, throttle_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
-from rest_framework.pagination import PageNumberPagination
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
 from django.db.models import Q, Count, Sum, Prefetch, F, Avg
 from django.utils import timezone
-from django.views.decorators.cache import cache_page
 from django.core.cache import cache
-from django.utils.decorators import method_decorator
 from datetime import timedelta, date
 import logging
 
@@ -19,26 +17,49 @@ from .models import (
     MembershipPayment, Attendance, SubscriptionPlan, MemberSubscription, TrainerMemberAssociation,
     Notification, get_ist_now, get_ist_date
 )
+from .caching import bump_gym_generation, bump_member_version, member_history_cache_key, MEMBER_HISTORY_CACHE_TIMEOUT
+from .deletion import record_deletions
+from .mixins import (
+    ConditionalGetMixin, DeltaSyncMixin, InstrumentedSerializerMixin, ProjectionMixin, SparseFieldsetMixin, TenantMixin,
+)
+from .fieldsets import get_projection, parse_field_list
+from .importing import import_members, read_member_rows
+from .pagination import (
+    AttendanceKeysetPagination, EquipmentKeysetPagination, MemberKeysetPagination, MemberSubscriptionKeysetPagination,
+)
+from .projection import project_queryset
+from .search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, SEARCH_KINDS, search
 from .serializers import (
-    UserSerializer, GymOwnerSerializer, MemberSerializer, TrainerSerializer, EquipmentSerializer,
+    UserSerializer, GymOwnerSerializer, MemberSerializer, MemberPageSerializer, TrainerSerializer, EquipmentSerializer,
     EquipmentListSerializer, GymOwnerMinimalSerializer, UserMinimalSerializer,
     MemberListSerializer, MembershipPaymentListSerializer,
     WorkoutPlanSerializer, ExerciseSerializer, WorkoutSessionSerializer,
-    MembershipPaymentSerializer, AttendanceSerializer, SubscriptionPlanSerializer, 
+    MembershipPaymentSerializer, AttendanceSerializer, AttendanceListSerializer, SubscriptionPlanSerializer, 
     MemberSubscriptionSerializer, MemberSubscriptionListSerializer,
     TrainerMemberAssociationSerializer, NotificationSerializer
 )
 
 
-class GymOwnerViewSet(viewsets.ModelViewSet):
+def _annotated_trainers():
+    """Trainers as nested by TrainerSerializer, with session counts in one grouped query"""
+    return Trainer.objects.with_session_counts().select_related('user', 'gym_owner')
+
+
+def _attendance_rows(queryset):
+    """Narrow attendance rows to the columns AttendanceListSerializer renders - one joined query"""
+    only, select_related, _ = get_projection(AttendanceListSerializer(), Attendance)
+    return queryset.select_related(*select_related).only(*only)
+
+
+class GymOwnerViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = GymOwner.objects.all()
     serializer_class = GymOwnerSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         # Only return the gym owner for the authenticated user
-        if hasattr(self.request.user, 'gymowner'):
-            return GymOwner.objects.filter(user=self.request.user)
+        if self.tenant.is_gym_owner:
+            return GymOwner.objects.with_counts().select_related('user').with_details().filter(pk=self.tenant.gym_owner_id)
         return GymOwner.objects.none()
     
     @action(detail=True, methods=['get'])
@@ -47,9 +68,9 @@ class GymOwnerViewSet(viewsets.ModelViewSet):
         today = timezone.now().date()
         
         stats = {
-            'total_members': gym_owner.members.filter(is_active=True).count(),
-            'total_trainers': gym_owner.trainers.filter(is_available=True).count(),
-            'total_equipment': gym_owner.equipment.filter(is_working=True).count(),
+            'total_members': gym_owner.total_members,
+            'total_trainers': gym_owner.total_trainers,
+            'total_equipment': gym_owner.total_equipment,
             'active_subscriptions': gym_owner.member_subscriptions.filter(status='active').count(),
             'today_attendance': gym_owner.attendances.filter(date=today).count(),
             'monthly_revenue': gym_owner.payments.filter(
@@ -75,17 +96,18 @@ class GymOwnerViewSet(viewsets.ModelViewSet):
         })
 
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(TenantMixin, InstrumentedSerializerMixin, ProjectionMixin, SparseFieldsetMixin, DeltaSyncMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = MemberSerializer
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [UserRateThrottle]
+    pagination_class = MemberKeysetPagination
     
     def get_queryset(self):
         # Filter members by gym owner with optimized queries
-        if hasattr(self.request.user, 'gymowner'):
-            return Member.objects.select_related('user', 'gym_owner').filter(
-                gym_owner=self.request.user.gymowner
-            ).order_by('-created_at')
+        if self.tenant.is_gym_owner:
+            return Member.objects.select_related('user', 'gym_owner').with_details().filter(
+                gym_owner_id=self.tenant.gym_owner_id
+            ).order_by('-created_at', '-id')
         return Member.objects.none()
     
     def get_serializer_class(self):
@@ -94,66 +116,63 @@ class MemberViewSet(viewsets.ModelViewSet):
             # Check if client wants minimal data
             if self.request.query_params.get('minimal', 'false').lower() == 'true':
                 return MemberListSerializer
+            return MemberPageSerializer
         return MemberSerializer
     
-    def list(self, request, *args, **kwargs):
-        """Optimized list with pagination to reduce response sizes"""
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        # Apply pagination with small page size by default
-        page_size = int(request.query_params.get('page_size', 25))  # Default 25 items
-        page_size = min(page_size, 100)  # Max 100 items per page
-        
-        # Manual pagination to control response size
-        page = int(request.query_params.get('page', 1))
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        total_count = queryset.count()
-        queryset = queryset[start:end]
-        
-        # Use minimal serializer by default for list views
-        serializer_class = self.get_serializer_class()
-        serializer = serializer_class(queryset, many=True, context={'request': request})
-        
-        # Calculate response size estimate
-        import sys
-        response_size_kb = sys.getsizeof(str(serializer.data)) / 1024
-        
-        logger.info(f'Member list response: {len(queryset)} items, ~{response_size_kb:.1f}KB')
-        
-        return Response({
-            'count': total_count,
-            'page': page,
-            'page_size': page_size,
-            'total_pages': (total_count + page_size - 1) // page_size,
-            'response_size_kb': round(response_size_kb, 1),
-            'results': serializer.data
-        })
-    
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create members")
     
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Import members from an uploaded CSV or XLSX file (multipart field `file`).
+        ?dry_run=true only validates. Returns counts and per-row errors.
+        """
+        if not self.tenant.is_gym_owner:
+            return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'No file was submitted.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        dry_run = request.query_params.get('dry_run', 'false').lower() == 'true'
+        result = import_members(self.tenant.gym_owner, read_member_rows(upload, upload.name), dry_run=dry_run)
+        response_status = status.HTTP_201_CREATED if result.created and not dry_run else status.HTTP_200_OK
+        return Response(result.as_dict(), status=response_status)
+    
     @action(detail=True, methods=['get'])
-    @method_decorator(cache_page(300))  # Cache for 5 minutes
     def attendance_history(self, request, pk=None):
         member = self.get_object()
+        
+        # Cached per member and data version - check-ins bump the version
+        cache_key = member_history_cache_key(member, 'attendance')
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            return Response(cached_data)
+        
         # Filter attendance by gym owner for security with optimized query
-        attendance = Attendance.objects.select_related('member', 'gym_owner').filter(
+        attendance = project_queryset(_attendance_rows(Attendance.objects.filter(
             member=member,
-            gym_owner=member.gym_owner
-        ).order_by('-date')[:100]  # Limit to last 100 records
-        serializer = AttendanceSerializer(attendance, many=True)
+            gym_owner_id=member.gym_owner_id
+        )), AttendanceListSerializer()).order_by('-date')[:100]  # Limit to last 100 records
+        serializer = AttendanceListSerializer(attendance, many=True)
+        cache.set(cache_key, serializer.data, MEMBER_HISTORY_CACHE_TIMEOUT)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
-    @method_decorator(cache_page(300))  # Cache for 5 minutes
     def payment_history(self, request, pk=None):
         member = self.get_object()
+        
+        # Cached per member and data version - payments bump the version
+        cache_key = member_history_cache_key(member, 'payments')
+        cached_data = cache.get(cache_key)
+        if cached_data is not None:
+            return Response(cached_data)
+        
         # Filter payments by gym owner for security with optimized query
         payments = MembershipPayment.objects.select_related(
             'member', 'gym_owner', 'subscription_plan'
@@ -162,97 +181,64 @@ class MemberViewSet(viewsets.ModelViewSet):
             gym_owner=member.gym_owner
         ).order_by('-payment_date')[:50]  # Limit to last 50 payments
         serializer = MembershipPaymentSerializer(payments, many=True)
+        cache.set(cache_key, serializer.data, MEMBER_HISTORY_CACHE_TIMEOUT)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def active_members(self, request):
         # Get active members for current gym with pagination
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             members = Member.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 is_active=True
             ).select_related('user')
             
-            # Apply pagination
-            page_size = int(request.query_params.get('page_size', 25))
-            page_size = min(page_size, 100)
-            
-            page = int(request.query_params.get('page', 1))
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            total_count = members.count()
-            members = members[start:end]
-            
-            serializer = MemberListSerializer(members, many=True, context={'request': request})
-            return Response({
-                'count': total_count,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size,
-                'results': serializer.data
-            })
+            page = self.paginate_queryset(self.project_queryset(members, MemberListSerializer))
+            serializer = MemberListSerializer(page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
     
     @action(detail=False, methods=['get'])
     def expiring_memberships(self, request):
         # Get members with expiring memberships with pagination
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             expiry_date = timezone.now().date() + timedelta(days=7)
             members = Member.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 is_active=True,
                 membership_expiry__lte=expiry_date
             ).select_related('user')
             
-            # Apply pagination
-            page_size = int(request.query_params.get('page_size', 25))
-            page_size = min(page_size, 100)
-            
-            page = int(request.query_params.get('page', 1))
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            total_count = members.count()
-            members = members[start:end]
-            
-            serializer = MemberListSerializer(members, many=True, context={'request': request})
-            return Response({
-                'count': total_count,
-                'expiry_date': expiry_date.isoformat(),
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size,
-                'results': serializer.data
-            })
+            page = self.paginate_queryset(self.project_queryset(members, MemberListSerializer))
+            serializer = MemberListSerializer(page, many=True, context={'request': request})
+            response = self.get_paginated_response(serializer.data)
+            response.data['expiry_date'] = expiry_date.isoformat()
+            return response
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
 
 
-class TrainerViewSet(viewsets.ModelViewSet):
+class TrainerViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, DeltaSyncMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = TrainerSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         # Filter trainers by gym owner
-        if hasattr(self.request.user, 'gymowner'):
-            return Trainer.objects.filter(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            return _annotated_trainers().filter(gym_owner_id=self.tenant.gym_owner_id)
         return Trainer.objects.none()
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create trainers")
     
     @action(detail=False, methods=['get'])
     def available(self, request):
         # Filter available trainers by gym owner
-        if hasattr(request.user, 'gymowner'):
-            available_trainers = Trainer.objects.filter(
-                gym_owner=request.user.gymowner,
-                is_available=True
-            )
+        if self.tenant.is_gym_owner:
+            available_trainers = self.get_queryset().filter(is_available=True)
             serializer = self.get_serializer(available_trainers, many=True)
             return Response(serializer.data)
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
@@ -265,9 +251,11 @@ class TrainerViewSet(viewsets.ModelViewSet):
         # Get active associations for this trainer
         associations = TrainerMemberAssociation.objects.filter(
             trainer=trainer,
-            gym_owner=request.user.gymowner,
+            gym_owner_id=self.tenant.gym_owner_id,
             is_active=True
-        ).select_related('member', 'member__user')
+        ).select_related(
+            'gym_owner', 'assigned_by', 'member__user', 'member__gym_owner',
+        ).with_details('member').prefetch_related(Prefetch('trainer', queryset=_annotated_trainers()))
         
         serializer = TrainerMemberAssociationSerializer(associations, many=True)
         return Response(serializer.data)
@@ -283,7 +271,7 @@ class TrainerViewSet(viewsets.ModelViewSet):
         
         # Check if member exists and belongs to this gym
         try:
-            member = Member.objects.get(id=member_id, gym_owner=request.user.gymowner)
+            member = Member.objects.get(id=member_id, gym_owner_id=self.tenant.gym_owner_id)
         except Member.DoesNotExist:
             return Response({'error': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
         
@@ -291,7 +279,7 @@ class TrainerViewSet(viewsets.ModelViewSet):
         existing_association = TrainerMemberAssociation.objects.filter(
             trainer=trainer,
             member=member,
-            gym_owner=request.user.gymowner,
+            gym_owner_id=self.tenant.gym_owner_id,
             is_active=True
         ).first()
         
@@ -308,7 +296,7 @@ class TrainerViewSet(viewsets.ModelViewSet):
             },
             context={
                 'request': request,
-                'gym_owner': request.user.gymowner
+                'gym_owner': self.tenant.gym_owner
             }
         )
         
@@ -332,7 +320,7 @@ class TrainerViewSet(viewsets.ModelViewSet):
             association = TrainerMemberAssociation.objects.get(
                 trainer=trainer,
                 member_id=member_id,
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 is_active=True
             )
             association.deactivate()
@@ -342,16 +330,17 @@ class TrainerViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Association not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-class EquipmentViewSet(viewsets.ModelViewSet):
+class EquipmentViewSet(TenantMixin, InstrumentedSerializerMixin, ProjectionMixin, SparseFieldsetMixin, DeltaSyncMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = EquipmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = EquipmentKeysetPagination
     
     def get_queryset(self):
         # Filter equipment by gym owner with optimized ordering
-        if hasattr(self.request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             return Equipment.objects.filter(
-                gym_owner=self.request.user.gymowner
-            ).select_related('gym_owner').order_by('-created_at')
+                gym_owner_id=self.tenant.gym_owner_id
+            ).select_related('gym_owner').order_by('-created_at', '-id')
         return Equipment.objects.none()
     
     def get_serializer_class(self):
@@ -362,160 +351,79 @@ class EquipmentViewSet(viewsets.ModelViewSet):
                 return EquipmentListSerializer
         return EquipmentSerializer
     
-    def list(self, request, *args, **kwargs):
-        """Optimized list with pagination to reduce 12MB responses to <1MB"""
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        # Apply pagination with small page size by default
-        page_size = int(request.query_params.get('page_size', 10))  # Default 10 items
-        page_size = min(page_size, 50)  # Max 50 items per page
-        
-        # Manual pagination to control response size
-        page = int(request.query_params.get('page', 1))
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        total_count = queryset.count()
-        queryset = queryset[start:end]
-        
-        # Use minimal serializer by default for list views
-        serializer_class = self.get_serializer_class()
-        serializer = serializer_class(queryset, many=True, context={'request': request})
-        
-        # Calculate response size estimate
-        import sys
-        response_size_kb = sys.getsizeof(str(serializer.data)) / 1024
-        
-        logger.info(f'Equipment list response: {len(queryset)} items, ~{response_size_kb:.1f}KB')
-        
-        return Response({
-            'count': total_count,
-            'page': page,
-            'page_size': page_size,
-            'total_pages': (total_count + page_size - 1) // page_size,
-            'response_size_kb': round(response_size_kb, 1),
-            'results': serializer.data
-        })
-    
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create equipment")
     
     @action(detail=False, methods=['get'])
     def working(self, request):
         # Filter working equipment by gym owner with pagination
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             working_equipment = Equipment.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 is_working=True
             ).select_related('gym_owner')
             
-            # Apply pagination for working equipment too
-            page_size = int(request.query_params.get('page_size', 15))  # Default 15 items
-            page_size = min(page_size, 50)  # Max 50 items
-            
-            page = int(request.query_params.get('page', 1))
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            total_count = working_equipment.count()
-            working_equipment = working_equipment[start:end]
-            
             # Use minimal serializer for better performance
-            serializer = EquipmentListSerializer(working_equipment, many=True, context={'request': request})
-            
-            return Response({
-                'count': total_count,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size,
-                'results': serializer.data
-            })
+            page = self.paginate_queryset(self.project_queryset(working_equipment, EquipmentListSerializer))
+            serializer = EquipmentListSerializer(page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
     
     @action(detail=False, methods=['get'])
     def by_type(self, request):
         equipment_type = request.query_params.get('type')
         if equipment_type:
-            if hasattr(request.user, 'gymowner'):
+            if self.tenant.is_gym_owner:
                 equipment = Equipment.objects.filter(
-                    gym_owner=request.user.gymowner,
+                    gym_owner_id=self.tenant.gym_owner_id,
                     equipment_type=equipment_type
                 ).select_related('gym_owner')
                 
-                # Apply pagination for type filtering too
-                page_size = int(request.query_params.get('page_size', 15))
-                page_size = min(page_size, 50)
-                
-                page = int(request.query_params.get('page', 1))
-                start = (page - 1) * page_size
-                end = start + page_size
-                
-                total_count = equipment.count()
-                equipment = equipment[start:end]
-                
-                serializer = EquipmentListSerializer(equipment, many=True, context={'request': request})
-                return Response({
-                    'count': total_count,
-                    'equipment_type': equipment_type,
-                    'page': page,
-                    'page_size': page_size,
-                    'total_pages': (total_count + page_size - 1) // page_size,
-                    'results': serializer.data
-                })
+                page = self.paginate_queryset(self.project_queryset(equipment, EquipmentListSerializer))
+                serializer = EquipmentListSerializer(page, many=True, context={'request': request})
+                response = self.get_paginated_response(serializer.data)
+                response.data['equipment_type'] = equipment_type
+                return response
             return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
         return Response({'error': 'Type parameter required'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
     def maintenance_due(self, request):
         # Get equipment needing maintenance with pagination
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             today = timezone.now().date()
             equipment = Equipment.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 next_maintenance_date__lte=today
             ).select_related('gym_owner')
             
-            # Apply pagination
-            page_size = int(request.query_params.get('page_size', 15))
-            page_size = min(page_size, 50)
-            
-            page = int(request.query_params.get('page', 1))
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            total_count = equipment.count()
-            equipment = equipment[start:end]
-            
-            serializer = EquipmentListSerializer(equipment, many=True, context={'request': request})
-            return Response({
-                'count': total_count,
-                'maintenance_due_date': today.isoformat(),
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size,
-                'results': serializer.data
-            })
+            page = self.paginate_queryset(self.project_queryset(equipment, EquipmentListSerializer))
+            serializer = EquipmentListSerializer(page, many=True, context={'request': request})
+            response = self.get_paginated_response(serializer.data)
+            response.data['maintenance_due_date'] = today.isoformat()
+            return response
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
 
 
-class WorkoutPlanViewSet(viewsets.ModelViewSet):
+class WorkoutPlanViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = WorkoutPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_timestamp_fields = ('updated_date',)
     
     def get_queryset(self):
         # Filter workout plans by gym owner
-        if hasattr(self.request.user, 'gymowner'):
-            return WorkoutPlan.objects.filter(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            return WorkoutPlan.objects.select_related('gym_owner').filter(gym_owner_id=self.tenant.gym_owner_id)
         return WorkoutPlan.objects.none()
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create workout plans")
     
@@ -523,9 +431,9 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
     def by_difficulty(self, request):
         difficulty = request.query_params.get('difficulty')
         if difficulty:
-            if hasattr(request.user, 'gymowner'):
+            if self.tenant.is_gym_owner:
                 plans = WorkoutPlan.objects.filter(
-                    gym_owner=request.user.gymowner,
+                    gym_owner_id=self.tenant.gym_owner_id,
                     difficulty_level=difficulty,
                     is_active=True
                 )
@@ -535,20 +443,21 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
         return Response({'error': 'Difficulty parameter required'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+class ExerciseViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ExerciseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_timestamp_fields = ('created_date',)
     
     def get_queryset(self):
         # Filter exercises by gym owner
-        if hasattr(self.request.user, 'gymowner'):
-            return Exercise.objects.filter(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            return Exercise.objects.select_related('gym_owner').filter(gym_owner_id=self.tenant.gym_owner_id)
         return Exercise.objects.none()
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create exercises")
     
@@ -556,9 +465,9 @@ class ExerciseViewSet(viewsets.ModelViewSet):
     def by_muscle_group(self, request):
         muscle_group = request.query_params.get('muscle_group')
         if muscle_group:
-            if hasattr(request.user, 'gymowner'):
+            if self.tenant.is_gym_owner:
                 exercises = Exercise.objects.filter(
-                    gym_owner=request.user.gymowner,
+                    gym_owner_id=self.tenant.gym_owner_id,
                     muscle_group=muscle_group
                 )
                 serializer = self.get_serializer(exercises, many=True)
@@ -567,28 +476,29 @@ class ExerciseViewSet(viewsets.ModelViewSet):
         return Response({'error': 'Muscle group parameter required'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class WorkoutSessionViewSet(viewsets.ModelViewSet):
+class WorkoutSessionViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = WorkoutSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_timestamp_fields = ('created_date',)
     
     def get_queryset(self):
         # Filter workout sessions by gym owner
-        if hasattr(self.request.user, 'gymowner'):
-            return WorkoutSession.objects.filter(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            return WorkoutSession.objects.select_related('gym_owner').filter(gym_owner_id=self.tenant.gym_owner_id)
         return WorkoutSession.objects.none()
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create workout sessions")
     
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             upcoming_sessions = WorkoutSession.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 date__gte=timezone.now(),
                 completed=False
             ).order_by('date')
@@ -604,25 +514,25 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         return Response({'status': 'Session marked as completed'})
 
 
-class MembershipPaymentViewSet(viewsets.ModelViewSet):
+class MembershipPaymentViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, DeltaSyncMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = MembershipPaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         # Filter payments by gym owner with optimized queries and descending order
-        if hasattr(self.request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             return MembershipPayment.objects.select_related(
                 'member__user', 'subscription_plan', 'gym_owner'
             ).filter(
-                gym_owner=self.request.user.gymowner
+                gym_owner_id=self.tenant.gym_owner_id
             ).order_by('-payment_date', '-created_at')  # Newest payments first
         return MembershipPayment.objects.none()
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation and extend membership
-        if hasattr(self.request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             try:
-                payment = serializer.save(gym_owner=self.request.user.gymowner)
+                payment = serializer.save(gym_owner=self.tenant.gym_owner)
                 
                 # Safe logging with null checks
                 member_name = 'Unknown Member'
@@ -647,10 +557,10 @@ class MembershipPaymentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def monthly_revenue(self, request):
         # Get monthly revenue for current gym
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             today = timezone.now().date()
             payments = MembershipPayment.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 payment_date__month=today.month,
                 payment_date__year=today.year,
                 status='completed'
@@ -669,8 +579,8 @@ class MembershipPaymentViewSet(viewsets.ModelViewSet):
     @throttle_classes([UserRateThrottle])
     def revenue_analytics(self, request):
         """Get comprehensive revenue analytics for current gym - OPTIMIZED"""
-        if hasattr(request.user, 'gymowner'):
-            gym_owner = request.user.gymowner
+        if self.tenant.is_gym_owner:
+            gym_owner = self.tenant.gym_owner
             cache_key = f'revenue_analytics_{gym_owner.id}'
             
             # Try to get from cache first
@@ -789,50 +699,42 @@ class MembershipPaymentViewSet(viewsets.ModelViewSet):
             return 0.0
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(TenantMixin, InstrumentedSerializerMixin, ProjectionMixin, SparseFieldsetMixin, DeltaSyncMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = AttendanceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AttendanceKeysetPagination
+    list_actions = ('list', 'today_attendance')
+    projection_actions = list_actions
     
     def get_queryset(self):
         # Filter attendance by gym owner and optionally by date
-        if hasattr(self.request.user, 'gymowner'):
-            queryset = Attendance.objects.filter(gym_owner=self.request.user.gymowner)
-            
-            # Check for date parameter in query string
-            date_param = self.request.query_params.get('date')
-            print(f'🔍 ATTENDANCE: Received query params: {dict(self.request.query_params)}')
-            print(f'🔍 ATTENDANCE: Date parameter: {date_param}')
-            
-            if date_param:
-                try:
-                    # Parse date from YYYY-MM-DD format
-                    from datetime import datetime
-                    filter_date = datetime.strptime(date_param, '%Y-%m-%d').date()
-                    
-                    # Debug: Show what we're filtering for vs what exists
-                    total_count = queryset.count()
-                    queryset = queryset.filter(date=filter_date)
-                    filtered_count = queryset.count()
-                    
-                    print(f'📅 ATTENDANCE: Filtering by date {filter_date}')
-                    print(f'📊 ATTENDANCE: Total records: {total_count}, After date filter: {filtered_count}')
-                    
-                    # Debug: Show actual dates in database
-                    all_dates = Attendance.objects.filter(gym_owner=self.request.user.gymowner).values_list('date', flat=True).distinct()
-                    print(f'📅 ATTENDANCE: Available dates in DB: {list(all_dates)}')
-                    
-                except ValueError:
-                    print(f'❌ ATTENDANCE: Invalid date format {date_param}, returning all records')
-            else:
-                print(f'📋 ATTENDANCE: No date filter applied, returning all records')
-            
-            return queryset.order_by('-date', '-check_in_time')
-        return Attendance.objects.none()
+        if not self.tenant.is_gym_owner:
+            return Attendance.objects.none()
+        
+        queryset = Attendance.objects.filter(gym_owner_id=self.tenant.gym_owner_id)
+        date_param = self.request.query_params.get('date')
+        if date_param:
+            try:
+                queryset = queryset.filter(date=date.fromisoformat(date_param))
+            except ValueError:
+                pass  # Invalid dates are ignored and all records returned, as before
+        
+        if self.action in self.list_actions:
+            queryset = _attendance_rows(queryset)
+        else:
+            queryset = queryset.select_related('member__user', 'gym_owner')
+        return queryset.order_by('-date', '-check_in_time', '-id')
+    
+    def get_serializer_class(self):
+        """Use the flat list serializer for listings - full member rows stay on detail views"""
+        if self.action in self.list_actions:
+            return AttendanceListSerializer
+        return AttendanceSerializer
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create attendance records")
     
@@ -842,20 +744,20 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         if not member_id:
             return Response({'error': 'Member ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not hasattr(request.user, 'gymowner'):
+        if not self.tenant.is_gym_owner:
             return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
             # Ensure member belongs to the current gym
             member = Member.objects.get(
                 id=member_id,
-                gym_owner=request.user.gymowner
+                gym_owner_id=self.tenant.gym_owner_id
             )
             today = timezone.now().date()
             
             attendance, created = Attendance.objects.get_or_create(
                 member=member,
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 date=today,
                 defaults={
                     'check_in_time': timezone.now(),
@@ -878,20 +780,20 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         if not member_id:
             return Response({'error': 'Member ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not hasattr(request.user, 'gymowner'):
+        if not self.tenant.is_gym_owner:
             return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
             # Ensure member belongs to the current gym
             member = Member.objects.get(
                 id=member_id,
-                gym_owner=request.user.gymowner
+                gym_owner_id=self.tenant.gym_owner_id
             )
             today = timezone.now().date()
             
             attendance = Attendance.objects.get(
                 member=member,
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 date=today
             )
             
@@ -970,18 +872,20 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def today_attendance(self, request):
         """Get today's attendance for the gym"""
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             today = timezone.now().date()
-            attendance = Attendance.objects.filter(
-                gym_owner=request.user.gymowner,
-                date=today
-            ).order_by('-check_in_time')
+            attendance = self.filter_queryset(self.get_queryset()).filter(date=today)
+            totals = attendance.order_by().aggregate(
+                total_checkins=Count('id'),
+                total_checkouts=Count('id', filter=Q(check_out_time__isnull=False)),
+            )
             
+            # The whole day - the app reads only this response, it never pages
             serializer = self.get_serializer(attendance, many=True)
             return Response({
                 'date': today,
-                'total_checkins': attendance.count(),
-                'total_checkouts': attendance.filter(check_out_time__isnull=False).count(),
+                'total_checkins': totals['total_checkins'],
+                'total_checkouts': totals['total_checkouts'],
                 'attendances': serializer.data
             })
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
@@ -990,8 +894,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     @throttle_classes([UserRateThrottle])
     def attendance_analytics(self, request):
         """Get comprehensive attendance analytics for current gym - OPTIMIZED"""
-        if hasattr(request.user, 'gymowner'):
-            gym_owner = request.user.gymowner
+        if self.tenant.is_gym_owner:
+            gym_owner = self.tenant.gym_owner
             cache_key = f'attendance_analytics_{gym_owner.id}'
             
             # Try to get from cache first
@@ -1074,15 +978,23 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     @throttle_classes([UserRateThrottle])
     def delete_all(self, request):
         """Delete all attendance records for the current gym owner"""
-        if hasattr(request.user, 'gymowner'):
-            gym_owner = request.user.gymowner
+        if self.tenant.is_gym_owner:
+            gym_owner = self.tenant.gym_owner
             
             try:
                 # Count records before deletion for confirmation
                 total_records = Attendance.objects.filter(gym_owner=gym_owner).count()
+                affected_member_ids = list(
+                    Attendance.objects.filter(gym_owner=gym_owner).values_list('member_id', flat=True).distinct()
+                )
+                
+                # Delete all attendance records for this gym (fast delete, tombstones in one insert)
+                attendance = Attendance.objects.filter(gym_owner=gym_owner)
+                with record_deletions(attendance):
+                    deleted_count, _ = attendance.delete()
                 
-                # Delete all attendance records for this gym
-                deleted_count, _ = Attendance.objects.filter(gym_owner=gym_owner).delete()
+                # Bulk delete skips Attendance.delete(), so invalidate member history here
+                bump_member_version(*affected_member_ids)
                 
                 logger.info(f'Deleted {deleted_count} attendance records for gym {gym_owner.id}')
                 
@@ -1107,47 +1019,49 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
 
 
-class SubscriptionPlanViewSet(viewsets.ModelViewSet):
+class SubscriptionPlanViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = SubscriptionPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_timestamp_fields = ('updated_date',)
     
     def get_queryset(self):
         # Filter subscription plans by gym owner
-        if hasattr(self.request.user, 'gymowner'):
-            return SubscriptionPlan.objects.filter(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            return SubscriptionPlan.objects.with_subscriber_counts().select_related('gym_owner').filter(
+                gym_owner_id=self.tenant.gym_owner_id
+            )
         return SubscriptionPlan.objects.none()
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create subscription plans")
     
     @action(detail=False, methods=['get'])
     def active(self, request):
-        if hasattr(request.user, 'gymowner'):
-            active_plans = SubscriptionPlan.objects.filter(
-                gym_owner=request.user.gymowner,
-                is_active=True
-            )
+        if self.tenant.is_gym_owner:
+            active_plans = self.get_queryset().filter(is_active=True)
             serializer = self.get_serializer(active_plans, many=True)
             return Response(serializer.data)
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
 
 
-class MemberSubscriptionViewSet(viewsets.ModelViewSet):
+class MemberSubscriptionViewSet(TenantMixin, InstrumentedSerializerMixin, ProjectionMixin, SparseFieldsetMixin, DeltaSyncMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = MemberSubscriptionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_timestamp_fields = ('updated_date',)
+    pagination_class = MemberSubscriptionKeysetPagination
     
     def get_queryset(self):
         # Filter member subscriptions by gym owner with optimized queries
-        if hasattr(self.request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             return MemberSubscription.objects.select_related(
                 'member__user', 'subscription_plan', 'gym_owner'
             ).filter(
-                gym_owner=self.request.user.gymowner
-            ).order_by('-created_at')
+                gym_owner_id=self.tenant.gym_owner_id
+            ).order_by('-created_date', '-id')
         return MemberSubscription.objects.none()
     
     def get_serializer_class(self):
@@ -1158,41 +1072,18 @@ class MemberSubscriptionViewSet(viewsets.ModelViewSet):
                 return MemberSubscriptionListSerializer
         return MemberSubscriptionSerializer
     
-    def list(self, request, *args, **kwargs):
-        """Optimized list with pagination to reduce response sizes"""
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        # Add pagination with reduced page size
-        page_size = min(int(request.query_params.get('page_size', 25)), 50)  # Max 50 items per page
-        paginator = PageNumberPagination()
-        paginator.page_size = page_size
-        page = paginator.paginate_queryset(queryset, request)
-        
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            response = paginator.get_paginated_response(serializer.data)
-            
-            # Log response size for monitoring
-            response_size = len(str(response.data))
-            print(f'📊 MEMBER_SUBSCRIPTIONS: Returning page with {len(page)} items (~{response_size} bytes)')
-            
-            return response
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-    
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
-            serializer.save(gym_owner=self.request.user.gymowner)
+        if self.tenant.is_gym_owner:
+            serializer.save(gym_owner=self.tenant.gym_owner)
         else:
             raise serializers.ValidationError("User must be a gym owner to create member subscriptions")
     
     @action(detail=False, methods=['get'])
     def active(self, request):
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             active_subscriptions = MemberSubscription.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 status='active'
             )
             serializer = self.get_serializer(active_subscriptions, many=True)
@@ -1201,10 +1092,10 @@ class MemberSubscriptionViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def expiring_soon(self, request):
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             soon_date = timezone.now().date() + timedelta(days=7)
             expiring_subscriptions = MemberSubscription.objects.filter(
-                gym_owner=request.user.gymowner,
+                gym_owner_id=self.tenant.gym_owner_id,
                 status='active',
                 end_date__lte=soon_date
             )
@@ -1213,23 +1104,25 @@ class MemberSubscriptionViewSet(viewsets.ModelViewSet):
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
 
 
-class TrainerMemberAssociationViewSet(viewsets.ModelViewSet):
+class TrainerMemberAssociationViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = TrainerMemberAssociationSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         # Filter associations by gym owner
-        if hasattr(self.request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             return TrainerMemberAssociation.objects.filter(
-                gym_owner=self.request.user.gymowner
-            ).select_related('trainer', 'member', 'trainer__user', 'member__user')
+                gym_owner_id=self.tenant.gym_owner_id
+            ).select_related(
+                'gym_owner', 'assigned_by', 'member__user', 'member__gym_owner',
+            ).with_details('member').prefetch_related(Prefetch('trainer', queryset=_annotated_trainers()))
         return TrainerMemberAssociation.objects.none()
     
     def perform_create(self, serializer):
         # Automatically assign gym owner on creation
-        if hasattr(self.request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             serializer.save(
-                gym_owner=self.request.user.gymowner,
+                gym_owner=self.tenant.gym_owner,
                 assigned_by=self.request.user
             )
         else:
@@ -1238,7 +1131,7 @@ class TrainerMemberAssociationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get all active trainer-member associations"""
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             active_associations = self.get_queryset().filter(is_active=True)
             serializer = self.get_serializer(active_associations, many=True)
             return Response(serializer.data)
@@ -1247,7 +1140,7 @@ class TrainerMemberAssociationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_trainer(self, request):
         """Get associations grouped by trainer"""
-        if not hasattr(request.user, 'gymowner'):
+        if not self.tenant.is_gym_owner:
             return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
         
         trainer_id = request.query_params.get('trainer_id')
@@ -1264,7 +1157,7 @@ class TrainerMemberAssociationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_member(self, request):
         """Get associations for a specific member"""
-        if not hasattr(request.user, 'gymowner'):
+        if not self.tenant.is_gym_owner:
             return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
         
         member_id = request.query_params.get('member_id')
@@ -1279,23 +1172,24 @@ class TrainerMemberAssociationViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(TenantMixin, InstrumentedSerializerMixin, SparseFieldsetMixin, DeltaSyncMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for managing gym owner notifications"""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_timestamp_fields = ('created_at', 'read_at')
     
     def get_queryset(self):
         """Filter notifications by gym owner"""
-        if hasattr(self.request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             return Notification.objects.filter(
-                gym_owner=self.request.user.gymowner
+                gym_owner_id=self.tenant.gym_owner_id
             ).select_related('related_member__user', 'related_payment')
         return Notification.objects.none()
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications"""
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             count = self.get_queryset().filter(is_read=False).count()
             return Response({'unread_count': count})
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
@@ -1310,19 +1204,20 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """Mark all notifications as read for the gym owner"""
-        if hasattr(request.user, 'gymowner'):
+        if self.tenant.is_gym_owner:
             updated = self.get_queryset().filter(is_read=False).update(
                 is_read=True,
                 read_at=timezone.now()
             )
+            bump_gym_generation(self.tenant.gym_owner_id)  # A queryset update sends no post_save
             return Response({'status': f'marked {updated} notifications as read'})
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
     
     @action(detail=False, methods=['get'])
     def check_expiring_members(self, request):
         """Check for expiring members and create notifications"""
-        if hasattr(request.user, 'gymowner'):
-            gym_owner = request.user.gymowner
+        if self.tenant.is_gym_owner:
+            gym_owner = self.tenant.gym_owner
             today = get_ist_date()
             next_week = today + timedelta(days=7)
             
@@ -1355,6 +1250,40 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
 
 
+class SearchViewSet(TenantMixin, viewsets.ViewSet):
+    """
+    Ranked typeahead search across the gym's members, trainers and equipment.
+
+    GET /api/search/?q=<text>[&type=member,trainer,equipment][&limit=10]
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        if not self.tenant.is_gym_owner:
+            return Response({'error': 'User must be a gym owner'}, status=status.HTTP_403_FORBIDDEN)
+
+        query = request.query_params.get('q', '')
+        kinds = parse_field_list(request.query_params.get('type')) or SEARCH_KINDS
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            return Response({'limit': 'Must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search(self.tenant.gym_owner_id, query, kinds=kinds, limit=limit)
+        return Response({
+            'query': query,
+            'results': [
+                {
+                    'type': document.kind,
+                    'id': document.object_id,
+                    'title': document.title,
+                    'detail': document.detail,
+                    'score': round(document.score, 4),
+                }
+                for document in results
+            ],
+        })
+
 # Web attendance views for QR code access
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -1691,3 +1620,39 @@ def web_attendance_submit(request):
             'success': False,
             'message': f'Server error: {str(e)}'
         })
+
+
+IMAGE_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # Keys are content hashes - a URL never changes
+PENDING_IMAGE_CACHE_CONTROL = 'public, max-age=60'  # Original served while its derivative is being made
+
+
+@require_http_methods(["GET", "HEAD"])
+def image_blob(request, key):
+    """Serve an image from the content-addressed image store"""
+    from django.http import FileResponse, Http404, HttpResponseNotModified
+    from .blobstore import get_image_store, image_content_type
+    from .imaging import find_original, schedule_derivatives
+
+    etag = f'"{key.split(".")[0]}"'
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = IMAGE_CACHE_CONTROL
+        return response
+
+    image = get_image_store().open(key)
+    if image is not None:
+        response = FileResponse(image, content_type=image_content_type(key))
+        response['ETag'] = etag
+        response['Cache-Control'] = IMAGE_CACHE_CONTROL
+        return response
+
+    # A derivative that isn't there yet - serve the original briefly and (re)queue
+    # it; originals that can't be decoded aren't queued again (see imaging.py)
+    original = find_original(key) if '-' in key else None
+    if original is None:
+        raise Http404('Image not found')
+    schedule_derivatives(original)
+    response = FileResponse(get_image_store().open(original), content_type=image_content_type(original))
+    response['Cache-Control'] = PENDING_IMAGE_CACHE_CONTROL
+    return response
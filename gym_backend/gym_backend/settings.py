@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'gym_api.middleware.RequestMetricsMiddleware',
+    'gym_api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -123,6 +126,13 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Content-addressed profile pictures (gym_api.blobstore) - files under MEDIA_ROOT/images by default
+# IMAGE_STORE = {'BACKEND': 'gym_api.blobstore.DatabaseImageStore'}
+IMAGE_WORKERS = 2  # Background threads creating profile picture derivatives (gym_api.imaging)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -150,16 +160,41 @@ except Exception as e:
     GOOGLE_OAUTH2_CLIENT_ID = None
     GOOGLE_OAUTH2_CLIENT_SECRET = None
 
+GOOGLE_HTTP_TIMEOUT = (3.05, 10)  # (connect, read) seconds for calls to Google (gym_api.google_auth)
+
+# Stateless signed access tokens (gym_api.authentication.SignedTokenAuthentication)
+SIGNED_TOKEN_AUTH = False
+SIGNED_TOKEN_LIFETIME = 900  # seconds
+SIGNED_TOKEN_REVOCATION_REFRESH = 5  # seconds a process serves its copy of the revocations without a shared cache
+
+# Cache token lookups (gym_api.authentication) - safe with the local-memory cache of a single runserver process
+AUTH_TOKEN_CACHE = True
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Primary authentication
+        'gym_api.authentication.SignedTokenAuthentication',  # Bearer access tokens when SIGNED_TOKEN_AUTH is on
+        'gym_api.authentication.CachedTokenAuthentication',  # Primary authentication
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'gym_api.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'gym_api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
+
+# MessagePack (Accept: application/msgpack) is offered when the optional msgpack package is installed
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('gym_api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('gym_api.renderers.MessagePackParser')
+
+# Response compression (gym_api.middleware.CompressionMiddleware); br/zstd need the optional brotli/zstandard packages
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 5, 'zstd': 3}
@@ -3,6 +3,7 @@ Production settings for gym_backend project.
 Optimized for 100k+ users with enterprise-level performance.
 """
 
+import importlib.util
 import os
 from decouple import config
 from pathlib import Path
@@ -28,6 +29,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'gym_api.middleware.RequestMetricsMiddleware',
+    'gym_api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'gym_api.middleware.ServeMediaMiddleware',  # Custom media file serving
@@ -89,15 +92,34 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'gym_api.authentication.SignedTokenAuthentication',
+        'gym_api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'gym_api.renderers.FastJSONRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'gym_api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# MessagePack (Accept: application/msgpack) is offered when the optional msgpack package is installed
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('gym_api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('gym_api.renderers.MessagePackParser')
+
+# Response compression (gym_api.middleware.CompressionMiddleware); br/zstd need the optional brotli/zstandard packages
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_LEVELS = {
+    'gzip': config('COMPRESSION_GZIP_LEVEL', default=6, cast=int),
+    'br': config('COMPRESSION_BROTLI_LEVEL', default=5, cast=int),
+    'zstd': config('COMPRESSION_ZSTD_LEVEL', default=3, cast=int),
 }
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -227,6 +249,8 @@ CACHES = {
         }
     }
 }
+# Per-worker, so token lookups (gym_api.authentication) aren't cached - a logout on one worker
+# couldn't evict them on the others. Set AUTH_TOKEN_CACHE only after moving to a shared cache.
 
 # Use database for session storage (simple and reliable)
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
@@ -291,7 +315,8 @@ SIMPLE_JWT = {
 # Enhanced REST Framework Configuration
 REST_FRAMEWORK.update({
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Primary - Django tokens
+        'gym_api.authentication.SignedTokenAuthentication',
+        'gym_api.authentication.CachedTokenAuthentication',  # Primary - Django tokens (cached)
         'rest_framework_simplejwt.authentication.JWTAuthentication',  # Secondary - JWT
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -366,6 +391,16 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files configuration - Railway deployment
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Behind nginx/Apache, let the proxy stream media files (gym_api.media): 'X-Accel-Redirect' or 'X-Sendfile'
+MEDIA_SENDFILE_HEADER = config('MEDIA_SENDFILE_HEADER', default='')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')  # nginx internal location
+
+# Content-addressed profile pictures (gym_api.blobstore). Railway's filesystem does not
+# survive a deploy, so images live in the ImageBlob table unless another backend is set
+IMAGE_STORE = {
+    'BACKEND': config('IMAGE_STORE_BACKEND', default='gym_api.blobstore.DatabaseImageStore'),
+}
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)  # Profile picture derivative threads (gym_api.imaging)
 
 # Ensure media directory exists
 os.makedirs(MEDIA_ROOT, exist_ok=True)
@@ -469,6 +504,11 @@ EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)  # seconds - a slow server fails instead of hanging
+# Batched owner notifications (gym_api.mailing)
+EMAIL_DISPATCH_WORKERS = config('EMAIL_DISPATCH_WORKERS', default=2, cast=int)  # Connections in parallel
+EMAIL_DISPATCH_BATCH_SIZE = config('EMAIL_DISPATCH_BATCH_SIZE', default=50, cast=int)  # Messages per connection
+EMAIL_DISPATCH_RETRIES = config('EMAIL_DISPATCH_RETRIES', default=2, cast=int)
 
 # Sentry Configuration for Error Monitoring (Optional)
 # Only initialize Sentry if DSN is provided
@@ -536,4 +576,17 @@ try:
 except Exception as e:
     print(f"❌ PRODUCTION_SETTINGS: Error configuring Google OAuth: {e}")
     GOOGLE_OAUTH2_CLIENT_ID = None
-    GOOGLE_OAUTH2_CLIENT_SECRET = None
\ No newline at end of file
+    GOOGLE_OAUTH2_CLIENT_SECRET = None
+
+GOOGLE_HTTP_TIMEOUT = (
+    config('GOOGLE_HTTP_CONNECT_TIMEOUT', default=3.05, cast=float),
+    config('GOOGLE_HTTP_READ_TIMEOUT', default=10, cast=float),
+)  # (connect, read) seconds for calls to Google (gym_api.google_auth)
+
+# Stateless signed access tokens (gym_api.authentication.SignedTokenAuthentication). Revocations are
+# stored in the database; with the LocMem cache above each worker keeps its own copy of the recent ones,
+# reloaded every SIGNED_TOKEN_REVOCATION_REFRESH seconds, so a logout handled by another worker takes
+# up to that long to reject its access tokens there
+SIGNED_TOKEN_AUTH = config('SIGNED_TOKEN_AUTH', default=False, cast=bool)
+SIGNED_TOKEN_LIFETIME = config('SIGNED_TOKEN_LIFETIME', default=900, cast=int)  # seconds
+SIGNED_TOKEN_REVOCATION_REFRESH = config('SIGNED_TOKEN_REVOCATION_REFRESH', default=5, cast=int)  # seconds
\ No newline at end of file